@@ -97,6 +97,125 @@ else:
     DATABASES["default"].pop("OPTIONS", None)
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Parsed PYE documents keyed by file content hash. File-based so every
+    # ingestion worker process shares it; bounded by MAX_ENTRIES.
+    "parse": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("PARSE_CACHE_DIR", str(BASE_DIR / ".cache" / "parse")),
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "5000")),
+        },
+    },
+    # Generated question sets keyed by passage hash + prompt version, so the
+    # same passage is never sent to the model twice.
+    "generation": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("GENERATION_CACHE_DIR", str(BASE_DIR / ".cache" / "generation")),
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "5000")),
+        },
+    },
+    # Rendered DocumentDetailView JSON keyed by document + content version
+    # (passages/payload_cache.py). In-process by default; point it at a shared
+    # backend (e.g. django.core.cache.backends.redis.RedisCache) in production.
+    "payload": {
+        "BACKEND": os.getenv("PAYLOAD_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("PAYLOAD_CACHE_LOCATION", "document-payloads"),
+        "TIMEOUT": int(os.getenv("PAYLOAD_CACHE_TIMEOUT", str(24 * 60 * 60))),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("PAYLOAD_CACHE_MAX_ENTRIES", "1000")),
+        },
+    },
+    # Catalog facet counts keyed by filter combination (passages/facets.py).
+    # Edits invalidate them; TIMEOUT bounds staleness from other processes.
+    "facets": {
+        "BACKEND": os.getenv("FACET_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("FACET_CACHE_LOCATION", "catalog-facets"),
+        "TIMEOUT": int(os.getenv("FACET_CACHE_TIMEOUT", "300")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("FACET_CACHE_MAX_ENTRIES", "5000")),
+        },
+    },
+    # Validate-only upload tokens (passages/dry_run.py), for their 30-minute
+    # life. File-based so every web process sees them, and on its own so parse
+    # cache culling cannot drop a token early: keep MAX_ENTRIES above the
+    # number of validations in any 30 minutes.
+    "dry_run": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("DRY_RUN_CACHE_DIR", str(BASE_DIR / ".cache" / "dry_run")),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("DRY_RUN_CACHE_MAX_ENTRIES", "10000")),
+        },
+    },
+}
+
+
+# Answer keys kept in memory per worker for grading (passages/grading.py),
+# revalidated against each document's content version on every submission.
+
+ANSWER_KEY_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_KEY_CACHE_MAX_ENTRIES", "2000"))
+
+
+# Write-behind queue for quiz submissions (passages/submission_queue.py). With
+# BURST_MODE on, submissions are graded and spooled under DIR, and
+# `flush_submissions` writes them to the database BATCH_SIZE at a time.
+
+SUBMISSION_QUEUE = {
+    "BURST_MODE": os.getenv("SUBMISSION_BURST_MODE", "False") == "True",
+    "DIR": os.getenv("SUBMISSION_QUEUE_DIR", str(BASE_DIR / ".cache" / "submissions")),
+    "BATCH_SIZE": int(os.getenv("SUBMISSION_QUEUE_BATCH_SIZE", "500")),
+    # Seconds the flusher waits before retrying after a database error.
+    "RETRY_SECONDS": float(os.getenv("SUBMISSION_QUEUE_RETRY_SECONDS", "5")),
+}
+
+
+# Processes used to extract text from long PDFs page-parallel during ingestion
+# (passages/pye_parser.py). Each ingestion worker can start this many, so keep
+# workers x PDF_EXTRACT_WORKERS near the core count. 1 disables the pool.
+# Sandboxed parses run the pool inside the parse child, each worker capped at
+# PARSE_SANDBOX["WORKER_MEMORY_MB"].
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+# Limits for parsing an upload (passages/sandbox.py). With ENABLED, each parse
+# runs in a child process that is killed after TIMEOUT seconds and capped at
+# MEMORY_MB of address space, and each of its PDF_EXTRACT_WORKERS pool workers at
+# WORKER_MEMORY_MB; the size limits apply either way.
+
+PARSE_SANDBOX = {
+    "ENABLED": os.getenv("PARSE_SANDBOX_ENABLED", "True") == "True",
+    "TIMEOUT": float(os.getenv("PARSE_SANDBOX_TIMEOUT", "30")),
+    "MEMORY_MB": int(os.getenv("PARSE_SANDBOX_MEMORY_MB", "1024")),
+    "WORKER_MEMORY_MB": int(os.getenv("PARSE_SANDBOX_WORKER_MEMORY_MB", "512")),
+    "MAX_PARAGRAPHS": int(os.getenv("PARSE_MAX_PARAGRAPHS", "50000")),
+    "MAX_CHARS": int(os.getenv("PARSE_MAX_CHARS", "5000000")),
+    "MAX_ZIP_RATIO": float(os.getenv("PARSE_MAX_ZIP_RATIO", "100")),
+    "MAX_UNCOMPRESSED_MB": int(os.getenv("PARSE_MAX_UNCOMPRESSED_MB", "200")),
+}
+
+
+# Question generation (passages/generation.py)
+# "gemini" calls the API; "stub" is a deterministic offline backend for dev/tests.
+
+QUESTION_GENERATION = {
+    "BACKEND": os.getenv("QUESTION_GENERATION_BACKEND", "gemini"),
+    "MAX_CONCURRENCY": int(os.getenv("QUESTION_GENERATION_MAX_CONCURRENCY", "4")),
+    "RATE_PER_SECOND": float(os.getenv("QUESTION_GENERATION_RATE_PER_SECOND", "1")),
+    "BURST": int(os.getenv("QUESTION_GENERATION_BURST", "4")),
+    "MAX_RETRIES": int(os.getenv("QUESTION_GENERATION_MAX_RETRIES", "3")),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -195,6 +314,19 @@ else:
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
+
+# Resumable chunked uploads (passages/uploads.py). Parts are staged under DIR;
+# the "s3" backend also streams them into an S3 multipart upload as they
+# arrive (parts are at least 5 MB there, an S3 rule).
+
+UPLOAD_STAGING = {
+    "BACKEND": os.getenv("UPLOAD_STAGING_BACKEND", "s3" if USE_S3 else "local"),
+    "DIR": os.getenv("UPLOAD_STAGING_DIR", str(BASE_DIR / ".cache" / "uploads")),
+    "CHUNK_SIZE": int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8")) * 1024 * 1024,
+    "MAX_SIZE_MB": int(os.getenv("UPLOAD_MAX_SIZE_MB", "200")),
+    "EXPIRY_HOURS": int(os.getenv("UPLOAD_EXPIRY_HOURS", "24")),
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Change to IsAuthenticated for production
@@ -233,6 +365,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
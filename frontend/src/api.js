@@ -24,14 +24,31 @@ export const authAPI = {
 
 // Documents API
 export const documentsAPI = {
-  // Get all documents
-  getAll: () => api.get('/documents/'),
+  // Get one page of documents: { next, results }. Pass `next` back as `cursor` for the following page.
+  list: (params = {}) => api.get('/documents/', { params }),
+
+  // Get all documents, following every page
+  getAll: async (params = {}) => {
+    let response = await api.get('/documents/', { params: { page_size: 200, ...params } });
+    const results = [...response.data.results];
+    while (response.data.next) {
+      response = await api.get(response.data.next);
+      results.push(...response.data.results);
+    }
+    return { ...response, data: results };
+  },
   
+  // Count documents per filter option under the given filters: { total, facets: { grade_level: [{ value, label, count }], ... } }
+  facets: (params = {}) => api.get('/documents/facets/', { params }),
+
   // Get document by ID
   getById: (id) => api.get(`/documents/${id}/`),
   
   // Get document detail with questions
   getDetail: (id) => api.get(`/documents/${id}/detail/`),
+
+  // Get the student quiz payload (passage, questions and choices; no answer key)
+  getQuiz: (id) => api.get(`/documents/${id}/quiz/`),
   
  // Upload new document
 upload: (formData) => api.post('documents/', formData, {
@@ -47,6 +64,12 @@ upload: (formData) => api.post('documents/', formData, {
   delete: (id) => api.delete(`/documents/${id}/`),
 };
 
+// Ingestion jobs API (uploads are parsed in the background)
+export const ingestionAPI = {
+  // Get the status of a queued upload parse
+  getJob: (id) => api.get(`/ingestion-jobs/${id}/`),
+};
+
 // Questions API
 export const questionsAPI = {
   // Get questions for a document
@@ -83,7 +106,10 @@ export const answersAPI = {
 // Quiz API
 export const quizAPI = {
   // Submit quiz responses
-  submit: (data) => api.post('/submit-quiz/', data),
+  // idempotencyKey: the same key for every retry of one attempt, so a retry never records it twice
+  submit: (data, idempotencyKey) => api.post('/submit-quiz/', data, {
+    headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+  }),
   
   // Get quiz responses
   getResponses: () => api.get('/responses/'),
@@ -19,22 +19,73 @@ const DocumentList = () => {
   const [documentToDelete, setDocumentToDelete] = useState(null);
   const [isDeleting, setIsDeleting] = useState(false);
   const [currentUser, setCurrentUser] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [facetCounts, setFacetCounts] = useState({});
 
   useEffect(() => {
     fetchData();
   }, []);
 
+  // the list is paged and filtered by the server; refetch the first page when a filter changes
+  const documentFilters = () => ({
+    ...(searchTerm.trim() && { search: searchTerm.trim() }),
+    ...(selectedGrade && { grade_level: selectedGrade }),
+    ...(selectedSkill && { skill_category: selectedSkill }),
+  });
+
+  const cursorFrom = (nextUrl) => (nextUrl ? new URL(nextUrl).searchParams.get('cursor') : null);
+
+  // { facet: { optionId: count } } for the current filters; options missing from it match nothing
+  const fetchFacetCounts = async () => {
+    const response = await documentsAPI.facets(documentFilters());
+    const counts = {};
+    Object.entries(response.data.facets).forEach(([facet, options]) => {
+      counts[facet] = Object.fromEntries(options.map(option => [String(option.value), option.count]));
+    });
+    setFacetCounts(counts);
+  };
+
+  const optionLabel = (facet, id, name) => `${name} (${facetCounts[facet]?.[String(id)] ?? 0})`;
+
+  const fetchDocuments = async (cursor = null) => {
+    if (!cursor) {
+      fetchFacetCounts().catch(err => console.error('Error fetching filter counts:', err));
+    }
+    const response = await documentsAPI.list({ ...documentFilters(), ...(cursor && { cursor }) });
+    setDocuments(prev => (cursor ? [...prev, ...response.data.results] : response.data.results));
+    setNextCursor(cursorFrom(response.data.next));
+  };
+
+  useEffect(() => {
+    if (loading) return;
+    const timer = setTimeout(() => {
+      fetchDocuments().catch(err => console.error('Error fetching documents:', err));
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, selectedGrade, selectedSkill]);
+
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      await fetchDocuments(nextCursor);
+    } catch (err) {
+      console.error('Error fetching documents:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchData = async () => {
     try {
       setLoading(true);
-      const [documentsRes, gradeLevelsRes, skillCategoriesRes, userRes] = await Promise.all([
-        documentsAPI.getAll(),
+      const [, gradeLevelsRes, skillCategoriesRes, userRes] = await Promise.all([
+        fetchDocuments(),
         gradeLevelsAPI.getAll(),
         skillCategoriesAPI.getAll(),
         authAPI.me()
       ]);
       
-      setDocuments(documentsRes.data);
       setGradeLevels(gradeLevelsRes.data);
       setSkillCategories(skillCategoriesRes.data);
       setCurrentUser(userRes.data.user);
@@ -46,35 +97,6 @@ const DocumentList = () => {
     }
   };
 
-const filteredDocuments = documents.filter((doc) => {
-  const normalizedSearchTerm = searchTerm.trim().toLowerCase();
-
-  const matchesSearch =
-    !normalizedSearchTerm ||
-    doc.title?.toLowerCase().includes(normalizedSearchTerm) ||
-    doc.parsed_text?.toLowerCase().includes(normalizedSearchTerm);
-
-  const documentGradeId =
-    typeof doc.grade_level === "object"
-      ? doc.grade_level?.id
-      : doc.grade_level;
-
-  const documentSkillId =
-    typeof doc.skill_category === "object"
-      ? doc.skill_category?.id
-      : doc.skill_category;
-
-  const matchesGrade =
-    !selectedGrade ||
-    Number(documentGradeId) === Number(selectedGrade);
-
-  const matchesSkill =
-    !selectedSkill ||
-    Number(documentSkillId) === Number(selectedSkill);
-
-  return matchesSearch && matchesGrade && matchesSkill;
-});
-
 const getGradeName = (gradeLevel) => {
   if (!gradeLevel) {
     return null;
@@ -118,10 +140,8 @@ const getSkillName = (skillCategory) => {
     });
   };
   // calculate the reading time based on 150 words per minute
-  const calculateReadingTime = (text) => {
-    if(!text) return 1;
-    const wordCount = text.trim().split(/\s+/).length;
-    return Math.max(1, Math.ceil(wordCount / 150));
+  const calculateReadingTime = (wordCount) => {
+    return Math.max(1, Math.ceil((wordCount || 0) / 150));
   }
 
   const handleReadClick = (doc) => {
@@ -220,7 +240,7 @@ const getSkillName = (skillCategory) => {
           >
             <option value="">All Grade Levels</option>
             {gradeLevels.map(grade => (
-              <option key={grade.id} value={grade.id}>{grade.name}</option>
+              <option key={grade.id} value={grade.id}>{optionLabel('grade_level', grade.id, grade.name)}</option>
             ))}
           </select>
 
@@ -232,7 +252,7 @@ const getSkillName = (skillCategory) => {
           >
             <option value="">All Skills</option>
             {skillCategories.map(skill => (
-              <option key={skill.id} value={skill.id}>{skill.name}</option>
+              <option key={skill.id} value={skill.id}>{optionLabel('skill_category', skill.id, skill.name)}</option>
             ))}
           </select>
 
@@ -253,22 +273,22 @@ const getSkillName = (skillCategory) => {
       {/* Results Count */}
       <div className="results-count">
         <p className="count-text">
-          Showing {filteredDocuments.length} of {documents.length} passages
+          Showing {documents.length}{nextCursor ? '+' : ''} passages
         </p>
       </div>
 
       {/* Documents Grid */}
-      {filteredDocuments.length === 0 ? (
+      {documents.length === 0 ? (
         <div className="card empty-state-card">
           <div className="empty-state-content">
             <h3 className="empty-state-title">No passages found</h3>
             <p className="empty-state-text">
-              {documents.length === 0 
+              {Object.keys(documentFilters()).length === 0
                 ? "No passages have been uploaded yet." 
                 : "No passages match your current filters."
               }
             </p>
-            {documents.length === 0 && currentUser?.role === 'teacher' && (
+            {Object.keys(documentFilters()).length === 0 && currentUser?.role === 'teacher' && (
               <Link to="/upload" className="btn btn-primary">
                 Upload Your First Passage
               </Link>
@@ -277,7 +297,7 @@ const getSkillName = (skillCategory) => {
         </div>
       ) : (
         <div className="documents-grid">
-          {filteredDocuments.map(doc => (
+          {documents.map(doc => (
             <div key={doc.id} className="card document-card" style={{position: 'relative'}}>
               {currentUser?.role === 'teacher' && (
               <button
@@ -307,14 +327,14 @@ const getSkillName = (skillCategory) => {
                   {/* Reading Time Indicator */}
                   <div className = "meta-item">
                     <span className="meta-icon">⏱️</span>
-                    {calculateReadingTime(doc.parsed_text)} min read
+                    {calculateReadingTime(doc.word_count)} min read
                   </div>
                 </div>
               </div>
 
               <div className="document-content">
                 <p className="document-preview">
-                  {doc.parsed_text?.substring(0, 150)}...
+                  {doc.excerpt}...
                 </p>
               </div>
 
@@ -353,6 +373,14 @@ const getSkillName = (skillCategory) => {
         </div>
       )}
 
+      {nextCursor && (
+        <div style={{ display: 'flex', justifyContent: 'center', margin: '24px 0' }}>
+          <button onClick={handleLoadMore} disabled={loadingMore} className="btn btn-secondary">
+            {loadingMore ? 'Loading...' : 'Load More Passages'}
+          </button>
+        </div>
+      )}
+
       {/* Document Modal */}
       <DocumentModal
         isOpen={modalOpen}
@@ -21,6 +21,8 @@ const Quiz = () => {
   const [currentUser, setCurrentUser] = useState(null);
   const [timeElapsed, setTimeElapsed] = useState(0);
   const [eliminatedAnswers, setEliminatedAnswers] = useState({});
+  // one key per attempt: resubmitting after a network error returns the first result
+  const [submissionKey] = useState(() => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`);
 
   // Mock data functions
   const getMockDocument = () => {
@@ -116,7 +118,7 @@ const Quiz = () => {
       } else {
         // use real API calls to fetch document, questions, and current user concurrently
         const [detailRes, userRes] = await Promise.all([
-          documentsAPI.getDetail(documentId),
+          documentsAPI.getQuiz(documentId),
           authAPI.me().catch(() => ({ data: { user: null } })) // catch error just in case user isn't logged in
         ]);
         documentRes = { data: detailRes.data };
@@ -284,7 +286,7 @@ const Quiz = () => {
           user_name: 'Anonymous', // You can add a username input field later
           time_spent: timeElapsed,
           answers: answersArray
-        });
+        }, submissionKey);
 
         // clear local storage because they finished
         clearAutosave();
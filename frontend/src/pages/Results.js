@@ -33,10 +33,15 @@ const Results = () => {
 
       <div className = "review-section">
         {questions.map((question, index) => {
+          // the quiz payload has no answer key; the submit response carries it in `review`
+          const review = quizResult.review?.find(r => r.question_id === question.id);
           const selectedAnswerId = userAnswers[question.id];
           const selectedAnswer = question.answers.find(a => a.id === selectedAnswerId);
-          const correctAnswer = question.answers.find(a => a.is_correct)
-          const isCorrect = selectedAnswer?.is_correct;
+          const correctAnswer = review
+            ? question.answers.find(a => a.id === review.correct_answer_id)
+            : question.answers.find(a => a.is_correct);
+          const isCorrect = !!selectedAnswer && selectedAnswer.id === correctAnswer?.id;
+          const explanation = review ? review.explanation : question.explanation;
 
           return (
             <div key={question.id} className={`review-card ${isCorrect ? 'correct-card' : 'incorrect-card'}`}>
@@ -68,9 +73,9 @@ const Results = () => {
               </div>
 
               {/* display the explanation from the parser */}
-              {question.explanation && (
+              {explanation && (
                 <div className="explanation-box">
-                  <strong>Explanation: </strong> {question.explanation}
+                  <strong>Explanation: </strong> {explanation}
                   </div>
               )}
             </div>
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import {
   documentsAPI,
+  ingestionAPI,
   gradeLevelsAPI,
   skillCategoriesAPI,
   topicsAPI,
@@ -159,6 +160,19 @@ const fetchCurrentUser = async () => {
       // Step 1: Upload the document
       const response = await documentsAPI.upload(uploadData);
       const docId = response.data.id;
+
+      // Step 2: Wait for the background parser to finish with the file
+      let job = response.data.ingestion_job;
+      while (job && (job.status === 'queued' || job.status === 'parsing')) {
+        setSuccess('Document uploaded. Parsing questions...');
+        await new Promise(resolve => setTimeout(resolve, 1500));
+        job = (await ingestionAPI.getJob(job.id)).data;
+      }
+      if (job && job.status === 'failed') {
+        setSuccess('');
+        setError(`Document Error: ${job.error}`);
+        return;
+      }
       setSuccess('Document uploaded successfully!');
       // Redirect to library page after a short delay
       setTimeout(() => {
@@ -1,8 +1,38 @@
 from django.contrib import admin
 from .models import (
     UploadedDocument, GradeLevel, SkillCategory,
-    QuizQuestion, QuizAnswer, QuizResponse, UserAnswer, Profile, Classroom, Topic
+    QuizQuestion, QuizAnswer, QuizResponse, UserAnswer, Profile, Classroom, Topic, IngestionJob
 )
+from . import facets
+from .payload_cache import bump_content_version
+from .search import index_documents, matching
+
+
+class DocumentContentAdminMixin:
+    """Admin edits change what DocumentDetailView serves, so bump the document's content version and re-index it."""
+    document_id_path = 'id'
+
+    def _document_ids(self, queryset):
+        return list(queryset.values_list(self.document_id_path, flat=True).distinct())
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        document_ids = self._document_ids(type(obj).objects.filter(pk=obj.pk))
+        bump_content_version(*document_ids)
+        index_documents(*document_ids)
+
+    def delete_model(self, request, obj):
+        document_ids = self._document_ids(type(obj).objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+        bump_content_version(*document_ids)
+        index_documents(*document_ids)
+
+    def delete_queryset(self, request, queryset):
+        document_ids = self._document_ids(queryset)
+        super().delete_queryset(request, queryset)
+        bump_content_version(*document_ids)
+        index_documents(*document_ids)
+
 
 @admin.register(GradeLevel)
 class GradeLevelAdmin(admin.ModelAdmin):
@@ -20,22 +50,43 @@ class TopicAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 @admin.register(UploadedDocument)
-class UploadedDocumentAdmin(admin.ModelAdmin):
+class UploadedDocumentAdmin(DocumentContentAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'uploaded_at', 'grade_level', 'program', 'difficulty', 'topic', 'skill_category']
     list_filter = ['uploaded_at', 'grade_level', 'program', 'difficulty', 'topic', 'skill_category']
     list_editable = ['grade_level', 'program', 'difficulty', 'topic', 'skill_category']
-    search_fields = ['title', 'parsed_text']
-    readonly_fields = ['uploaded_at']
+    search_fields = ['title']
+    readonly_fields = ['uploaded_at', 'content_version', 'content_updated_at']
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index covers title, passage and questions; no icontains scan of parsed_text.
+        if not search_term:
+            return queryset, False
+        return matching(queryset, search_term), False
+
+    # Adds, deletes and list_editable changes all move the catalog's facet counts.
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        facets.invalidate()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        facets.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        facets.invalidate()
 
 @admin.register(QuizQuestion)
-class QuizQuestionAdmin(admin.ModelAdmin):
+class QuizQuestionAdmin(DocumentContentAdminMixin, admin.ModelAdmin):
+    document_id_path = 'document_id'
     list_display = ['question_text', 'document', 'created_at']
     list_filter = ['created_at', 'document']
     search_fields = ['question_text', 'document__title']
     readonly_fields = ['created_at']
 
 @admin.register(QuizAnswer)
-class QuizAnswerAdmin(admin.ModelAdmin):
+class QuizAnswerAdmin(DocumentContentAdminMixin, admin.ModelAdmin):
+    document_id_path = 'question__document_id'
     list_display = ['choice_letter', 'choice_text', 'question', 'is_correct']
     list_filter = ['is_correct', 'question__document']
     search_fields = ['choice_text', 'question__question_text']
@@ -68,3 +119,10 @@ class ClassroomAdmin(admin.ModelAdmin):
 
     def student_count(self, obj):
         return obj.students.count()
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ['document', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['document__title', 'error']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
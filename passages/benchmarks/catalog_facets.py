@@ -0,0 +1,85 @@
+"""
+Latency of the catalog facet counts as the bank grows.
+
+    python -m passages.benchmarks.catalog_facets [--documents 10000 100000] [--repeat 5]
+
+For each size a throwaway test database is filled with that many documents
+(spread over programs, topics, grade levels and difficulties) and
+GET /api/documents/facets/ is timed with no filters and with a program and
+difficulty selected: cold (the five grouped counts run) and warm (served
+from the "facets" cache). Warm requests stay flat as the catalog grows.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+
+from passages.benchmarks.catalog_list import _fill, _time
+
+
+def _tag(count: int) -> None:
+    from passages.models import GradeLevel, SkillCategory, UploadedDocument
+
+    rng = random.Random(count)
+    grades = [GradeLevel.objects.get_or_create(name=f"Grade {n}")[0].id for n in range(3, 13)]
+    skills = [SkillCategory.objects.get_or_create(name=f"Skill {n}")[0].id for n in range(8)]
+    for grade in grades:
+        untagged = UploadedDocument.objects.filter(grade_level__isnull=True).values_list("id", flat=True)
+        ids = list(untagged[:count // len(grades) + 1])
+        UploadedDocument.objects.filter(id__in=ids).update(
+            grade_level_id=grade, skill_category_id=rng.choice(skills), difficulty=rng.choice(["easy", "medium", "hard"]),
+        )
+
+
+def measure(count: int, repeat: int) -> list[tuple[str, float]]:
+    from django.core.cache import caches
+    from django.test import Client
+
+    from passages.models import UploadedDocument
+
+    _fill(count, words=20)
+    _tag(count)
+    client = Client()
+    rows = []
+    for label, params in (("no filters", {}), ("sat + hard", {"program": "sat", "difficulty": "hard"})):
+        def cold():
+            caches["facets"].clear()
+            return len(client.get("/api/documents/facets/", params).content)
+
+        def warm():
+            return len(client.get("/api/documents/facets/", params).content)
+
+        rows.append((f"{label}, cold", _time(cold, repeat)[0]))
+        rows.append((f"{label}, warm", _time(warm, repeat)[0]))
+    UploadedDocument.objects.all().delete()
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"{'documents':>10} {'request':<20} {'ms':>10}")
+        for count in args.documents:
+            for name, elapsed in measure(count, max(1, args.repeat)):
+                print(f"{count:>10} {name:<20} {elapsed * 1000:>10.2f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
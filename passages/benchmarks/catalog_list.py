@@ -0,0 +1,124 @@
+"""
+Response size and latency of the document catalog list as the bank grows.
+
+    python -m passages.benchmarks.catalog_list [--documents 10000 100000] [--words 400] [--repeat 5]
+
+For each size a throwaway test database is filled with that many documents
+(passages of `--words` words) and three requests are timed: the first page
+of GET /api/documents/, a page from the middle of the catalog (by cursor), and
+the old unpaginated list (every row through UploadedDocumentSerializer with
+its full parsed_text). Keyset paging keeps the first two flat as the catalog
+grows; the old list grows with it.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from passages.benchmarks.corpus import _sentence
+
+
+def _fill(count: int, words: int) -> None:
+    from django.utils import timezone
+
+    from passages.models import Topic, UploadedDocument
+
+    rng = random.Random(count)
+    topics = [Topic.objects.get_or_create(name=f"Topic {n}")[0] for n in range(20)]
+    sentences = [_sentence(rng) for _ in range(500)]
+    now = timezone.now()
+    batch = []
+    for n in range(count):
+        text = []
+        while sum(len(s.split()) for s in text) < words:
+            text.append(rng.choice(sentences))
+        document = UploadedDocument(
+            title=f"Passage {n}", file=f"documents/passage-{n}.docx", parsed_text=" ".join(text),
+            topic=rng.choice(topics), program=rng.choice(["standard", "shsat", "sat"]),
+        )
+        document.summarize_text()
+        batch.append(document)
+        if len(batch) == 2000:
+            UploadedDocument.objects.bulk_create(batch)
+            batch = []
+    UploadedDocument.objects.bulk_create(batch)
+    # Spread upload times over runs of 7 documents, so the order has ties but is not one long tie.
+    first_id = UploadedDocument.objects.order_by('id').values_list('id', flat=True).first()
+    for offset in range(0, count, 7):
+        UploadedDocument.objects.filter(id__gte=first_id + offset, id__lt=first_id + offset + 7).update(
+            uploaded_at=now - timezone.timedelta(seconds=count - offset),
+        )
+
+
+def _time(fn, repeat: int) -> tuple[float, int]:
+    fn()                            # warm-up
+    samples, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), size
+
+
+def measure(count: int, words: int, repeat: int) -> list[tuple[str, float, int]]:
+    from django.test import Client
+    from rest_framework.renderers import JSONRenderer
+
+    from passages.models import UploadedDocument
+    from passages.pagination import UploadedAtCursorPagination
+    from passages.serializers import UploadedDocumentSerializer
+
+    _fill(count, words)
+    client = Client()
+    middle = UploadedDocument.objects.order_by('-uploaded_at', '-id').only('id', 'uploaded_at')[count // 2]
+    cursor = UploadedAtCursorPagination().encode_cursor(middle)
+
+    def first_page():
+        return len(client.get('/api/documents/').content)
+
+    def middle_page():
+        return len(client.get('/api/documents/', {'cursor': cursor}).content)
+
+    def old_list():
+        queryset = UploadedDocument.objects.select_related('topic').order_by('-uploaded_at')
+        return len(JSONRenderer().render(UploadedDocumentSerializer(queryset, many=True).data))
+
+    rows = []
+    for name, fn in (("first page", first_page), ("middle page", middle_page), ("old full list", old_list)):
+        elapsed, size = _time(fn, repeat if name != "old full list" else 1)
+        rows.append((name, elapsed, size))
+    UploadedDocument.objects.all().delete()
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--words", type=int, default=400, help="Words per passage (default: 400)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"{'documents':>10} {'request':<14} {'ms':>10} {'KiB':>10}")
+        for count in args.documents:
+            for name, elapsed, size in measure(count, args.words, max(1, args.repeat)):
+                print(f"{count:>10} {name:<14} {elapsed * 1000:>10.1f} {size / 1024:>10.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
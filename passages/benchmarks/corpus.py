@@ -0,0 +1,187 @@
+"""
+Synthetic PYE documents for benchmarks.
+
+No Django imports: generates paragraph lists and writes them out as .pdf files
+(without any third-party PDF writer) or as .docx files via python-docx.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import docx
+
+CHOICE_LETTERS = "ABCD"
+
+_WORDS = (
+    "river city history science energy market forest culture people early "
+    "island winter harbor farmers letters bridge engine village storm garden"
+).split()
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _mess_up(rng: random.Random, text: str) -> str:
+    """Stray spacing of hand-edited worksheets: doubled spaces, tabs, NBSPs, padding."""
+    words = text.split(" ")
+    text = "".join(
+        word + rng.choice(["  ", "\t", "\xa0", " \xa0 "]) if rng.random() < 0.15 else word + " "
+        for word in words
+    ).rstrip()
+    return rng.choice(["", " ", "  "]) + text + rng.choice(["", " ", "\t"])
+
+
+def build_pye_paragraphs(
+    *,
+    passage_paragraphs: int = 20,
+    questions: int = 10,
+    seed: int = 0,
+    messy: bool = False,
+) -> list[str]:
+    """
+    Return the paragraphs of a well-formed PYE worksheet of the requested size.
+
+    With `messy`, paragraphs get irregular whitespace and blank paragraphs are
+    scattered through the document; it still parses to the same questions.
+    """
+    rng = random.Random(seed)
+    paragraphs = [f"Synthetic Passage {seed}"]
+    paragraphs += [" ".join(_sentence(rng) for _ in range(4)) for _ in range(passage_paragraphs)]
+    paragraphs.append("Questions to Answer")
+    answers = []
+    for number in range(1, questions + 1):
+        paragraphs.append(f"{number}. {_sentence(rng, 9)[:-1]}?")
+        paragraphs += [f"{letter}. {_sentence(rng, 6)}" for letter in CHOICE_LETTERS]
+        answers.append(rng.choice(CHOICE_LETTERS))
+    paragraphs.append("Answer Key with Explanations:")
+    paragraphs += [f"{letter} ({_sentence(rng, 10)})" for letter in answers]
+    if not messy:
+        return paragraphs
+
+    messy_paragraphs = []
+    for paragraph in paragraphs:
+        messy_paragraphs.append(_mess_up(rng, paragraph))
+        if rng.random() < 0.1:
+            messy_paragraphs.append(rng.choice(["", " ", "\xa0"]))
+    return messy_paragraphs
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int) -> list[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def write_pdf(paragraphs: list[str], path, *, lines_per_page: int = 55, width: int = 90) -> int:
+    """
+    Write `paragraphs` as a plain Helvetica text PDF. Returns the page count.
+
+    Long paragraphs are wrapped to `width` characters, like a real export.
+    """
+    lines = [line for paragraph in paragraphs for line in _wrap(paragraph, width)]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects: list[bytes] = []
+    page_ids = [4 + 2 * index for index in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for page_id, page_lines in zip(page_ids, pages):
+        body = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in page_lines
+        ) + " ET"
+        stream = body.encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as fh:
+        fh.write(out)
+    return len(pages)
+
+
+def write_docx(paragraphs: list[str], path, *, choice_tables: bool = False) -> None:
+    """
+    Write `paragraphs` as a .docx, one Word paragraph each.
+
+    With `choice_tables`, each question's four choices go in a 2x2 table with a
+    merged instruction row and a vertically merged notes column, the layout of
+    table-heavy vendor worksheets.
+    """
+    document = docx.Document()
+    index = 0
+    while index < len(paragraphs):
+        paragraph = paragraphs[index]
+        document.add_paragraph(paragraph)
+        choices = paragraphs[index + 1:index + 5]
+        index += 1
+        if not (choice_tables and paragraph[:1].isdigit() and len(choices) == 4
+                and all(c[:2] == f"{letter}." for c, letter in zip(choices, CHOICE_LETTERS))):
+            continue
+        table = document.add_table(rows=3, cols=3)
+        table.cell(0, 0).merge(table.cell(0, 2)).text = "Choose the best answer."
+        table.cell(1, 2).merge(table.cell(2, 2)).text = "Notes"
+        for cell, choice in zip([table.cell(1, 0), table.cell(1, 1), table.cell(2, 0), table.cell(2, 1)], choices):
+            cell.text = choice
+        index += 4
+    document.save(path)
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """One synthetic worksheet: its size, file format and layout quirks."""
+    passage_paragraphs: int
+    questions: int
+    format: str = "docx"            # "docx" or "pdf"
+    choice_tables: bool = False     # docx only; see write_docx
+    messy: bool = False
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        extras = "".join(["-tables" if self.choice_tables else "", "-messy" if self.messy else ""])
+        return f"p{self.passage_paragraphs}-q{self.questions}{extras}.{self.format}"
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def write_spec(spec: CorpusSpec, directory) -> Path:
+    """Write the worksheet described by `spec` into `directory` and return its path."""
+    paragraphs = build_pye_paragraphs(
+        passage_paragraphs=spec.passage_paragraphs, questions=spec.questions, seed=spec.seed, messy=spec.messy,
+    )
+    path = Path(directory) / spec.name
+    if spec.format == "pdf":
+        write_pdf(paragraphs, path)
+    else:
+        write_docx(paragraphs, path, choice_tables=spec.choice_tables)
+    return path
@@ -0,0 +1,70 @@
+"""
+Time and peak memory of reading table-heavy .docx worksheets.
+
+    python -m passages.benchmarks.docx_reading [--questions 50 200 800]
+
+"python-docx" is the previous path: build a Document, then walk rows and
+row.cells (docx_parser.extract_lines with the old _table_to_lines);
+"streaming" iterparses word/document.xml (docx_reader.iter_docx_blocks).
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import docx
+
+from passages.benchmarks.corpus import build_pye_paragraphs, write_docx
+from passages.docx_parser import blocks_to_lines, clean_text, iter_block_items
+from passages.docx_reader import iter_docx_blocks
+
+
+def _python_docx_lines(path) -> list[str]:
+    lines = []
+    for block in iter_block_items(docx.Document(path)):
+        if isinstance(block, docx.text.paragraph.Paragraph):
+            lines.append(clean_text(block.text))
+            continue
+        for row in block.rows:
+            lines.extend(text for text in (clean_text(cell.text) for cell in row.cells) if text)
+    return lines
+
+
+MODES = {
+    "python-docx": _python_docx_lines,
+    "streaming": lambda path: blocks_to_lines(iter_docx_blocks(path)),
+}
+
+
+def _measure(fn, path) -> tuple[float, float, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    lines = fn(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), len(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, nargs="+", default=[50, 200, 800])
+    args = parser.parse_args(argv)
+
+    print(f"{'questions':>9} {'KiB':>7} {'mode':>12} {'seconds':>9} {'peak MiB':>9} {'lines':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for questions in args.questions:
+            path = Path(tmp) / f"worksheet_{questions}.docx"
+            paragraphs = build_pye_paragraphs(passage_paragraphs=20, questions=questions, seed=questions)
+            write_docx(paragraphs, path, choice_tables=True)
+            size = path.stat().st_size / 1024
+            for mode, fn in MODES.items():
+                elapsed, peak, lines = _measure(fn, path)
+                print(f"{questions:>9} {size:>7.0f} {mode:>12} {elapsed:>9.3f} {peak:>9.2f} {lines:>7}")
+
+
+if __name__ == "__main__":
+    main()
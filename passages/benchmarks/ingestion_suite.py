@@ -0,0 +1,206 @@
+"""
+Per-stage timings of the ingestion pipeline over a synthetic PYE corpus.
+
+    python -m passages.benchmarks.ingestion_suite [--preset standard] [--output report.json]
+    python -m passages.benchmarks.ingestion_suite --output new.json --compare old.json
+
+Every worksheet in the preset (plain, table-heavy and messy .docx, plus .pdf,
+at several sizes) is timed stage by stage: extract_paragraphs, parse_pye,
+validate, docx_parser.parse_document (docx only) and import_parsed_doc, first
+import and an unchanged re-import. Imports run against a throwaway test
+database. Each stage is repeated and the min and median are kept.
+
+`--output` writes a JSON report; `--compare` prints the median change per stage
+against an earlier report and exits with status 1 when any stage is slower
+than `--threshold`, so it can gate a commit.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from passages.benchmarks.corpus import CorpusSpec, write_spec
+
+SIZES = {
+    "quick": [(5, 5)],
+    "standard": [(20, 10), (80, 40), (300, 150)],
+    "large": [(20, 10), (80, 40), (300, 150), (1000, 500)],
+}
+
+def build_specs(preset: str) -> list[CorpusSpec]:
+    specs = []
+    for seed, (passage_paragraphs, questions) in enumerate(SIZES[preset]):
+        for variant in ({}, {"choice_tables": True}, {"messy": True}, {"format": "pdf"}):
+            specs.append(CorpusSpec(passage_paragraphs, questions, seed=seed, **variant))
+    return specs
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def _summary(samples: list[float]) -> dict:
+    return {"min": min(samples), "median": statistics.median(samples), "runs": len(samples)}
+
+
+def measure_case(spec: CorpusSpec, path: Path, repeat: int) -> dict:
+    import docx
+
+    from passages.docx_parser import parse_document
+    from passages.importer import import_parsed_doc
+    from passages.models import UploadedDocument
+    from passages.pye_parser import extract_paragraphs, parse_pye, validate
+
+    samples: dict[str, list[float]] = {}
+
+    def record(stage, fn):
+        elapsed, result = _timed(fn)
+        samples.setdefault(stage, []).append(elapsed)
+        return result
+
+    # One untimed warm-up pass, then `repeat` timed ones.
+    for run in range(repeat + 1):
+        paragraphs = record("extract_paragraphs", lambda: list(extract_paragraphs(str(path))))
+        parsed = record("parse_pye", lambda: parse_pye(paragraphs))
+        problems = record("validate", lambda: validate(parsed))
+        if spec.format == "docx":
+            document = docx.Document(str(path))
+            record("docx_parser.parse_document", lambda: parse_document(document))
+
+        uploaded = UploadedDocument.objects.create(title=spec.name, file=f"documents/{spec.name}")
+        record("import_parsed_doc", lambda: import_parsed_doc(uploaded, parsed))
+        record("import_parsed_doc.reimport", lambda: import_parsed_doc(uploaded, parsed))
+        uploaded.delete()
+
+        if run == 0:
+            samples.clear()
+
+    return {
+        "name": spec.name,
+        "spec": spec.as_dict(),
+        "bytes": path.stat().st_size,
+        "paragraphs": len(paragraphs),
+        "questions": len(parsed.questions),
+        "problems": len(problems),
+        "stages": {stage: _summary(values) for stage, values in samples.items()},
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(specs: list[CorpusSpec], directory: Path, repeat: int) -> dict:
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from passages.pye_parser import PARSER_VERSION
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        cases = [measure_case(spec, write_spec(spec, directory), repeat) for spec in specs]
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parser_version": PARSER_VERSION,
+            "repeat": repeat,
+        },
+        "cases": cases,
+    }
+
+
+def print_report(report: dict) -> None:
+    stages = list(dict.fromkeys(stage for case in report["cases"] for stage in case["stages"]))
+    print(f"{'case':<24} {'KiB':>6} " + " ".join(f"{stage.split('.')[-1][:14]:>14}" for stage in stages))
+    for case in report["cases"]:
+        cells = []
+        for stage in stages:
+            timing = case["stages"].get(stage)
+            cells.append(f"{timing['median'] * 1000:>12.2f}ms" if timing else f"{'-':>14}")
+        print(f"{case['name']:<24} {case['bytes'] / 1024:>6.0f} " + " ".join(cells))
+
+
+def compare_reports(old: dict, new: dict, threshold: float) -> list[str]:
+    """Print the median change per stage; return the stages slower than `threshold`."""
+    old_cases = {case["name"]: case for case in old["cases"]}
+    regressions = []
+    print(f"\nvs {old['meta'].get('commit') or 'baseline'} (median, regression if > +{threshold:.0%}):")
+    for case in new["cases"]:
+        before = old_cases.get(case["name"])
+        if before is None:
+            continue
+        for stage, timing in case["stages"].items():
+            if stage not in before["stages"]:
+                continue
+            old_median = before["stages"][stage]["median"]
+            change = timing["median"] / old_median - 1 if old_median else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{case['name']} {stage}")
+            print(f"  {case['name']:<24} {stage:<28} {old_median * 1000:>9.2f}ms -> "
+                  f"{timing['median'] * 1000:>9.2f}ms {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--preset", choices=sorted(SIZES), default="standard")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (default: 5)")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed median slowdown (default: 0.25)")
+    parser.add_argument("--keep-corpus", help="Write the generated worksheets here instead of a temp directory")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+
+    specs = build_specs(args.preset)
+    if args.keep_corpus:
+        Path(args.keep_corpus).mkdir(parents=True, exist_ok=True)
+        report = run_suite(specs, Path(args.keep_corpus), max(1, args.repeat))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run_suite(specs, Path(tmp), max(1, args.repeat))
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")
+    if args.compare:
+        regressions = compare_reports(json.loads(Path(args.compare).read_text()), report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
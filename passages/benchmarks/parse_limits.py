@@ -0,0 +1,141 @@
+"""
+Worst-case parse time on adversarial input, and a mutation fuzz of the sandbox.
+
+    python -m passages.benchmarks.parse_limits [--chars 10000 100000 1000000] [--fuzz 200]
+
+The first table times parse_pye in-process on paragraphs built to stress the
+marker regexes (QUESTION_MARKER_RE / CHOICE_MARKER_RE and the combined token
+pattern): marker storms, long whitespace runs after digits, quote runs and a
+single huge paragraph. ns/char should stay flat as the input grows; a
+backtracking blow-up shows as ns/char climbing with size.
+
+The fuzz then feeds randomly corrupted .docx and .pdf worksheets through
+sandbox.sandboxed_parse. Every file must either parse or fail with
+PYEParseError inside the timeout; anything else is reported and the run exits
+with status 1.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from passages.benchmarks.corpus import CorpusSpec, write_spec
+
+HEADER = ["Adversarial Title", "Passage.", "Questions to Answer"]
+FOOTER = ["Answer Key", "A (x)"]
+
+
+def _repeat(unit: str, chars: int) -> str:
+    return unit * max(1, chars // len(unit))
+
+
+SHAPES = {
+    "marker-storm": lambda n: HEADER + [_repeat("1. A. B) 2) C. D. ", n)] + FOOTER,
+    "digit-whitespace": lambda n: HEADER + [_repeat("1" + " " * 200, n)] + FOOTER,
+    "choice-lookahead": lambda n: HEADER + ["1. Q?", _repeat("A.B.C.D.", n)] + FOOTER,
+    "quote-runs": lambda n: HEADER + ["1. Q?", _repeat('A. "“” ', n)] + FOOTER,
+    "one-paragraph": lambda n: [_repeat("word ", n)],
+    "many-questions": lambda n: HEADER + [f"{i % 99 + 1}. q" for i in range(n // 6)] + FOOTER,
+}
+
+
+def time_shapes(sizes: list[int]) -> None:
+    from passages.pye_parser import PYEParseError, parse_pye
+
+    print(f"{'shape':<18} {'chars':>9} {'seconds':>9} {'ns/char':>9} {'result':>8}")
+    worst = 0.0
+    for shape, build in SHAPES.items():
+        for size in sizes:
+            paragraphs = build(size)
+            chars = sum(map(len, paragraphs))
+            started = time.perf_counter()
+            try:
+                parse_pye(paragraphs)
+                result = "parsed"
+            except PYEParseError:
+                result = "error"
+            elapsed = time.perf_counter() - started
+            worst = max(worst, elapsed)
+            print(f"{shape:<18} {chars:>9} {elapsed:>9.3f} {elapsed / chars * 1e9:>9.0f} {result:>8}")
+    print(f"worst case: {worst:.3f}s")
+
+
+def _mutate(rng: random.Random, data: bytes) -> bytes:
+    data = bytearray(data)
+    action = rng.choice(["flip", "truncate", "splice", "zero"])
+    if action == "flip":
+        for _ in range(rng.randint(1, 20)):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+    elif action == "truncate":
+        del data[rng.randrange(len(data)):]
+    elif action == "splice":
+        start = rng.randrange(len(data))
+        chunk = data[start:start + rng.randint(1, 4096)]
+        at = rng.randrange(len(data))
+        data[at:at] = chunk * rng.randint(1, 50)
+    else:
+        start = rng.randrange(len(data))
+        data[start:start + rng.randint(1, 2048)] = b"\0" * len(data[start:start + 2048])
+    return bytes(data)
+
+
+def fuzz(iterations: int, timeout: float, seed: int) -> int:
+    from passages.pye_parser import PYEParseError
+    from passages.sandbox import ParseLimits, sandboxed_parse
+
+    limits = ParseLimits(timeout=timeout)
+    rng = random.Random(seed)
+    outcomes = Counter()
+    failures = []
+    worst = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        seeds = [
+            (path.name, path.read_bytes())
+            for path in (
+                write_spec(CorpusSpec(10, 8, format=fmt, choice_tables=tables, seed=seed), tmp)
+                for fmt, tables in [("docx", False), ("docx", True), ("pdf", False)]
+            )
+        ]
+    for iteration in range(iterations):
+        name, data = rng.choice(seeds)
+        mutated = _mutate(rng, data)
+        started = time.perf_counter()
+        try:
+            sandboxed_parse(mutated, name, limits)
+            outcomes["parsed"] += 1
+        except PYEParseError as exc:
+            outcomes["timeout" if "took longer" in str(exc) else "PYEParseError"] += 1
+        except Exception as exc:     # anything else is a sandbox bug
+            outcomes["other"] += 1
+            failures.append(f"#{iteration} {name}: {exc!r}")
+        worst = max(worst, time.perf_counter() - started)
+
+    print(f"\nfuzzed {iterations} mutated files: " + ", ".join(f"{k} {v}" for k, v in sorted(outcomes.items())))
+    print(f"slowest sandboxed parse: {worst:.3f}s (timeout {timeout:g}s)")
+    for failure in failures:
+        print("  " + failure)
+    return 1 if failures or worst > timeout + 2 else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chars", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--fuzz", type=int, default=200, help="Mutated files to parse (0 to skip)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Sandbox timeout for the fuzz")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    logging.getLogger("pypdf").setLevel(logging.CRITICAL)     # corrupt PDFs are the point
+    time_shapes(args.chars)
+    return fuzz(args.fuzz, args.timeout, args.seed) if args.fuzz else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Time and peak allocations of parse_pye as documents grow.
+
+    python -m passages.benchmarks.parse_scaling [--questions 250 1000 4000] [--repeat 3]
+
+"many" grows the number of questions; "long" keeps 20 questions and grows the
+text of each one, so both the per-marker and per-character costs show up.
+A linear parser keeps the "ns/char" column flat as the size grows.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from passages.benchmarks.corpus import _sentence, build_pye_paragraphs
+from passages.pye_parser import parse_pye
+
+
+def _many_questions(size: int) -> list[str]:
+    return build_pye_paragraphs(passage_paragraphs=20, questions=size, seed=size)
+
+
+def _long_questions(size: int) -> list[str]:
+    rng = random.Random(size)
+    paragraphs = build_pye_paragraphs(passage_paragraphs=20, questions=20, seed=size)
+    start = paragraphs.index("Questions to Answer") + 1
+    # Stretch each question stem by size/20 sentences, wrapped over several paragraphs.
+    stretched = []
+    for paragraph in paragraphs[start:]:
+        stretched.append(paragraph)
+        if paragraph[:1].isdigit():
+            stretched += [_sentence(rng) for _ in range(size // 20)]
+    return paragraphs[:start] + stretched
+
+
+SHAPES = {"many": _many_questions, "long": _long_questions}
+
+
+def _measure(paragraphs: list[str], repeat: int) -> tuple[float, float]:
+    elapsed = min(_timed(paragraphs) for _ in range(repeat))
+    tracemalloc.start()
+    parse_pye(paragraphs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def _timed(paragraphs: list[str]) -> float:
+    started = time.perf_counter()
+    parse_pye(paragraphs)
+    return time.perf_counter() - started
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, nargs="+", default=[250, 1000, 4000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'shape':>6} {'size':>6} {'chars':>10} {'seconds':>9} {'peak MiB':>9} {'ns/char':>8}")
+    for shape, build in SHAPES.items():
+        for size in args.questions:
+            paragraphs = build(size)
+            chars = sum(len(p) for p in paragraphs)
+            elapsed, peak = _measure(paragraphs, args.repeat)
+            print(f"{shape:>6} {size:>6} {chars:>10} {elapsed:>9.3f} {peak:>9.2f} {elapsed / chars * 1e9:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Peak memory and time of eager, streaming and page-parallel PDF parsing.
+
+    python -m passages.benchmarks.pdf_streaming [--pages 60 120 240] [--workers 4] [--previous REV]
+
+"eager" extracts every page into a list before parsing (extract_pdf_paragraphs);
+"streaming" feeds the page-by-page generator straight into parse_pye;
+"parallel" extracts page ranges in a pool of --workers processes (peak memory
+is the parent's only). With --previous, "previous" runs passages/pye_parser.py
+as it was at git revision REV, e.g. the parser from before streaming:
+
+    --previous "$(git log -1 --format=%h --grep='Stream PDF pages')^"
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+from passages.benchmarks.corpus import build_pye_paragraphs, write_pdf
+from passages.pye_parser import extract_pdf_paragraphs, iter_pdf_paragraphs, parse_pye
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_parser_at(revision: str) -> types.ModuleType:
+    """passages/pye_parser.py as of git `revision`, loaded as a standalone module (it must not use relative imports)."""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:passages/pye_parser.py"],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    module = types.ModuleType(f"pye_parser_at_{revision}")
+    sys.modules[module.__name__] = module     # dataclasses look their module up
+    exec(compile(source, f"{revision}:passages/pye_parser.py", "exec"), module.__dict__)
+    return module
+
+
+def _modes(workers: int, previous: types.ModuleType | None = None) -> dict:
+    modes = {}
+    if previous is not None:
+        modes["previous"] = lambda path: previous.parse_pye(previous.extract_pdf_paragraphs(path))
+    modes.update({
+        "eager": lambda path: parse_pye(extract_pdf_paragraphs(path)),
+        "streaming": lambda path: parse_pye(iter_pdf_paragraphs(path)),
+        "parallel": lambda path: parse_pye(extract_pdf_paragraphs(path, workers=workers)),
+    })
+    return modes
+
+
+def _measure(fn, path) -> tuple[float, float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    parsed = fn(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The parsed passage is kept either way; report it so the overhead is visible.
+    output = len(parsed.passage) + sum(len(q.text) for q in parsed.questions)
+    return elapsed, peak / (1024 * 1024), output / (1024 * 1024)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[60, 120, 240])
+    parser.add_argument("--workers", type=int, default=4, help="Processes for the parallel mode (default: 4)")
+    parser.add_argument("--previous", metavar="REV", help="Also time the parser at this git revision")
+    args = parser.parse_args(argv)
+    modes = _modes(args.workers, load_parser_at(args.previous) if args.previous else None)
+
+    print(f"{'pages':>6} {'mode':>10} {'seconds':>9} {'peak MiB':>9} {'output MiB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for target_pages in args.pages:
+            # ~55 lines per page, and each passage paragraph wraps to ~4-5 lines.
+            paragraphs = build_pye_paragraphs(
+                passage_paragraphs=target_pages * 12, questions=40, seed=target_pages,
+            )
+            path = Path(tmp) / f"packet_{target_pages}.pdf"
+            pages = write_pdf(paragraphs, path)
+            for mode, fn in modes.items():
+                elapsed, peak, output = _measure(fn, path)
+                print(f"{pages:>6} {mode:>10} {elapsed:>9.3f} {peak:>9.2f} {output:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Bulk import of PYE files from folders and zip archives (`import_pye_corpus`).
+
+Files are parsed in worker processes with the pure formats/pye_parser
+functions (either quiz grammar is accepted); the
+parent process writes the results to the database in batched transactions and
+appends every committed file to a state file, so an interrupted run can be
+resumed without importing anything twice.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from . import facets
+from .formats import parse_upload
+from .importer import create_parsed_questions, stamp_parser_version
+from .models import UploadedDocument
+from .pye_parser import (
+    SUPPORTED_EXTENSIONS, PYEParseError, format_validation_errors, parsed_doc_from_dict, parsed_doc_to_dict,
+)
+from .search import index_documents
+
+STATUS_IMPORTED = "imported"
+STATUS_FAILED = "failed"
+
+
+@dataclass(frozen=True)
+class CorpusFile:
+    """One importable file: a path on disk, or a member of a zip archive."""
+    path: str
+    member: str | None = None
+
+    @property
+    def source(self) -> str:
+        """Stable identifier used in the state file and error report."""
+        return f"{self.path}!{self.member}" if self.member else self.path
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name if self.member else Path(self.path).name
+
+    def read_bytes(self) -> bytes:
+        if self.member is None:
+            return Path(self.path).read_bytes()
+        with zipfile.ZipFile(self.path) as archive:
+            return archive.read(self.member)
+
+
+@dataclass
+class ParseOutcome:
+    """Result of parsing one CorpusFile in a worker; picklable."""
+    file: CorpusFile
+    content_hash: str = ""
+    parsed: dict | None = None
+    problems: list[str] = field(default_factory=list)
+    grammar: str = ""
+    extracted_hash: str = ""
+    error: str = ""
+    document_id: int | None = None
+
+    @property
+    def question_count(self) -> int:
+        return len(self.parsed["questions"]) if self.parsed else 0
+
+
+def _is_supported(name: str) -> bool:
+    return Path(name).suffix.lower() in SUPPORTED_EXTENSIONS and not Path(name).name.startswith(("~$", "."))
+
+
+def _archive_members(path: Path) -> Iterator[CorpusFile]:
+    with zipfile.ZipFile(path) as archive:
+        names = sorted(
+            info.filename for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        )
+    for name in names:
+        if _is_supported(name):
+            yield CorpusFile(str(path), name)
+
+
+def discover_files(paths: Iterable[str | os.PathLike]) -> Iterator[CorpusFile]:
+    """
+    Yield every .docx/.pdf under `paths` in a stable order.
+
+    Directories are walked recursively and zip archives (also inside
+    directories) are opened and their members listed.
+    """
+    for root in paths:
+        root = Path(root)
+        if root.is_dir():
+            candidates = sorted(p for p in root.rglob("*") if p.is_file())
+        else:
+            candidates = [root]
+        for candidate in candidates:
+            if candidate.suffix.lower() == ".zip":
+                yield from _archive_members(candidate)
+            elif _is_supported(candidate.name):
+                yield CorpusFile(str(candidate))
+
+
+def parse_corpus_file(corpus_file: CorpusFile, strict: bool = False) -> ParseOutcome:
+    """
+    Parse one file. Runs in a worker process, so it never touches the database.
+
+    Parse failures are returned in `error` instead of raised, so one bad file
+    cannot stop the pool. With `strict`, validation problems count as a failure.
+    """
+    outcome = ParseOutcome(file=corpus_file)
+    try:
+        data = corpus_file.read_bytes()
+        outcome.content_hash = hashlib.sha256(data).hexdigest()
+        parsed, outcome.problems, outcome.grammar, outcome.extracted_hash = parse_upload(
+            io.BytesIO(data), file_name=corpus_file.name,
+        )
+        if outcome.problems and strict:
+            raise PYEParseError(format_validation_errors(outcome.problems))
+        outcome.parsed = parsed_doc_to_dict(parsed)
+    except PYEParseError as exc:
+        outcome.error = str(exc)
+    except Exception as exc:
+        outcome.error = f"Unexpected parser error: {exc}"
+    return outcome
+
+
+def write_batch(outcomes: list[ParseOutcome], *, uploader=None) -> int:
+    """
+    Create documents, questions and choices for successfully parsed files in
+    one transaction. Returns the number of questions written.
+    """
+    pairs = []
+    with transaction.atomic():
+        for outcome in outcomes:
+            parsed = parsed_doc_from_dict(outcome.parsed)
+            document = UploadedDocument(
+                title=(parsed.title or Path(outcome.file.name).stem)[:255],
+                parsed_text=parsed.passage,
+                uploader=uploader,
+            )
+            stamp_parser_version(document, parsed, outcome.extracted_hash)
+            document.summarize_text()       # bulk_create skips save()
+            document.file.save(outcome.file.name, ContentFile(outcome.file.read_bytes()), save=False)
+            pairs.append((document, parsed))
+        UploadedDocument.objects.bulk_create([document for document, _ in pairs])
+        questions = create_parsed_questions(pairs)
+        index_documents(*(document.pk for document, _ in pairs))
+        facets.invalidate()
+
+    for outcome, (document, _) in zip(outcomes, pairs):
+        outcome.document_id = document.pk
+    return questions
+
+
+class ImportState:
+    """
+    Append-only JSON-lines record of files already committed to the database.
+
+    A line is written only after its batch's transaction commits, so files in
+    an interrupted batch are simply imported again on the next run.
+    """
+
+    def __init__(self, path: str | os.PathLike | None):
+        self.path = Path(path) if path else None
+        self.imported: set[str] = set()
+        if self.path and self.path.exists():
+            with self.path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry.get("status") == STATUS_IMPORTED:
+                        self.imported.add(entry["source"])
+
+    def reset(self) -> None:
+        """Forget earlier runs, so every file is imported again."""
+        self.imported.clear()
+        if self.path and self.path.exists():
+            self.path.unlink()
+
+    def record(self, outcomes: list[ParseOutcome]) -> None:
+        if self.path is None or not outcomes:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as fh:
+            for outcome in outcomes:
+                entry = {"source": outcome.file.source, "content_hash": outcome.content_hash}
+                if outcome.error:
+                    entry.update(status=STATUS_FAILED, error=outcome.error)
+                else:
+                    entry.update(status=STATUS_IMPORTED, document_id=outcome.document_id)
+                fh.write(json.dumps(entry) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.imported.update(o.file.source for o in outcomes if not o.error)
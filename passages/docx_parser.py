@@ -4,11 +4,12 @@ import re
 from dataclasses import dataclass, field
 from typing import Iterable
 
-from docx import Document # the library that actually opens .docx files 
 from docx.document import Document as DocxDocument
 from docx.table import Table
 from docx.text.paragraph import Paragraph
 
+from .docx_reader import PARAGRAPH, DocxBlock, iter_docx_blocks, iter_python_docx_blocks
+
 
 QUESTION_START_RE = re.compile(r'^(?:Q(?:uestion)?\s*)?(\d+)[\).:-]\s*(.+)$', re.IGNORECASE)
 OPTION_RE = re.compile(r'^(?:[-*•]\s*)?([A-D])[\).:-]\s*(.+)$', re.IGNORECASE)
@@ -44,31 +45,24 @@ def iter_block_items(document: DocxDocument) -> Iterable[Paragraph | Table]:
             yield Table(child, document)
 
 
-def _clean_text(value: str) -> str:
+def clean_text(value: str) -> str:
     return ' '.join(value.replace('\xa0', ' ').split()).strip()
 
 
-def _table_to_lines(table: Table) -> list[str]:
-    lines: list[str] = []
-    for row in table.rows:
-        cell_texts = [_clean_text(cell.text) for cell in row.cells]
-        row_text = [text for text in cell_texts if text]
-        if row_text:
-            lines.extend(row_text)
-    return lines
+def block_lines(block: DocxBlock) -> list[str]:
+    # Paragraphs keep their (possibly empty) line; table rows contribute only
+    # their non-empty cells. Merged cells come through once.
+    if block.kind == PARAGRAPH:
+        return [clean_text(block.text)]
+    return [text for text in map(clean_text, block.cells) if text]
 
 
-def extract_lines(document: DocxDocument) -> list[str]:
-    lines: list[str] = []
+def blocks_to_lines(blocks: Iterable[DocxBlock]) -> list[str]:
+    return [line for block in blocks for line in block_lines(block)]
 
-    for block in iter_block_items(document):
-        if isinstance(block, Paragraph):
-            text = _clean_text(block.text)
-            lines.append(text)
-        else:
-            lines.extend(_table_to_lines(block))
 
-    return lines
+def extract_lines(document: DocxDocument) -> list[str]:
+    return blocks_to_lines(iter_python_docx_blocks(document))
 
 
 def _split_combined_choices(line: str) -> list[tuple[str, str]]:
@@ -79,7 +73,7 @@ def _split_combined_choices(line: str) -> list[tuple[str, str]]:
     choices: list[tuple[str, str]] = []
     for match in matches:
         letter = match.group(1).upper()
-        text = _clean_text(match.group(2))
+        text = clean_text(match.group(2))
         if text:
             choices.append((letter, text))
     return choices
@@ -107,7 +101,12 @@ def _strip_enclosing_parens(text: str) -> str:
 def parse_document(document: DocxDocument) -> ParsedDocument:
     """Parse a DOCX document into passage text and quiz question data."""
 
-    lines = extract_lines(document)
+    return parse_lines(extract_lines(document))
+
+
+def parse_lines(lines: list[str]) -> ParsedDocument:
+    """Parse the cleaned lines of a DOCX document (see `extract_lines`)."""
+
     passage_lines: list[str] = []
     questions: list[dict] = []
     current_question: dict | None = None
@@ -119,8 +118,8 @@ def parse_document(document: DocxDocument) -> ParsedDocument:
     def flush_question() -> None:
         nonlocal current_question, explanation_mode
         if current_question:
-            current_question['question_text'] = _clean_text(current_question['question_text'])
-            current_question['explanation'] = _clean_text(current_question['explanation'])
+            current_question['question_text'] = clean_text(current_question['question_text'])
+            current_question['explanation'] = clean_text(current_question['explanation'])
             questions.append(current_question)
         current_question = None
         explanation_mode = False
@@ -133,7 +132,7 @@ def parse_document(document: DocxDocument) -> ParsedDocument:
         question['correct_choice'] = letter
         explanation_text = _strip_enclosing_parens(explanation_text)
         if explanation_text:
-            question['explanation'] = _clean_text(explanation_text)
+            question['explanation'] = clean_text(explanation_text)
         for answer in question['answers']:
             answer['is_correct'] = answer['choice_letter'] == letter
         answer_key_index += 1
@@ -231,5 +230,4 @@ def parse_uploaded_docx(file_obj) -> ParsedDocument: #import the file step
     if hasattr(file_obj, 'seek'):
         file_obj.seek(0)
 
-    document = Document(file_obj)
-    return parse_document(document)
\ No newline at end of file
+    return parse_lines(blocks_to_lines(iter_docx_blocks(file_obj)))
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Streaming text reader for .docx uploads.
+
+Opens the .docx zip and iterparses word/document.xml, yielding body paragraphs
+and table rows in document order without building a python-docx Document.
+Text matches python-docx's Paragraph.text and _Cell.text, except that a merged
+table cell is yielded once instead of once per grid column/row it spans.
+
+Packages the reader does not handle (no word/document.xml part, Strict OOXML,
+not a zip at all) are read with python-docx instead, which also raises the
+same errors for broken files as before.
+"""
+from __future__ import annotations
+
+import zipfile
+from typing import Iterator, NamedTuple
+from xml.etree import ElementTree
+
+import docx  # python-docx, for the fallback path
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCUMENT = f"{_W}document"
+_P = f"{_W}p"
+_R = f"{_W}r"
+_HYPERLINK = f"{_W}hyperlink"
+_TBL = f"{_W}tbl"
+_TR = f"{_W}tr"
+_TC = f"{_W}tc"
+_TC_PR = f"{_W}tcPr"
+_V_MERGE = f"{_W}vMerge"
+_VAL = f"{_W}val"
+_BR_TYPE = f"{_W}type"
+
+# Run children python-docx turns into text (CT_R.text); everything else is ignored.
+_RUN_TEXT = {
+    f"{_W}tab": "\t",
+    f"{_W}ptab": "\t",
+    f"{_W}cr": "\n",
+    f"{_W}noBreakHyphen": "-",
+}
+
+MAIN_PART = "word/document.xml"
+
+PARAGRAPH = "paragraph"
+ROW = "row"
+
+
+class DocxBlock(NamedTuple):
+    """A body paragraph (`text`) or a table row (`cells`), in document order."""
+    kind: str
+    text: str = ""
+    cells: tuple[str, ...] = ()
+
+
+class _Unsupported(Exception):
+    """The package needs python-docx; raised before anything has been yielded."""
+
+
+def _run_text(run) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == f"{_W}t":
+            parts.append(child.text or "")
+        elif tag == f"{_W}br":
+            # Page and column breaks have no text equivalent.
+            if child.get(_BR_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+    return "".join(parts)
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for child in p:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(r) for r in child if r.tag == _R)
+    return "".join(parts)
+
+
+def _is_merge_continuation(tc) -> bool:
+    tc_pr = tc.find(_TC_PR)
+    v_merge = tc_pr.find(_V_MERGE) if tc_pr is not None else None
+    return v_merge is not None and v_merge.get(_VAL, "continue") == "continue"
+
+
+def _open_main_part(source):
+    try:
+        archive = zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError) as exc:
+        raise _Unsupported from exc
+    try:
+        return archive, archive.open(MAIN_PART)
+    except KeyError as exc:
+        # Renamed main part: python-docx resolves it through the package rels.
+        archive.close()
+        raise _Unsupported from exc
+
+
+def _iter_xml_blocks(source) -> Iterator[DocxBlock]:
+    archive, part = _open_main_part(source)
+    with archive, part:
+        events = ElementTree.iterparse(part, events=("start", "end"))
+        _, root = next(events)
+        if root.tag != _DOCUMENT:
+            raise _Unsupported(root.tag)
+        yield from _walk(events)
+
+
+def _walk(events) -> Iterator[DocxBlock]:
+    # `path` holds the open elements below <w:document>; only body-level
+    # paragraphs and the cells of body-level tables are read.
+    path: list = []
+    for event, elem in events:
+        if event == "start":
+            path.append(elem)
+            continue
+        if not path:
+            break               # </w:document>
+        path.pop()
+        depth = len(path)
+        tag = elem.tag
+        if depth == 1 and tag == _P:
+            yield DocxBlock(PARAGRAPH, _paragraph_text(elem))
+        elif depth == 2 and tag == _TR:
+            yield DocxBlock(ROW, cells=tuple(
+                "\n".join(_paragraph_text(p) for p in tc.iterfind(_P))
+                for tc in elem.iterfind(_TC)
+                if not _is_merge_continuation(tc)
+            ))
+        elif depth != 1:
+            continue
+        # Drop what has been read so memory stays flat on long documents.
+        elem.clear()
+        if depth == 1:
+            path[0].remove(elem)
+
+
+def iter_python_docx_blocks(document) -> Iterator[DocxBlock]:
+    """The same blocks as `iter_docx_blocks`, read from a python-docx Document."""
+    for child in document.element.body.iterchildren():
+        if child.tag == _P:
+            yield DocxBlock(PARAGRAPH, _paragraph_text(child))
+        elif child.tag == _TBL:
+            for tr in child.iterchildren(_TR):
+                yield DocxBlock(ROW, cells=tuple(
+                    "\n".join(_paragraph_text(p) for p in tc.iterchildren(_P))
+                    for tc in tr.iterchildren(_TC)
+                    if not _is_merge_continuation(tc)
+                ))
+
+
+def iter_docx_blocks(source) -> Iterator[DocxBlock]:
+    """
+    Yield the paragraphs and table rows of a .docx `source` (path or binary
+    file-like object) in body order.
+    """
+    blocks = _iter_xml_blocks(source)
+    try:
+        first = next(blocks)
+    except StopIteration:
+        return
+    except _Unsupported:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        yield from iter_python_docx_blocks(docx.Document(source))
+        return
+    yield first
+    yield from blocks
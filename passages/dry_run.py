@@ -0,0 +1,141 @@
+"""
+Validate-only uploads (`/api/documents/validate/`) and committing them by token.
+
+Validation parses the file exactly as an import would (parse_cache.parse_file,
+so within the sandbox limits and sharing the parse cache) but writes nothing
+to the database. The bytes and the parse are kept under a random token for
+TOKEN_TTL: `commit_validated` then stores that file and imports that parse,
+with no second upload and no second parse. Tokens are single-use and tied to
+the teacher who validated.
+
+Token entries live in the file-based "dry_run" cache alias, so every web
+process sees them and no other cache's culling can evict them; the bytes wait
+under settings.UPLOAD_STAGING["DIR"]/validated/. If the import fails, the
+stored copy of the file is deleted along with the rolled-back rows.
+"""
+from __future__ import annotations
+
+import re
+import secrets
+import shutil
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files import File
+from django.db import transaction
+
+from .formats import ParseResult
+from .importer import import_parsed_doc
+from .ingestion import record_import
+from .models import IngestionJob, UploadedDocument
+from .parse_cache import parse_file
+from .pye_parser import parsed_doc_from_dict, parsed_doc_to_dict
+from .serializers import UploadedDocumentSerializer
+
+CACHE_ALIAS = "dry_run"
+TOKEN_TTL = timedelta(minutes=30)
+_QUESTION_PROBLEM_RE = re.compile(r"^Q(\d+):\s*")
+
+
+class ValidationTokenError(Exception):
+    """The token is unknown, expired, already used or belongs to someone else."""
+
+
+def _key(token: str) -> str:
+    return f"dry-run:{token}"
+
+
+def _staging_root() -> Path:
+    return Path(settings.UPLOAD_STAGING["DIR"]) / "validated"
+
+
+def structure_problems(problems: list[str]) -> list[dict]:
+    """Split validate()'s "Q3: ..." messages into {"question": 3, "message": "..."}."""
+    structured = []
+    for problem in problems:
+        match = _QUESTION_PROBLEM_RE.match(problem)
+        structured.append({
+            "question": int(match.group(1)) if match else None,
+            "message": problem[match.end():] if match else problem,
+        })
+    return structured
+
+
+def validate_upload(fileobj, file_name: str, user) -> tuple[str, ParseResult]:
+    """
+    Parse an upload without saving anything to the database. Returns a commit
+    token and the parse. PYEParseError propagates for unreadable files.
+    """
+    result = parse_file(fileobj, file_name=file_name)
+
+    token = secrets.token_urlsafe(24)
+    staged = _staging_root() / token / Path(file_name).name
+    staged.parent.mkdir(parents=True, exist_ok=True)
+    fileobj.seek(0)
+    with staged.open('wb') as out:
+        shutil.copyfileobj(fileobj, out)
+
+    caches[CACHE_ALIAS].set(_key(token), {
+        "user_id": user.pk,
+        "staged_path": str(staged),
+        "parsed": parsed_doc_to_dict(result.parsed),
+        "problems": list(result.problems),
+        "grammar": result.grammar,
+        "extracted_hash": result.extracted_hash,
+    }, timeout=TOKEN_TTL.total_seconds())
+    return token, result
+
+
+def commit_validated(token: str, user, metadata: dict | None = None) -> tuple[UploadedDocument, IngestionJob]:
+    """
+    Store the validated file and import its parse. `metadata` holds the
+    UploadedDocument fields; the title defaults to the parsed title.
+    """
+    cache = caches[CACHE_ALIAS]
+    entry = cache.get(_key(token))
+    if entry is None or entry["user_id"] != user.pk:
+        raise ValidationTokenError("This validation has expired or was already used. Upload the file again.")
+    staged = Path(entry["staged_path"])
+    result = ParseResult(
+        parsed_doc_from_dict(entry["parsed"]), entry["problems"], entry["grammar"], entry["extracted_hash"],
+    )
+
+    metadata = dict(metadata or {})
+    metadata.setdefault("title", result.parsed.title or staged.stem)
+    serializer = UploadedDocumentSerializer(data=metadata, partial=True)
+    serializer.is_valid(raise_exception=True)
+    if not cache.delete(_key(token)):       # another request committed it first
+        raise ValidationTokenError("This validation has expired or was already used. Upload the file again.")
+
+    document = None
+    try:
+        with transaction.atomic():
+            document = serializer.save(uploader=user)
+            with staged.open('rb') as fh:
+                document.file.save(staged.name, File(fh), save=True)
+            import_parsed_doc(document, result.parsed, extracted_hash=result.extracted_hash)
+            job = record_import(document, result)
+    except BaseException:
+        if document is not None and document.file:
+            document.file.delete(save=False)    # the row was rolled back; do not leave its file behind
+        raise
+    finally:
+        shutil.rmtree(staged.parent, ignore_errors=True)
+    return document, job
+
+
+def purge_expired_validations(max_age: timedelta = TOKEN_TTL) -> int:
+    """Delete staged files of tokens older than `max_age`. Returns how many."""
+    root = _staging_root()
+    if not root.is_dir():
+        return 0
+    cutoff = time.time() - max_age.total_seconds()
+    purged = 0
+    for folder in root.iterdir():
+        if folder.stat().st_mtime < cutoff:
+            shutil.rmtree(folder, ignore_errors=True)
+            purged += 1
+    return purged
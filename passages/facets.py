@@ -0,0 +1,129 @@
+"""
+Catalog filters, and the counts behind their options (GET /api/documents/facets/).
+
+`filter_catalog` is the one definition of the catalog's query-string filters
+(?grade_level=&skill_category=&topic=&program=&difficulty=&topic_name=&search=);
+the document list, full-text search and facet counts all go through it.
+
+`facet_counts` runs one grouped COUNT per facet. A facet is counted with
+every filter applied except its own, so while an option is selected the
+others still show how many documents choosing them instead would give.
+Composite indexes led by `program` (and one led by `difficulty`) let the
+grouped counts read an index instead of the table.
+
+Counts are cached in the "facets" cache alias, keyed by the filter
+combination and a catalog generation. `invalidate` bumps the generation once
+the current transaction commits; the document API, uploads, the corpus
+importer and the admin call it wherever documents are created, deleted or
+re-tagged. Entries also expire after FACET_CACHE_TIMEOUT, which bounds how
+stale counts get through paths that do not call it (a renamed topic, rows
+loaded with raw SQL, or another process's LocMem cache).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from typing import Mapping
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .models import UploadedDocument
+
+CACHE_ALIAS = "facets"
+GENERATION_KEY = "facets:generation"
+RELATED_FACETS = ("grade_level", "skill_category", "topic")
+CHOICE_FACETS = ("program", "difficulty")
+FACETS = RELATED_FACETS + CHOICE_FACETS
+FILTERS = FACETS + ("topic_name", "search")
+
+
+def catalog_filters(params: Mapping[str, str]) -> dict[str, str]:
+    """The catalog filters set in `params` (e.g. request.query_params), without empty ones."""
+    return {name: params[name] for name in FILTERS if params.get(name)}
+
+
+def filter_catalog(queryset, params: Mapping[str, str], *, skip: str | None = None):
+    """`queryset` narrowed by the catalog filters in `params`, except `skip`."""
+    from .search import matching
+
+    filters = catalog_filters(params)
+    filters.pop(skip, None)
+    for field in RELATED_FACETS:
+        if field in filters:
+            queryset = queryset.filter(**{f"{field}_id": filters[field]})
+    for field in CHOICE_FACETS:
+        if field in filters:
+            queryset = queryset.filter(**{field: filters[field]})
+    if "topic_name" in filters:
+        queryset = queryset.filter(topic__name__iexact=filters["topic_name"])
+    if "search" in filters:
+        queryset = matching(queryset, filters["search"])
+    return queryset
+
+
+def _count_facet(facet: str, filters: dict[str, str]) -> tuple[list[dict], int]:
+    """Options of one facet with their counts, and the count of documents it was taken over."""
+    queryset = filter_catalog(UploadedDocument.objects.order_by(), filters, skip=facet)
+    if facet in RELATED_FACETS:
+        rows = list(queryset.values_list(f"{facet}_id", f"{facet}__name").annotate(count=Count("id")))
+        options = sorted(
+            ({"value": value, "label": label, "count": count} for value, label, count in rows if value is not None),
+            key=lambda option: (option["label"], option["value"]),
+        )
+    else:
+        rows = list(queryset.values_list(facet).annotate(count=Count("id")))
+        counts = dict(rows)
+        options = [
+            {"value": value, "label": str(label), "count": counts[value]}
+            for value, label in UploadedDocument._meta.get_field(facet).choices if counts.get(value)
+        ]
+    matching = sum(row[-1] for row in rows)
+    if facet in filters:
+        # Only the selected option's documents match every filter.
+        matching = sum(option["count"] for option in options if str(option["value"]) == filters[facet])
+    return options, matching
+
+
+def count_facets(filters: dict[str, str]) -> dict:
+    """{"total", "facets": {facet: [{value, label, count}, ...]}} computed from the database."""
+    facets, total = {}, None
+    for facet in FACETS:
+        facets[facet], matching = _count_facet(facet, filters)
+        if total is None:
+            total = matching
+    return {"total": total, "facets": facets}
+
+
+def _generation(cache) -> int:
+    # Seeded with the clock, so a generation lost to eviction cannot come back to an old value.
+    cache.add(GENERATION_KEY, time.time_ns(), None)
+    return cache.get(GENERATION_KEY) or 0
+
+
+def facet_counts(params: Mapping[str, str]) -> dict:
+    """Facet counts for the catalog filters in `params`, from the cache when the catalog has not changed."""
+    filters = catalog_filters(params)
+    cache = caches[CACHE_ALIAS]
+    digest = hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = f"facets:{_generation(cache)}:{digest}"
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_facets(filters)
+        cache.set(key, counts)
+    return counts
+
+
+def _bump_generation() -> None:
+    cache = caches[CACHE_ALIAS]
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def invalidate() -> None:
+    """Drop cached counts after documents are created, deleted or re-tagged (on commit, when in a transaction)."""
+    transaction.on_commit(_bump_generation)
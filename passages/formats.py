@@ -0,0 +1,263 @@
+"""
+Single ingestion front end for uploaded quiz documents.
+
+An upload is decoded exactly once, by `iter_source`, into a stream of blocks
+that carry the two line views the parsers need: the raw body paragraph that
+`parse_pye` reads, and the cleaned lines (table cells included) that
+`docx_parser.parse_lines` reads. `parse_source` picks the grammar from a
+bounded prefix of that stream (up to GRAMMAR_PREFIX_BLOCKS blocks, less once
+the choice is clear) and streams the prefix and the rest into the matching
+parser, hashing the text as it goes, so only the parser's own state and the
+prefix are held. `extract_source` collects the whole stream for callers that
+want both views as lists. Either way the result is a pye_parser.ParsedDoc, so
+validation, caching and the DB writer do not care which grammar matched.
+
+Grammars:
+- "pye": title, passage, a "Questions to Answer" header, then an "Answer Key"
+  with one "B (explanation)" entry per question.
+- "labeled": numbered questions with "Answer: B" / "Explanation: ..." lines
+  under each question (or an answer key without the PYE header).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import deque
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from .docx_parser import (
+    ANSWER_KEY_HEADING_RE, ANSWER_RE, QUESTION_START_RE, ParsedDocument, block_lines, clean_text, parse_lines,
+)
+from .docx_reader import PARAGRAPH, iter_docx_blocks
+from .pye_parser import (
+    QUESTIONS_HEADER_TEXT, Choice, ParsedDoc, Question, extract_paragraphs, parse_pye, parsed_doc_to_dict,
+    source_extension, validate,
+)
+
+GRAMMAR_PYE = "pye"
+GRAMMAR_LABELED = "labeled"
+GRAMMARS = (GRAMMAR_PYE, GRAMMAR_LABELED)
+
+# parse_source decides the grammar within this many blocks of the start...
+GRAMMAR_PREFIX_BLOCKS = 2000
+# ...or sooner: at the first "Answer: X" line, or this many blocks past the PYE
+# header without one (labeled files put one under their first question).
+GRAMMAR_LOOKAHEAD_BLOCKS = 50
+
+
+class Block(NamedTuple):
+    paragraph: str | None   # parse_pye input: a body paragraph / PDF line, uncleaned; None for a table
+    lines: list[str]        # parse_lines input: cleaned, with table cells
+
+
+class Extraction(NamedTuple):
+    paragraphs: list[str]   # parse_pye input: body paragraphs / PDF lines, uncleaned
+    lines: list[str]        # parse_lines input: cleaned, with table cells
+
+
+class ParseResult(NamedTuple):
+    parsed: ParsedDoc
+    problems: list[str]
+    grammar: str
+    extracted_hash: str = ""
+
+
+class _TextHash:
+    """Both line views hashed as they stream past, each view on its own."""
+
+    def __init__(self):
+        self.views = (hashlib.sha256(), hashlib.sha256())
+
+    def update(self, paragraphs: Iterable[str], lines: Iterable[str]) -> None:
+        for digest, view in zip(self.views, (paragraphs, lines)):
+            for line in view:
+                digest.update(line.encode("utf-8"))
+                digest.update(b"\0")
+
+    def hexdigest(self) -> str:
+        return hashlib.sha256(b"".join(digest.digest() for digest in self.views)).hexdigest()
+
+
+def extraction_hash(extraction: Extraction) -> str:
+    """
+    SHA-256 of the extracted text. It changes when the text the parsers see
+    changes, not when the container does (a re-saved .docx with the same text).
+    parse_source computes the same value while streaming.
+    """
+    text_hash = _TextHash()
+    text_hash.update(extraction.paragraphs, extraction.lines)
+    return text_hash.hexdigest()
+
+
+def parsed_doc_hash(parsed: ParsedDoc) -> str:
+    """SHA-256 of a ParsedDoc, to tell whether a re-parse produced anything new."""
+    encoded = json.dumps(parsed_doc_to_dict(parsed), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def iter_source(
+    source, file_name: str | None = None, *, pdf_workers: int = 1, on_text: Callable[[str], None] | None = None,
+) -> Iterator[Block]:
+    """
+    Decode an upload into Blocks, one per paragraph, table or PDF line.
+
+    The readers stream: .docx XML is parsed incrementally and each PDF page
+    is released once its text is read (iter_docx_blocks, iter_pdf_paragraphs).
+    `on_text` is called with each paragraph or table row as it is read, so a
+    caller can stop a runaway document early (see sandbox.parse_with_limits).
+    `pdf_workers` > 1 extracts long PDFs page-parallel instead.
+    """
+    if source_extension(source, file_name) in {"", ".docx"}:
+        for block in iter_docx_blocks(source):
+            if on_text is not None:
+                on_text(block.text if block.kind == PARAGRAPH else " ".join(block.cells))
+            yield Block(block.text if block.kind == PARAGRAPH else None, block_lines(block))
+        return
+
+    # PDFs (and the unsupported-type error) go through the PYE extractor.
+    for paragraph in extract_paragraphs(
+        source, file_name=file_name, stream=pdf_workers <= 1, pdf_workers=pdf_workers,
+    ):
+        if on_text is not None:
+            on_text(paragraph)
+        yield Block(paragraph, [clean_text(paragraph)])
+
+
+def extract_source(
+    source, file_name: str | None = None, *, pdf_workers: int = 1, on_text: Callable[[str], None] | None = None,
+) -> Extraction:
+    """Decode an upload once into both parser line views, held whole. parse_source streams instead."""
+    paragraphs: list[str] = []
+    lines: list[str] = []
+    for block in iter_source(source, file_name, pdf_workers=pdf_workers, on_text=on_text):
+        if block.paragraph is not None:
+            paragraphs.append(block.paragraph)
+        lines.extend(block.lines)
+    return Extraction(paragraphs, lines)
+
+
+class _GrammarSigns:
+    """What grammar detection looks for, collected paragraph by paragraph and line by line."""
+
+    def __init__(self):
+        self.answer_lines = self.pye_header = self.answer_key = self.numbered_questions = False
+        self.blocks_past_header = 0
+
+    def see_paragraph(self, paragraph: str) -> None:
+        self.pye_header = self.pye_header or bool(QUESTIONS_HEADER_TEXT.search(paragraph))
+
+    def see_line(self, line: str) -> None:
+        self.answer_lines = self.answer_lines or bool(ANSWER_RE.match(line))
+        self.answer_key = self.answer_key or bool(ANSWER_KEY_HEADING_RE.match(line))
+        self.numbered_questions = self.numbered_questions or bool(QUESTION_START_RE.match(line))
+
+    def see_block(self, block: Block) -> None:
+        if self.pye_header:
+            self.blocks_past_header += 1
+        if block.paragraph is not None:
+            self.see_paragraph(block.paragraph)
+        for line in block.lines:
+            self.see_line(line)
+
+    @property
+    def settled(self) -> bool:
+        return self.answer_lines or self.blocks_past_header >= GRAMMAR_LOOKAHEAD_BLOCKS
+
+    def grammar(self) -> str:
+        if self.answer_lines:
+            return GRAMMAR_LABELED
+        if self.pye_header:
+            return GRAMMAR_PYE
+        if self.answer_key and self.numbered_questions:
+            return GRAMMAR_LABELED
+        return GRAMMAR_PYE
+
+
+def detect_grammar(extraction: Extraction) -> str:
+    """
+    "labeled" when questions carry their own "Answer: X" lines, or when there is
+    an answer key and numbered questions but no PYE "Questions to Answer"
+    header; "pye" otherwise, so malformed PYE files still get its format errors.
+    """
+    signs = _GrammarSigns()
+    for paragraph in extraction.paragraphs:
+        signs.see_paragraph(paragraph)
+    for line in extraction.lines:
+        signs.see_line(line)
+    return signs.grammar()
+
+
+def labeled_to_parsed_doc(document: ParsedDocument) -> ParsedDoc:
+    """Map docx_parser's dict output onto the ParsedDoc shape. Labeled files have no title line."""
+    return ParsedDoc(
+        title="",
+        passage=document.parsed_text,
+        questions=[
+            Question(
+                number=number,
+                text=q["question_text"],
+                choices=[Choice(a["choice_letter"], a["choice_text"], a["is_correct"]) for a in q["answers"]],
+                correct_letter=q["correct_choice"],
+                explanation=q["explanation"],
+            )
+            for number, q in enumerate(document.questions, start=1)
+        ],
+    )
+
+
+def parse_extraction(extraction: Extraction, grammar: str | None = None) -> ParseResult:
+    grammar = grammar or detect_grammar(extraction)
+    if grammar == GRAMMAR_LABELED:
+        parsed = labeled_to_parsed_doc(parse_lines(extraction.lines))
+    else:
+        parsed = parse_pye(extraction.paragraphs)
+    return ParseResult(parsed, validate(parsed), grammar, extraction_hash(extraction))
+
+
+def _replay(prefix: deque, rest: Iterator[Block], text_hash: _TextHash) -> Iterator[Block]:
+    """The buffered prefix, released block by block, then the rest of the stream; all of it hashed."""
+    while prefix:
+        block = prefix.popleft()
+        text_hash.update([block.paragraph] if block.paragraph is not None else [], block.lines)
+        yield block
+    for block in rest:
+        text_hash.update([block.paragraph] if block.paragraph is not None else [], block.lines)
+        yield block
+
+
+def parse_source(
+    source, file_name: str | None = None, *, pdf_workers: int = 1, on_text: Callable[[str], None] | None = None,
+) -> ParseResult:
+    """
+    Extract, detect and parse an upload in one streaming pass. The grammar is
+    chosen from a bounded prefix with detect_grammar's rules; a file whose
+    only sign of the labeled grammar lies past GRAMMAR_PREFIX_BLOCKS blocks
+    parses as PYE. Same arguments as iter_source.
+    """
+    blocks = iter_source(source, file_name, pdf_workers=pdf_workers, on_text=on_text)
+    signs = _GrammarSigns()
+    prefix: deque[Block] = deque()
+    for block in blocks:
+        prefix.append(block)
+        signs.see_block(block)
+        if signs.settled or len(prefix) >= GRAMMAR_PREFIX_BLOCKS:
+            break
+    grammar = signs.grammar()
+
+    text_hash = _TextHash()
+    stream = _replay(prefix, blocks, text_hash)
+    if grammar == GRAMMAR_LABELED:
+        parsed = labeled_to_parsed_doc(parse_lines(line for block in stream for line in block.lines))
+    else:
+        parsed = parse_pye(block.paragraph for block in stream if block.paragraph is not None)
+    for _ in stream:
+        pass        # a parser that stopped early still has the rest checked and hashed
+    return ParseResult(parsed, validate(parsed), grammar, text_hash.hexdigest())
+
+
+def parse_upload(source, file_name: str | None = None, *, pdf_workers: int = 1) -> ParseResult:
+    """
+    Extract, detect and parse an upload. Raises PYEParseError for unreadable
+    files and for PYE files missing a required section.
+    """
+    return parse_source(source, file_name, pdf_workers=pdf_workers)
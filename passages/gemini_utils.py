@@ -1,59 +1,21 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
 import re
 from django.db import transaction
+from .generation import FALLBACK_MODEL, PRIMARY_MODEL, GenerationError, get_generation_service  # noqa: F401
 from .models import QuizQuestion, QuizAnswer
-
-# Load environment variables
-load_dotenv()
-
-# Configure Gemini with API key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-# Primary and fallback models
-PRIMARY_MODEL = "gemini-1.5-flash"
-FALLBACK_MODEL = "gemini-1.5-pro"
+from .payload_cache import bump_content_version
+from .search import index_documents
 
 def generate_questions(text):
     """
     Given a passage of text, generate 7 reading comprehension questions, using Gemini.
-    Falls back to another model if the first one fails.
-    """
-    prompt = f"""Based on this passage, generate exactly 7 reading comprehension questions. 
-
-IMPORTANT: Use EXACTLY this format for each question:
-
-**1. Question text here?**
-A) First choice text
-B) Second choice text  
-C) Third choice text
-D) Fourth choice text
-Answer: C
-Explanation: short explanation of why C is correct
-
-**2. Next question here?**
-A) Choice A text
-B) Choice B text
-C) Choice C text
-D) Choice D text
-Answer: B
-Explanation: short explanation of why B is correct
 
-(Continue for all 7 questions)
-
-Passage:
-{text}"""
-
-    
-    for model_name in [PRIMARY_MODEL, FALLBACK_MODEL]:
-        try:
-            print(f"Trying Gemini model: {model_name}...")
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"Error with {model_name}: {e}")
+    Goes through the shared generation service: cached by passage, rate-limited,
+    and retried with backoff before falling back to another model.
+    """
+    try:
+        return get_generation_service().generate(text)
+    except GenerationError as e:
+        print(f"Question generation failed: {e}")
 
     return "Failed to generate questions."
 
@@ -134,7 +96,7 @@ def save_parsed_questions(document, parsed_questions):
         print(f"Attempting to save {len(parsed_questions)} questions to database...")
 
         with transaction.atomic():
-            for q in parsed_questions:
+            for position, q in enumerate(parsed_questions):
                 print(f"Creating question: {q['question_text'][:50]}...")
 
                 correct_choice = q.get("correct_choice")
@@ -143,7 +105,8 @@ def save_parsed_questions(document, parsed_questions):
                 new_question = QuizQuestion.objects.create(
                     document=document,
                     question_text=q["question_text"],
-                    explanation=explanation
+                    explanation=explanation,
+                    position=position,
                 )
 
                 print(f"Question created with ID: {new_question.id}")
@@ -162,6 +125,9 @@ def save_parsed_questions(document, parsed_questions):
 
                 print(f"All answers saved for question {new_question.id}")
 
+            bump_content_version(document.id)
+            index_documents(document.id)
+
         print(f"Successfully saved {len(parsed_questions)} questions with all answers!")
         return True
 
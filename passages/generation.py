@@ -0,0 +1,404 @@
+"""
+Question generation service.
+
+Wraps a model backend with what a batch of passages needs: an asyncio client
+with a concurrency limit, token-bucket rate limiting, exponential backoff that
+moves on to the fallback model, and a response cache keyed by the passage hash
+and PROMPT_VERSION, so identical passages are generated once.
+
+Long passages are map-reduced: `chunk_passage` splits them into overlapping
+chunks that are generated concurrently, and `merge_questions` dedupes the
+results by normalized question text and trims them to QUESTION_COUNT.
+
+`generate_passage_questions` does that for one passage, `generate_for_documents`
+for many UploadedDocuments in one batch; `gemini_utils.generate_questions` is
+the raw one-prompt synchronous wrapper.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Iterable, Protocol
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt changes, so cached responses for the old prompt are ignored.
+PROMPT_VERSION = 1
+QUESTION_COUNT = 7
+
+PRIMARY_MODEL = "gemini-1.5-flash"
+FALLBACK_MODEL = "gemini-1.5-pro"
+
+CACHE_ALIAS = "generation"
+
+# Passages longer than one chunk are generated chunk by chunk. The overlap keeps
+# a sentence cut at a boundary whole in at least one chunk.
+CHUNK_CHARS = 3000
+CHUNK_OVERLAP = 300
+MAX_CHUNKS = 8
+
+
+def build_prompt(text: str) -> str:
+    return f"""Based on this passage, generate exactly {QUESTION_COUNT} reading comprehension questions.
+
+IMPORTANT: Use EXACTLY this format for each question:
+
+**1. Question text here?**
+A) First choice text
+B) Second choice text
+C) Third choice text
+D) Fourth choice text
+Answer: C
+Explanation: short explanation of why C is correct
+
+**2. Next question here?**
+A) Choice A text
+B) Choice B text
+C) Choice C text
+D) Choice D text
+Answer: B
+Explanation: short explanation of why B is correct
+
+(Continue for all {QUESTION_COUNT} questions)
+
+Passage:
+{text}"""
+
+
+class GenerationError(Exception):
+    """Every model and retry failed for a passage."""
+
+
+class Backend(Protocol):
+    async def generate(self, prompt: str, model: str) -> str: ...
+
+
+class GeminiBackend:
+    def __init__(self, api_key: str | None = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self._genai = genai
+
+    async def generate(self, prompt: str, model: str) -> str:
+        response = await self._genai.GenerativeModel(model).generate_content_async(prompt)
+        return response.text
+
+
+class StubBackend:
+    """
+    Deterministic offline backend: builds questions from the passage's own
+    sentences, in the format parse_questions expects. The same prompt always
+    gives the same output.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt: str, model: str) -> str:
+        self.calls += 1
+        passage = prompt.rsplit("Passage:\n", 1)[-1]
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", passage) if s.strip()] or ["(empty passage)"]
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        blocks = []
+        for number in range(1, QUESTION_COUNT + 1):
+            answer = rng.choice("ABCD")
+            picked = [sentences[rng.randrange(len(sentences))][:120] for _ in range(4)]
+            choices = "\n".join(f"{letter}) {text}" for letter, text in zip("ABCD", picked))
+            blocks.append(
+                f"**{number}. Which statement appears in the passage (item {number})?**\n"
+                f"{choices}\nAnswer: {answer}\nExplanation: Choice {answer} is quoted from the passage."
+            )
+        return "\n\n".join(blocks)
+
+
+BACKENDS = {"gemini": GeminiBackend, "stub": StubBackend}
+
+
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average with bursts of up to `capacity`.
+
+    Callers reserve a token immediately (the balance may go negative) and sleep
+    until it is theirs, so no asyncio lock is needed and the bucket can be
+    shared across event loops and threads.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def _snap_back(text: str, start: int, end: int) -> int:
+    """Move `end` back to the nearest paragraph, sentence or word break past the chunk's middle."""
+    floor = start + (end - start) // 2
+    for pattern in ("\n", ". ", " "):
+        cut = text.rfind(pattern, floor, end)
+        if cut != -1:
+            return cut + len(pattern)
+    return end
+
+
+def _split(text: str, size: int, overlap: int) -> list[str]:
+    chunks = []
+    start = 0
+    while True:
+        end = start + size
+        if end >= len(text):
+            chunks.append(text[start:].strip())
+            return chunks
+        end = _snap_back(text, start, end)
+        chunks.append(text[start:end].strip())
+        next_start = end - overlap
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+
+
+def chunk_passage(
+    text: str,
+    size: int = CHUNK_CHARS,
+    overlap: int = CHUNK_OVERLAP,
+    max_chunks: int = MAX_CHUNKS,
+) -> list[str]:
+    """
+    Split `text` into chunks of at most `size` characters that overlap by about
+    `overlap`, cut at paragraph/sentence/word breaks where possible. Passages
+    that would need more than `max_chunks` chunks get proportionally larger
+    chunks instead, so there are never more than `max_chunks`. A passage that
+    fits in one chunk is returned unchanged; longer ones are stripped, and
+    each chunk is stripped at its cut.
+    """
+    if len(text) <= size:
+        return [text] if text.strip() else []
+    text = text.strip()
+    max_chunks = max(max_chunks, 1)
+    size = max(size, -(-len(text) // max_chunks) + overlap)
+    while True:
+        chunks = _split(text, size, overlap)
+        if len(chunks) <= max_chunks:
+            return chunks
+        # Snapping back to breaks shortened the chunks: grow them by the share that overflowed.
+        size += -(-size * (len(chunks) - max_chunks) // max_chunks)
+
+
+def normalize_question_text(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def merge_questions(per_chunk: list[list[dict]], count: int = QUESTION_COUNT) -> list[dict]:
+    """
+    Merge the questions generated for each chunk: drop repeats (by normalized
+    question text) and take the first `count`, round-robin across chunks so the
+    kept questions cover the whole passage rather than just its opening.
+    """
+    merged = []
+    seen = set()
+    for rank in range(max((len(qs) for qs in per_chunk), default=0)):
+        for questions in per_chunk:
+            if rank >= len(questions):
+                continue
+            key = normalize_question_text(questions[rank]["question_text"])
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(questions[rank])
+    return merged[:count]
+
+
+def passage_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class GenerationService:
+    def __init__(
+        self,
+        backend: Backend,
+        *,
+        models: tuple[str, ...] = (PRIMARY_MODEL, FALLBACK_MODEL),
+        max_concurrency: int = 4,
+        rate_per_second: float = 1.0,
+        burst: int = 4,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        cache_alias: str = CACHE_ALIAS,
+    ):
+        self.backend = backend
+        self.models = models
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cache_alias = cache_alias
+
+    def _cache_key(self, text: str) -> str:
+        return f"gen:{passage_hash(text)}"
+
+    def cached(self, text: str) -> str | None:
+        return caches[self.cache_alias].get(self._cache_key(text), version=PROMPT_VERSION)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: anywhere up to the exponential cap, so retries spread out.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _call_with_retries(self, prompt: str, semaphore: asyncio.Semaphore) -> str:
+        errors = []
+        for model in self.models:
+            for attempt in range(self.max_retries):
+                if attempt:
+                    await asyncio.sleep(self._backoff(attempt - 1))
+                async with semaphore:
+                    await self.bucket.acquire()
+                    try:
+                        return await self.backend.generate(prompt, model)
+                    except Exception as exc:
+                        logger.warning("Question generation with %s failed (attempt %d): %s", model, attempt + 1, exc)
+                        errors.append(f"{model}: {exc}")
+        raise GenerationError("; ".join(errors[-3:]) or "No models configured.")
+
+    async def _generate(self, text: str, semaphore: asyncio.Semaphore) -> str:
+        cached = self.cached(text)
+        if cached is not None:
+            return cached
+        output = await self._call_with_retries(build_prompt(text), semaphore)
+        caches[self.cache_alias].set(self._cache_key(text), output, version=PROMPT_VERSION)
+        return output
+
+    async def generate_many(self, texts: Iterable[str]) -> list[str | GenerationError]:
+        """
+        Generate for every passage concurrently. Identical passages share one
+        call. Failures are returned in place as GenerationError.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        texts = list(texts)
+        tasks: dict[str, asyncio.Task] = {}
+        for text in texts:
+            if text not in tasks:
+                tasks[text] = asyncio.ensure_future(self._generate(text, semaphore))
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        results: list[str | GenerationError] = []
+        for text in texts:
+            exc = tasks[text].exception()
+            if exc is None:
+                results.append(tasks[text].result())
+            else:
+                results.append(exc if isinstance(exc, GenerationError) else GenerationError(str(exc)))
+        return results
+
+    def generate(self, text: str) -> str:
+        """Synchronous single-passage call. Raises GenerationError."""
+        result = asyncio.run(self.generate_many([text]))[0]
+        if isinstance(result, GenerationError):
+            raise result
+        return result
+
+
+_service: GenerationService | None = None
+_service_lock = threading.Lock()
+
+
+def get_generation_service() -> GenerationService:
+    """The process-wide service configured by settings.QUESTION_GENERATION."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            config = settings.QUESTION_GENERATION
+            _service = GenerationService(
+                BACKENDS[config["BACKEND"]](),
+                max_concurrency=config["MAX_CONCURRENCY"],
+                rate_per_second=config["RATE_PER_SECOND"],
+                burst=config["BURST"],
+                max_retries=config["MAX_RETRIES"],
+            )
+        return _service
+
+
+def _reduce(outputs: list, parse_questions, count: int) -> list[dict] | GenerationError:
+    """Merge one passage's chunk outputs; it only fails if every chunk did."""
+    parsed = [parse_questions(o) for o in outputs if not isinstance(o, GenerationError)]
+    if not parsed:
+        return outputs[0]
+    if len(parsed) < len(outputs):
+        logger.warning("Question generation failed for %d of %d chunks", len(outputs) - len(parsed), len(outputs))
+    return merge_questions(parsed, count)
+
+
+async def _generate_chunked(service: GenerationService, texts: list[str], count: int) -> list:
+    from .gemini_utils import parse_questions
+
+    chunked = [chunk_passage(text) for text in texts]
+    outputs = await service.generate_many(chunk for chunks in chunked for chunk in chunks)
+    results = []
+    offset = 0
+    for chunks in chunked:
+        results.append(_reduce(outputs[offset:offset + len(chunks)], parse_questions, count))
+        offset += len(chunks)
+    return results
+
+
+def generate_passage_questions(
+    text: str, *, service: GenerationService | None = None, count: int = QUESTION_COUNT
+) -> list[dict]:
+    """
+    Parsed questions for a whole passage. The chunks are generated
+    concurrently, so latency follows the slowest chunk rather than the
+    passage length. Raises GenerationError if no chunk could be generated.
+    """
+    service = service or get_generation_service()
+    if not text or not text.strip():
+        return []
+    result = asyncio.run(_generate_chunked(service, [text], count))[0]
+    if isinstance(result, GenerationError):
+        raise result
+    return result
+
+
+def generate_for_documents(documents, *, service: GenerationService | None = None, save: bool = True) -> dict:
+    """
+    Generate questions for many UploadedDocuments in one concurrent batch.
+
+    Every chunk of every document goes into the same batch. Documents without
+    parsed text are skipped. With `save`, the merged questions are written with
+    save_parsed_questions. Returns {document id: list of question dicts, or the
+    GenerationError}.
+    """
+    from .gemini_utils import save_parsed_questions
+
+    service = service or get_generation_service()
+    documents = [d for d in documents if d.parsed_text and d.parsed_text.strip()]
+    outcomes = asyncio.run(_generate_chunked(service, [d.parsed_text for d in documents], QUESTION_COUNT))
+
+    results = {}
+    for document, questions in zip(documents, outcomes):
+        if save and not isinstance(questions, GenerationError) and questions:
+            save_parsed_questions(document, questions)
+        results[document.id] = questions
+    return results
@@ -0,0 +1,208 @@
+"""
+Quiz grading against a document's answer key, loaded in one query.
+
+`load_answer_key` reads every question and choice of a document in a single
+LEFT JOIN; `grade` then scores a submission in memory, rejecting question ids
+from other documents and choices that belong to a different question.
+`save_submission` writes the QuizResponse and all its UserAnswers (one
+bulk_create) in one transaction, so a submission costs the same number of
+queries whatever the quiz length. The key also carries the explanations, so
+`review` can tell the student the right answers without another query (the
+quiz payload itself has no answer key).
+
+`answer_key` puts an in-process LRU in front of `load_answer_key`. Each entry
+is stamped with the document's content version (passages.payload_cache), which
+the importer, question generation and the question/answer edit paths bump, so
+a change is seen by every worker on its next submission. Checking the stamp is
+one primary-key lookup instead of the join.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import QuizQuestion, QuizResponse, UserAnswer
+from .payload_cache import content_state
+
+
+class GradingError(ValueError):
+    """The submission does not match the document's questions."""
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    document_id: int
+    correct: dict[int, int | None]      # question id -> correct answer id
+    choices: dict[int, int]             # answer id -> its question id
+    explanations: dict[int, str]        # question id -> explanation ("" when there is none)
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.correct)
+
+
+@dataclass(frozen=True)
+class GradedAnswer:
+    question_id: int
+    answer_id: int
+    is_correct: bool
+
+
+@dataclass(frozen=True)
+class GradedQuiz:
+    document_id: int
+    answers: list[GradedAnswer]
+    score: int
+    total_questions: int
+
+    @property
+    def percentage(self) -> float:
+        return round((self.score / self.total_questions) * 100, 2)
+
+
+def load_answer_key(document_id: int) -> AnswerKey:
+    """The document's answer key. A document without questions gets an empty key."""
+    correct: dict[int, int | None] = {}
+    choices: dict[int, int] = {}
+    explanations: dict[int, str] = {}
+    rows = (
+        QuizQuestion.objects.filter(document_id=document_id)
+        .order_by('position', 'id', 'answers__id')
+        .values_list('id', 'explanation', 'answers__id', 'answers__is_correct')
+    )
+    for question_id, explanation, answer_id, is_correct in rows:
+        correct.setdefault(question_id, None)
+        explanations[question_id] = explanation or ''
+        if answer_id is None:
+            continue
+        choices[answer_id] = question_id
+        if is_correct and correct[question_id] is None:
+            correct[question_id] = answer_id
+    return AnswerKey(document_id, correct, choices, explanations)
+
+
+class AnswerKeyCache:
+    """Answer keys by document id, least recently used evicted past `max_entries`."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[tuple, AnswerKey]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, document_id: int) -> AnswerKey:
+        state = content_state(document_id)
+        if state is None:           # no such document: nothing to cache
+            return AnswerKey(document_id, {}, {}, {})
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None and entry[0] == state:
+                self._entries.move_to_end(document_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        key = load_answer_key(document_id)
+        with self._lock:
+            self._entries[document_id] = (state, key)
+            self._entries.move_to_end(document_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return key
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Counters for this worker process."""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+
+answer_key_cache = AnswerKeyCache(settings.ANSWER_KEY_CACHE_MAX_ENTRIES)
+
+
+def answer_key(document_id: int) -> AnswerKey:
+    """The document's current answer key, from this process's cache when still valid."""
+    return answer_key_cache.get(document_id)
+
+
+def _as_id(value, field: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise GradingError(f"{field} must be an id, got {value!r}") from None
+
+
+def grade(key: AnswerKey, answers: list[dict]) -> GradedQuiz:
+    """
+    Score `answers` ([{"question_id", "selected_answer_id"}, ...]) against
+    `key`. Unanswered questions count as wrong; answering a question twice,
+    a question from another document or a choice from another question
+    raises GradingError.
+    """
+    if not key.correct:
+        raise GradingError("No questions found for this document")
+
+    graded = []
+    seen = set()
+    for answer in answers:
+        question_id = _as_id(answer.get('question_id'), 'question_id')
+        answer_id = _as_id(answer.get('selected_answer_id'), 'selected_answer_id')
+        if question_id not in key.correct:
+            raise GradingError(f"Question {question_id} is not part of document {key.document_id}")
+        if key.choices.get(answer_id) != question_id:
+            raise GradingError(f"Answer {answer_id} is not a choice of question {question_id}")
+        if question_id in seen:
+            raise GradingError(f"Question {question_id} was answered more than once")
+        seen.add(question_id)
+        graded.append(GradedAnswer(question_id, answer_id, key.correct[question_id] == answer_id))
+
+    return GradedQuiz(
+        key.document_id, graded, sum(a.is_correct for a in graded), key.total_questions,
+    )
+
+
+def review(key: AnswerKey) -> list[dict]:
+    """What the results page shows for each question: the correct choice and the explanation."""
+    return [
+        {'question_id': question_id, 'correct_answer_id': answer_id, 'explanation': key.explanations[question_id]}
+        for question_id, answer_id in key.correct.items()
+    ]
+
+
+@transaction.atomic
+def save_submission(graded: GradedQuiz, *, user=None, user_name: str = '', duration_seconds: int = 0,
+                    idempotency_key: str | None = None) -> QuizResponse:
+    """Write the response and all its answers: one INSERT each for the response and the answers."""
+    response = QuizResponse.objects.create(
+        document_id=graded.document_id,
+        user=user,
+        user_name=user_name,
+        duration_seconds=duration_seconds,
+        score=graded.score,
+        total_questions=graded.total_questions,
+        idempotency_key=idempotency_key,
+    )
+    UserAnswer.objects.bulk_create([
+        UserAnswer(
+            response=response, question_id=a.question_id, selected_answer_id=a.answer_id, is_correct=a.is_correct,
+        )
+        for a in graded.answers
+    ])
+    return response
@@ -1,48 +1,160 @@
+from collections import Counter, defaultdict
+
 from django.db import transaction
 from .models import UploadedDocument, QuizQuestion, QuizAnswer
-from .pye_parser import extract_paragraphs, format_validation_errors, parse_pye, validate, PYEParseError
+from .formats import parsed_doc_hash
+from .parse_cache import parse_file
+from .payload_cache import bump_content_version
+from .pye_parser import PARSER_VERSION, format_validation_errors, PYEParseError
+from .search import index_documents
+
+def _choice_keys(letters):
+    """Key choices by (letter, occurrence) so a repeated letter still matches one-to-one."""
+    seen = Counter()
+    for letter in letters:
+        seen[letter] += 1
+        yield (letter, seen[letter])
+
+
+def _normalized(text: str) -> str:
+    return ' '.join(text.split()).casefold()
+
+
+def _match_questions(existing, parsed_questions):
+    """
+    Pair existing questions with parsed ones: by normalized question text
+    first, then the rest by position. Returns the existing question for each
+    parsed one (None where it is new) and the existing questions left over.
+    """
+    by_text = defaultdict(list)
+    for question in existing:
+        by_text[_normalized(question.question_text)].append(question)
+    matched = [None] * len(parsed_questions)
+    for index, q in enumerate(parsed_questions):
+        same = by_text.get(_normalized(q.text))
+        if same:
+            matched[index] = same.pop(0)
+    taken = {question.id for question in matched if question is not None}
+    leftover = iter([question for question in existing if question.id not in taken])
+    for index in range(len(parsed_questions)):
+        if matched[index] is None:
+            matched[index] = next(leftover, None)
+    return matched, list(leftover)
+
+
+def stamp_parser_version(document: UploadedDocument, parsed, extracted_hash: str) -> None:
+    """Record which parser produced the document's questions, from what text."""
+    document.parser_version = PARSER_VERSION
+    document.parsed_hash = parsed_doc_hash(parsed)
+    if extracted_hash:
+        document.extracted_hash = extracted_hash
+
 
 @transaction.atomic
-def import_parsed_doc(document: UploadedDocument, parsed) -> None:
+def import_parsed_doc(document: UploadedDocument, parsed, *, extracted_hash: str = '') -> None:
+    """
+    Write `parsed` onto `document`, touching only rows that changed.
+
+    Existing questions are matched to parsed ones by their (whitespace- and
+    case-normalized) text, the rest by position, and their choices by letter,
+    so re-importing a corrected file keeps the ids of unchanged questions, and
+    the students' answers that point at them, even when questions were
+    inserted, removed or reordered. Every question's `position` is set from
+    the file, so the quiz follows its order. Runs a fixed number of queries
+    however many questions there are.
+    """
     document.parsed_text = parsed.passage
 
     # make sure title is saved if it exists
     if hasattr(parsed, 'title') and parsed.title:
         document.title = parsed.title
-        
-    document.save(update_fields=["parsed_text", "title"])
-
-    # wipe old questions (cascades to their answers)
-    document.questions.all().delete()
-
-    # recreate questions + choices + explanations
-    for q in parsed.questions:
-        question = QuizQuestion.objects.create(
-            document=document,
-            question_text=q.text,
-            explanation=q.explanation,
+
+    stamp_parser_version(document, parsed, extracted_hash)
+    document.save(update_fields=["parsed_text", "title", "parser_version", "extracted_hash", "parsed_hash"])
+
+    existing = list(document.questions.order_by('position', 'id'))
+    answers = defaultdict(list)
+    for answer in QuizAnswer.objects.filter(question__document=document).order_by('question_id', 'id'):
+        answers[answer.question_id].append(answer)
+
+    changed_questions, changed_answers, new_answers, stale_answer_ids, added = [], [], [], [], []
+    matched, removed = _match_questions(existing, parsed.questions)
+    for position, (question, q) in enumerate(zip(matched, parsed.questions)):
+        if question is None:
+            added.append((document, position, q))
+            continue
+        if (question.question_text, question.explanation or '', question.position) != (q.text, q.explanation, position):
+            question.question_text = q.text
+            question.explanation = q.explanation
+            question.position = position
+            changed_questions.append(question)
+
+        current = dict(zip(_choice_keys(a.choice_letter for a in answers[question.id]), answers[question.id]))
+        for key, c in zip(_choice_keys(c.letter for c in q.choices), q.choices):
+            answer = current.pop(key, None)
+            if answer is None:
+                new_answers.append(QuizAnswer(
+                    question=question, choice_letter=c.letter, choice_text=c.text, is_correct=c.is_correct,
+                ))
+            elif (answer.choice_text, answer.is_correct) != (c.text, c.is_correct):
+                answer.choice_text = c.text
+                answer.is_correct = c.is_correct
+                changed_answers.append(answer)
+        stale_answer_ids += [answer.id for answer in current.values()]
+
+    # questions the new file no longer has go (cascading to their answers)
+    QuizQuestion.objects.filter(id__in=[q.id for q in removed]).delete()
+    QuizAnswer.objects.filter(id__in=stale_answer_ids).delete()
+    QuizQuestion.objects.bulk_update(changed_questions, ['question_text', 'explanation', 'position'])
+    QuizAnswer.objects.bulk_update(changed_answers, ['choice_text', 'is_correct'])
+    QuizAnswer.objects.bulk_create(new_answers)
+    _create_questions(added)
+    bump_content_version(document.id)
+    index_documents(document.id)
+
+
+def _create_questions(items) -> int:
+    """Bulk-insert (document, position, parsed question) items and their choices in two INSERTs."""
+    questions = QuizQuestion.objects.bulk_create([
+        QuizQuestion(document=document, question_text=q.text, explanation=q.explanation, position=position)
+        for document, position, q in items
+    ])
+    QuizAnswer.objects.bulk_create([
+        QuizAnswer(
+            question=question,
+            choice_letter=c.letter,
+            choice_text=c.text,
+            is_correct=c.is_correct,
         )
-        
-        # correctly creates answers from dataclass objects
-        QuizAnswer.objects.bulk_create([
-            QuizAnswer(
-                question=question,
-                choice_letter=c.letter,
-                choice_text=c.text,
-                is_correct=c.is_correct,
-            )
-            for c in q.choices
-        ])
-
-def import_document(document: UploadedDocument, *, strict: bool = False):
-    """Parse the document's file and write it. Returns (parsed, problems)."""
-    document.file.seek(0)                       # rewind in case it was read already
-
-    parsed = parse_pye(extract_paragraphs(document.file, file_name=document.file.name))
-    
-    problems = validate(parsed)
-    if problems and strict:
-        raise PYEParseError(format_validation_errors(problems))
+        for question, (_, _, q) in zip(questions, items)
+        for c in q.choices
+    ])
+    return len(questions)
+
+
+def create_parsed_questions(pairs) -> int:
+    """
+    Bulk-insert questions and choices for freshly created documents.
+
+    `pairs` is a list of (document, parsed) for documents that have no questions
+    yet. Returns the number of questions.
+    """
+    return _create_questions([
+        (document, position, q) for document, parsed in pairs for position, q in enumerate(parsed.questions)
+    ])
+
+def import_document(document: UploadedDocument, *, strict: bool = False, source=None):
+    """
+    Parse the document's file and write it. Returns (parsed, problems, grammar).
+    `source` is an open copy of the same bytes to read instead of the stored file.
+    """
+    source = source or document.file
+    source.seek(0)                              # rewind in case it was read already
+
+    # same bytes + same parser version -> reuse the earlier parse
+    result = parse_file(source, file_name=document.file.name)
+    if result.problems and strict:
+        raise PYEParseError(format_validation_errors(result.problems))
     
-    import_parsed_doc(document, parsed)
-    return parsed, problems
\ No newline at end of file
+    import_parsed_doc(document, result.parsed, extracted_hash=result.extracted_hash)
+    return result
\ No newline at end of file
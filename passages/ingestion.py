@@ -0,0 +1,165 @@
+"""
+Database-backed ingestion queue for uploaded documents.
+
+Uploads only store the file and enqueue an IngestionJob; the parse / validate /
+DB-write work happens in `run_ingestion_workers` processes, so web workers are
+never blocked on extraction and no request transaction is held open while a
+document is parsed.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .importer import import_document
+from .models import IngestionJob, UploadedDocument
+from .pye_parser import PYEParseError
+
+logger = logging.getLogger(__name__)
+
+# A job left in 'parsing' longer than this is assumed to belong to a dead worker.
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+MAX_ATTEMPTS = 3
+
+
+def enqueue_document(document: UploadedDocument, *, staged_path: str = '') -> IngestionJob:
+    """
+    Queue a parse of `document`'s file. Returns the new job. `staged_path` is
+    a local copy of the same bytes to parse instead (see passages.uploads).
+    """
+    return IngestionJob.objects.create(document=document, staged_path=staged_path)
+
+
+def record_import(document: UploadedDocument, result) -> IngestionJob:
+    """Log an import that was parsed outside the queue (see passages.dry_run) as a finished job."""
+    now = timezone.now()
+    return IngestionJob.objects.create(
+        document=document,
+        status=IngestionJob.STATUS_VALIDATED,
+        problems=result.problems,
+        grammar=result.grammar,
+        started_at=now,
+        finished_at=now,
+    )
+
+
+def claim_next_job() -> IngestionJob | None:
+    """
+    Atomically move the oldest queued job to 'parsing' and return it.
+
+    The claim is a conditional UPDATE, so it is safe with several worker
+    processes polling the same table on any database backend.
+    """
+    candidates = (
+        IngestionJob.objects
+        .filter(status=IngestionJob.STATUS_QUEUED)
+        .order_by('created_at', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = IngestionJob.objects.filter(
+            id=job_id, status=IngestionJob.STATUS_QUEUED
+        ).update(
+            status=IngestionJob.STATUS_PARSING,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return IngestionJob.objects.select_related('document').get(id=job_id)
+    return None
+
+
+def _finish(job: IngestionJob, status: str, *, problems=None, error: str = '', grammar: str = '') -> IngestionJob:
+    job.status = status
+    job.problems = problems or []
+    job.error = error
+    job.grammar = grammar
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'problems', 'error', 'grammar', 'finished_at'])
+    return job
+
+
+def _discard_staged_copy(path: str) -> None:
+    """Delete a chunked upload's local copy (and its emptied staging folder) once parsed."""
+    os.remove(path)
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def run_job(job: IngestionJob) -> IngestionJob:
+    """Parse, validate and import the job's document, recording the outcome on the job."""
+    document = job.document
+    if not document.file:
+        return _finish(job, IngestionJob.STATUS_FAILED, error="The document has no uploaded file.")
+
+    staged = job.staged_path if job.staged_path and os.path.exists(job.staged_path) else ''
+    try:
+        if staged:
+            # A chunked upload's local copy: no need to read the file back from storage.
+            with open(staged, 'rb') as source:
+                result = import_document(document, source=source)
+        else:
+            document.file.open('rb')
+            try:
+                result = import_document(document)
+            finally:
+                document.file.close()
+    except PYEParseError as exc:
+        logger.info("Ingestion job %s failed to parse: %s", job.id, exc)
+        return _finish(job, IngestionJob.STATUS_FAILED, error=str(exc))
+    except Exception as exc:
+        logger.exception("Unexpected error in ingestion job %s", job.id)
+        return _finish(job, IngestionJob.STATUS_FAILED, error=f"Unexpected parser error: {exc}")
+    finally:
+        if staged:
+            _discard_staged_copy(staged)
+
+    return _finish(job, IngestionJob.STATUS_VALIDATED, problems=result.problems, grammar=result.grammar)
+
+
+def requeue_stale_jobs(timeout: timedelta = STALE_JOB_TIMEOUT) -> int:
+    """Return jobs abandoned by a crashed worker to the queue (or fail them after MAX_ATTEMPTS)."""
+    cutoff = timezone.now() - timeout
+    stale = IngestionJob.objects.filter(status=IngestionJob.STATUS_PARSING, started_at__lt=cutoff)
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=IngestionJob.STATUS_FAILED,
+        error="The document could not be processed after several attempts.",
+        finished_at=timezone.now(),
+    )
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=IngestionJob.STATUS_QUEUED)
+
+
+def process_pending_jobs(limit: int | None = None) -> int:
+    """Run queued jobs in this process until the queue is empty. Returns the number processed."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def worker_loop(poll_interval: float = 2.0, once: bool = False) -> int:
+    """
+    Body of one ingestion worker process: claim and run jobs, sleeping when idle.
+
+    With `once=True` the worker exits as soon as the queue is drained.
+    """
+    processed = 0
+    while True:
+        close_old_connections()
+        requeue_stale_jobs()
+        processed += process_pending_jobs()
+        if once:
+            return processed
+        time.sleep(poll_interval)
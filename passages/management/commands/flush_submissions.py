@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from passages.submission_queue import flusher_loop, pending_count
+
+
+class Command(BaseCommand):
+    help = 'Write quiz submissions queued in burst mode to the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Submissions per transaction (default: SUBMISSION_QUEUE_BATCH_SIZE)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever')
+
+    def handle(self, *args, **options):
+        flushed = flusher_loop(
+            poll_interval=options['poll_interval'], once=options['once'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Flushed {flushed} queued submission(s); {pending_count()} still pending.'
+        ))
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from passages.generation import BACKENDS, GenerationError, GenerationService, generate_for_documents
+from passages.models import UploadedDocument
+
+
+class Command(BaseCommand):
+    help = 'Generate quiz questions for many documents at once with the rate-limited generation service'
+
+    def add_arguments(self, parser):
+        parser.add_argument('document_ids', nargs='*', type=int, help='Documents to generate for')
+        parser.add_argument('--missing', action='store_true', help='Every document with parsed text and no questions')
+        parser.add_argument('--backend', choices=sorted(BACKENDS), help='Override QUESTION_GENERATION["BACKEND"]')
+        parser.add_argument('--concurrency', type=int, help='Override QUESTION_GENERATION["MAX_CONCURRENCY"]')
+
+    def handle(self, *args, **options):
+        documents = UploadedDocument.objects.exclude(parsed_text__isnull=True).exclude(parsed_text='')
+        if options['missing']:
+            documents = documents.filter(questions__isnull=True)
+        elif options['document_ids']:
+            documents = documents.filter(id__in=options['document_ids'])
+        else:
+            raise CommandError('Pass document ids or --missing.')
+        documents = list(documents.distinct())
+
+        config = settings.QUESTION_GENERATION
+        service = GenerationService(
+            BACKENDS[options['backend'] or config['BACKEND']](),
+            max_concurrency=options['concurrency'] or config['MAX_CONCURRENCY'],
+            rate_per_second=config['RATE_PER_SECOND'],
+            burst=config['BURST'],
+            max_retries=config['MAX_RETRIES'],
+        )
+
+        self.stdout.write(f'Generating questions for {len(documents)} document(s)...')
+        started = time.perf_counter()
+        results = generate_for_documents(documents, service=service)
+        elapsed = time.perf_counter() - started
+
+        failed = 0
+        for document_id, result in results.items():
+            if isinstance(result, GenerationError):
+                failed += 1
+                self.stderr.write(f'FAILED document {document_id}: {result}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated for {len(results) - failed} document(s), {failed} failed, in {elapsed:.1f}s.'
+        ))
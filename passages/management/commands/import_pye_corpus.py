@@ -0,0 +1,116 @@
+import csv
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from passages.corpus_import import ImportState, discover_files, parse_corpus_file, write_batch
+from passages.management.commands.run_ingestion_workers import _init_worker
+
+
+class Command(BaseCommand):
+    help = 'Parse PYE .docx/.pdf files from folders or zip archives in parallel and import them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files, folders (searched recursively) or .zip archives')
+        parser.add_argument('--workers', type=int, default=4, help='Number of parser processes (default: 4)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Documents written per transaction (default: 200)')
+        parser.add_argument('--owner', help='Username to record as the uploader of imported documents')
+        parser.add_argument('--strict', action='store_true', help='Treat validation problems as failures')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and report without writing to the database')
+        parser.add_argument(
+            '--state-file', default='import_pye_corpus.state.jsonl',
+            help='Progress log used to resume an interrupted import (default: import_pye_corpus.state.jsonl)',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore the state file and import everything again')
+        parser.add_argument('--error-report', help='Write a CSV of failed files and their errors to this path')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        dry_run = options['dry_run']
+
+        uploader = None
+        if options['owner']:
+            uploader = User.objects.filter(username=options['owner']).first()
+            if uploader is None:
+                raise CommandError(f"User '{options['owner']}' does not exist.")
+
+        # A dry run neither skips nor records anything.
+        state = ImportState(None if dry_run else options['state_file'])
+        if options['restart']:
+            state.reset()
+
+        files = list(discover_files(options['paths']))
+        pending = [f for f in files if f.source not in state.imported]
+        skipped = len(files) - len(pending)
+        self.stdout.write(
+            f'Found {len(files)} file(s); {len(pending)} to parse'
+            + (f', {skipped} already imported' if skipped else '') + '.'
+        )
+
+        started = time.perf_counter()
+        totals = {'imported': 0, 'failed': 0, 'questions': 0}
+        grammars = Counter()
+        failures = []
+        batch = []
+
+        def flush():
+            good = [o for o in batch if not o.error]
+            if dry_run:
+                totals['questions'] += sum(o.question_count for o in good)
+            elif good:
+                totals['questions'] += write_batch(good, uploader=uploader)
+            state.record(batch)
+            totals['imported'] += len(good)
+            batch.clear()
+
+        parse = partial(parse_corpus_file, strict=options['strict'])
+        for outcome in self._parse_all(parse, pending, workers):
+            if outcome.error:
+                totals['failed'] += 1
+                failures.append(outcome)
+                self.stderr.write(f'FAILED {outcome.file.source}: {outcome.error.splitlines()[0]}')
+            else:
+                grammars[outcome.grammar] += 1
+            batch.append(outcome)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        if options['error_report']:
+            with open(options['error_report'], 'w', newline='', encoding='utf-8') as fh:
+                writer = csv.writer(fh)
+                writer.writerow(['source', 'content_hash', 'error'])
+                for outcome in failures:
+                    writer.writerow([outcome.file.source, outcome.content_hash, outcome.error])
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        parsed_files = totals['imported'] + totals['failed']
+        verb = 'Parsed' if dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['imported']} document(s) with {totals['questions']} question(s); "
+            f"{totals['failed']} failed; {skipped} skipped."
+        ))
+        if grammars:
+            self.stdout.write('Formats: ' + ', '.join(f'{name} {count}' for name, count in sorted(grammars.items())))
+        self.stdout.write(
+            f'{elapsed:.2f}s: {parsed_files / elapsed:.1f} files/sec, '
+            f"{totals['questions'] / elapsed:.1f} questions/sec"
+            + (' (dry run, nothing written)' if dry_run else '')
+        )
+
+    def _parse_all(self, parse, files, workers):
+        if workers == 1 or len(files) <= 1:
+            yield from map(parse, files)
+            return
+
+        # Children must not inherit the parent's open DB connections.
+        connections.close_all()
+        chunksize = max(1, min(32, len(files) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            yield from pool.map(parse, files, chunksize=chunksize)
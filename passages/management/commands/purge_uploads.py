@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from passages.dry_run import purge_expired_validations
+from passages.uploads import purge_expired_sessions, purge_orphaned_copies
+
+
+class Command(BaseCommand):
+    help = (
+        'Abort idle chunked uploads and delete local upload copies no job will read '
+        'and files kept for expired validation tokens'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, help='Idle time before a session expires (default: UPLOAD_EXPIRY_HOURS)')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(hours=options['hours']) if options['hours'] is not None else None
+        purged = purge_expired_sessions(max_age)
+        copies = purge_orphaned_copies()
+        validations = purge_expired_validations()
+        self.stdout.write(self.style.SUCCESS(
+            f'Aborted {purged} expired upload session(s); removed {copies} orphaned upload folder(s) '
+            f'and {validations} expired validation file(s).'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from passages.search import engine, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over document titles, passages and questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents indexed per statement')
+
+    def handle(self, *args, **options):
+        if engine() is None:
+            self.stdout.write(self.style.WARNING('This database has no full-text index; search uses icontains.'))
+            return
+        indexed = rebuild_index(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} document(s).'))
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from passages.management.commands.run_ingestion_workers import _init_worker
+from passages.pye_parser import PARSER_VERSION
+from passages.reprocess import apply_outcomes, reparse_task, stale_tasks
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Re-parse documents imported by an older parser version, skipping ones whose content is unchanged'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of parser processes (default: 4)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Documents written per transaction (default: 200)')
+        parser.add_argument('--force', action='store_true', help='Re-parse every document, not just stale ones')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and report without writing to the database')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+
+        # Read the work list up front: workers must not share the parent's connection.
+        tasks = list(stale_tasks(force=options['force']))
+        self.stdout.write(f'{len(tasks)} document(s) to re-parse with parser version {PARSER_VERSION}.')
+        if not tasks:
+            return
+
+        started = time.perf_counter()
+        totals = {'unchanged': 0, 'reimported': 0, 'failed': 0}
+        for batch in _batches(self._parse_all(tasks, workers), batch_size):
+            if dry_run:
+                counts = {
+                    'unchanged': sum(1 for o in batch if not o.error and o.unchanged),
+                    'reimported': sum(1 for o in batch if not o.error and not o.unchanged),
+                    'failed': sum(1 for o in batch if o.error),
+                }
+            else:
+                counts = apply_outcomes(batch)
+            for outcome in batch:
+                if outcome.error:
+                    self.stderr.write(f'FAILED document {outcome.document_id}: {outcome.error.splitlines()[0]}')
+            for key, value in counts.items():
+                totals[key] += value
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        verb = 'would be re-imported' if dry_run else 're-imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['unchanged']} unchanged (version bumped), {totals['reimported']} {verb}, "
+            f"{totals['failed']} failed."
+        ))
+        self.stdout.write(f'{elapsed:.2f}s: {len(tasks) / elapsed:.1f} documents/sec'
+                          + (' (dry run, nothing written)' if dry_run else ''))
+
+    def _parse_all(self, tasks, workers):
+        if workers == 1 or len(tasks) <= 1:
+            yield from map(reparse_task, tasks)
+            return
+
+        connections.close_all()
+        chunksize = max(1, min(32, len(tasks) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            yield from pool.map(reparse_task, tasks, chunksize=chunksize)
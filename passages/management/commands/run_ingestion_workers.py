@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from passages.ingestion import worker_loop
+
+
+def _init_worker():
+    # Forked children must not share the parent's DB sockets; spawned ones need setup.
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of worker processes that parse and import queued document uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes (default: 2)')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling forever')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        if workers == 1:
+            processed = worker_loop(poll_interval=poll_interval, once=once)
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} ingestion job(s).'))
+            return
+
+        self.stdout.write(f'Starting {workers} ingestion workers...')
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(worker_loop, poll_interval, once) for _ in range(workers)]
+            processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} ingestion job(s).'))
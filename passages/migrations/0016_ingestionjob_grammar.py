@@ -0,0 +1,18 @@
+# Generated by Django 4.2.22 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0015_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='grammar',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.22 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0016_ingestionjob_grammar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='extracted_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='parsed_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='parser_version',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
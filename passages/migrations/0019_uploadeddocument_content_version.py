@@ -0,0 +1,24 @@
+# Generated by Django 4.2.22 on 2026-10-18 13:53
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0018_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='content_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
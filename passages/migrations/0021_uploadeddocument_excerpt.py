@@ -0,0 +1,48 @@
+# Generated by Django 4.2.22 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+EXCERPT_LENGTH = 200
+
+
+def summarize_existing(apps, schema_editor):
+    # Same as UploadedDocument.summarize_text, which historical models do not have.
+    UploadedDocument = apps.get_model('passages', 'UploadedDocument')
+    batch = []
+    for document in UploadedDocument.objects.only('id', 'parsed_text').iterator(chunk_size=500):
+        words = (document.parsed_text or '').split()
+        excerpt = ' '.join(words)
+        if len(excerpt) > EXCERPT_LENGTH:
+            excerpt = excerpt[:EXCERPT_LENGTH + 1].rsplit(' ', 1)[0]
+        document.excerpt = excerpt[:EXCERPT_LENGTH]
+        document.word_count = len(words)
+        batch.append(document)
+        if len(batch) == 500:
+            UploadedDocument.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            batch = []
+    UploadedDocument.objects.bulk_update(batch, ['excerpt', 'word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0020_quizresponse_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='excerpt',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='uploadeddocument',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='document_catalog_order'),
+        ),
+        migrations.RunPython(summarize_existing, migrations.RunPython.noop),
+    ]
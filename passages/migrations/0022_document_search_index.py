@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# Kept in step with passages/search.py.
+PG_TABLE = 'passages_documentsearch'
+FTS_TABLE = 'passages_documentsearch_fts'
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"""
+            CREATE TABLE {PG_TABLE} (
+                document_id integer PRIMARY KEY REFERENCES passages_uploadeddocument (id)
+                    ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+                vector tsvector NOT NULL
+            )
+        """)
+        schema_editor.execute(f"CREATE INDEX {PG_TABLE}_vector_gin ON {PG_TABLE} USING gin (vector)")
+        schema_editor.execute(f"""
+            INSERT INTO {PG_TABLE} (document_id, vector)
+            SELECT d.id,
+                   setweight(to_tsvector('english', coalesce(d.title, '')), 'A')
+                   || setweight(to_tsvector('english', coalesce(d.parsed_text, '')), 'B')
+                   || setweight(to_tsvector('english', coalesce(
+                          (SELECT string_agg(q.question_text, ' ') FROM passages_quizquestion q
+                           WHERE q.document_id = d.id), '')), 'C')
+            FROM passages_uploadeddocument d
+        """)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, body, questions, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(f"""
+            INSERT INTO {FTS_TABLE} (rowid, title, body, questions)
+            SELECT d.id, coalesce(d.title, ''), coalesce(d.parsed_text, ''),
+                   coalesce((SELECT group_concat(q.question_text, ' ') FROM passages_quizquestion q
+                             WHERE q.document_id = d.id), '')
+            FROM passages_uploadeddocument d
+        """)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0021_uploadeddocument_excerpt'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
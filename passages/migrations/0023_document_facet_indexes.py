@@ -0,0 +1,33 @@
+# Generated by Django 4.2.22 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0022_document_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['program', 'grade_level'], name='document_program_grade'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['program', 'skill_category'], name='document_program_skill'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['program', 'topic'], name='document_program_topic'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['program', 'difficulty'], name='document_program_difficulty'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadeddocument',
+            index=models.Index(fields=['difficulty', 'grade_level'], name='document_difficulty_grade'),
+        ),
+    ]
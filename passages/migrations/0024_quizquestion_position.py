@@ -0,0 +1,39 @@
+# Generated by Django 4.2.22 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+def number_existing(apps, schema_editor):
+    # Questions were listed in id order until now, so that is their position.
+    QuizQuestion = apps.get_model('passages', 'QuizQuestion')
+    batch = []
+    position, document_id = 0, None
+    for question in QuizQuestion.objects.only('id', 'document_id').order_by('document_id', 'id').iterator(chunk_size=500):
+        position = position + 1 if question.document_id == document_id else 0
+        document_id = question.document_id
+        question.position = position
+        batch.append(question)
+        if len(batch) == 500:
+            QuizQuestion.objects.bulk_update(batch, ['position'])
+            batch = []
+    QuizQuestion.objects.bulk_update(batch, ['position'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0023_document_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='quizquestion',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddField(
+            model_name='quizquestion',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.22 on 2026-10-18 15:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('passages', '0024_quizquestion_position'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quizresponse',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='quizresponse',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('user', 'document', 'idempotency_key'), name='response_idempotency_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='quizresponse',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('document', 'idempotency_key'), name='response_idempotency_anonymous'),
+        ),
+    ]
@@ -1,9 +1,11 @@
 import random
 import string
+import uuid
 
 from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.utils import timezone
 
 
 def generate_join_code():
@@ -78,6 +80,8 @@ class Topic(models.Model):
     def __str__(self):
         return self.name
     
+EXCERPT_LENGTH = 200  # characters of passage shown on catalog cards
+
 class UploadedDocument(models.Model):
     PROGRAM_STANDARD = 'standard'
     PROGRAM_SHSAT = 'shsat'
@@ -111,6 +115,45 @@ class UploadedDocument(models.Model):
     )
     topic = models.ForeignKey(Topic, on_delete=models.SET_NULL, null=True, blank=True)
     uploader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    # What the questions were last imported with (see `reparse_stale`): the
+    # pye_parser.PARSER_VERSION, and hashes of the extracted text and of the parse.
+    parser_version = models.PositiveIntegerField(default=0, db_index=True)
+    extracted_hash = models.CharField(max_length=64, blank=True)
+    parsed_hash = models.CharField(max_length=64, blank=True)
+    # Bumped on every change to what DocumentDetailView serves; keys its cache and ETag.
+    content_version = models.PositiveIntegerField(default=1)
+    content_updated_at = models.DateTimeField(default=timezone.now)
+    # Derived from parsed_text on save, so the catalog list never loads the passage.
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The catalog's keyset pagination order (passages/pagination.py).
+            models.Index(fields=['-uploaded_at', '-id'], name='document_catalog_order'),
+            # Grouped facet counts (passages/facets.py), within a program or a difficulty.
+            models.Index(fields=['program', 'grade_level'], name='document_program_grade'),
+            models.Index(fields=['program', 'skill_category'], name='document_program_skill'),
+            models.Index(fields=['program', 'topic'], name='document_program_topic'),
+            models.Index(fields=['program', 'difficulty'], name='document_program_difficulty'),
+            models.Index(fields=['difficulty', 'grade_level'], name='document_difficulty_grade'),
+        ]
+
+    def summarize_text(self):
+        """Refresh `excerpt` and `word_count` from `parsed_text`."""
+        words = (self.parsed_text or '').split()
+        self.word_count = len(words)
+        excerpt = ' '.join(words)
+        if len(excerpt) > EXCERPT_LENGTH:
+            excerpt = excerpt[:EXCERPT_LENGTH + 1].rsplit(' ', 1)[0]
+        self.excerpt = excerpt[:EXCERPT_LENGTH]
+
+    def save(self, *args, **kwargs):
+        self.summarize_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parsed_text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt', 'word_count'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -119,8 +162,13 @@ class QuizQuestion(models.Model):
     document = models.ForeignKey(UploadedDocument, on_delete=models.CASCADE, related_name='questions')
     question_text = models.TextField()
     explanation = models.TextField(blank=True, null=True)
+    # Where the question sits in the document's file; quizzes list questions in this order.
+    position = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['position', 'id']
+
     def __str__(self):
         return f"{self.document.title} - {self.question_text[:50]}..."
 
@@ -139,8 +187,24 @@ class QuizResponse(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     score = models.IntegerField()
     total_questions = models.IntegerField()
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Set when the quiz was graded, which is before the row is written for queued (burst mode) submissions.
+    submitted_at = models.DateTimeField(default=timezone.now)
     duration_seconds = models.IntegerField(default=0, help_text="Time taken in seconds")
+    # Client-supplied Idempotency-Key: a retried submission returns the first one instead of a duplicate.
+    # Keys are the client's, so they are unique per (user, document), not globally.
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'document', 'idempotency_key'], condition=models.Q(user__isnull=False),
+                name='response_idempotency_per_user',
+            ),
+            models.UniqueConstraint(
+                fields=['document', 'idempotency_key'], condition=models.Q(user__isnull=True),
+                name='response_idempotency_anonymous',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.document.title} - {self.score}/{self.total_questions}"
@@ -154,7 +218,83 @@ class UserAnswer(models.Model):
     def __str__(self):
         return f"{self.response.user_name or 'Anonymous'} - {self.question.question_text[:30]}"
 
+class IngestionJob(models.Model):
+    """Queued parse of an uploaded document, picked up by `run_ingestion_workers`."""
+
+    STATUS_QUEUED = 'queued'
+    STATUS_PARSING = 'parsing'
+    STATUS_VALIDATED = 'validated'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_PARSING, 'Parsing'),
+        (STATUS_VALIDATED, 'Validated'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    document = models.ForeignKey(UploadedDocument, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    problems = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    # Which quiz format the parser detected ("pye" or "labeled"); see passages.formats.
+    grammar = models.CharField(max_length=20, blank=True)
+    # Local copy of a chunked upload (passages.uploads) to parse instead of the stored file.
+    staged_path = models.CharField(max_length=500, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.document.title} ({self.status})"
 
 
+class UploadSession(models.Model):
+    """Resumable chunked upload in progress; see passages.uploads."""
 
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_ABORTED, 'Aborted'),
+    ]
+
+    BACKEND_LOCAL = 'local'
+    BACKEND_S3 = 's3'
+    BACKEND_CHOICES = [
+        (BACKEND_LOCAL, 'Local staging'),
+        (BACKEND_S3, 'S3 multipart upload'),
+    ]
 
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Optional SHA-256 of the whole file, checked when the upload completes.
+    sha256 = models.CharField(max_length=64, blank=True)
+    # Title, grade level etc. for the UploadedDocument created on completion.
+    metadata = models.JSONField(default=dict, blank=True)
+    backend = models.CharField(max_length=10, choices=BACKEND_CHOICES, default=BACKEND_LOCAL)
+    storage_name = models.CharField(max_length=500)
+    s3_upload_id = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    document = models.ForeignKey(UploadedDocument, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
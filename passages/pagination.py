@@ -0,0 +1,85 @@
+"""
+Keyset ("seek") pagination for the document catalog.
+
+Pages are ordered newest first on (uploaded_at, id) and the cursor is the
+last row's pair, so fetching page N is one index range scan on
+`document_catalog_order` whatever N is, and rows inserted or deleted while a
+client pages never make it skip or repeat a document.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class UploadedAtCursorPagination(BasePagination):
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, document) -> str:
+        raw = f"{document.uploaded_at.isoformat()}|{document.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """(uploaded_at, id) from the request's cursor, or None on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode()
+            uploaded_at, pk = raw.rsplit('|', 1)
+            position = parse_datetime(uploaded_at), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        queryset = queryset.order_by('-uploaded_at', '-id')
+        position = self.decode_cursor(request)
+        if position is not None:
+            uploaded_at, pk = position
+            # (uploaded_at, id) < position; the leading <= keeps it an index range.
+            queryset = queryset.filter(
+                Q(uploaded_at__lte=uploaded_at) & (Q(uploaded_at__lt=uploaded_at) | Q(id__lt=pk))
+            )
+        rows = list(queryset[:size + 1])
+        self.next_cursor = self.encode_cursor(rows[size - 1]) if len(rows) > size else None
+        return rows[:size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,112 @@
+"""
+Parse results cached by file content, so re-uploading the same .docx/.pdf
+skips extraction and parsing.
+
+Entries live in the "parse" cache alias, keyed by the SHA-256 of the file
+bytes and versioned with PARSER_VERSION: a parser bump makes every older entry
+unreachable, and the backend's MAX_ENTRIES culling evicts them.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .formats import ParseResult
+from .sandbox import ParseLimits, parse_with_limits, sandboxed_parse
+from .pye_parser import PARSER_VERSION, parsed_doc_from_dict, parsed_doc_to_dict
+
+CACHE_ALIAS = "parse"
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _key(content_hash: str) -> str:
+    return f"pye:{content_hash}"
+
+
+def file_sha256(fileobj) -> str:
+    """Hash a file-like object's bytes in chunks and rewind it."""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def get_parsed(content_hash: str) -> ParseResult | None:
+    entry = _cache().get(_key(content_hash), version=PARSER_VERSION)
+    if entry is None:
+        return None
+    return ParseResult(
+        parsed_doc_from_dict(entry["parsed"]),
+        list(entry["problems"]),
+        entry["grammar"],
+        entry.get("extracted_hash", ""),     # absent from entries cached before it was recorded
+    )
+
+
+def store_parsed(content_hash: str, result: ParseResult) -> None:
+    _cache().set(
+        _key(content_hash),
+        {
+            "parsed": parsed_doc_to_dict(result.parsed),
+            "problems": list(result.problems),
+            "grammar": result.grammar,
+            "extracted_hash": result.extracted_hash,
+        },
+        version=PARSER_VERSION,
+    )
+
+
+def parse_file(fileobj, file_name: str | None = None) -> ParseResult:
+    """
+    Return (parsed, problems, grammar) for an upload, from the cache when these
+    exact bytes were already parsed by the current parser version.
+
+    Misses are parsed within settings.PARSE_SANDBOX limits, in a child process
+    unless the sandbox is disabled. Parse errors, including limit violations,
+    are not cached; the PYEParseError propagates as before. The upload is
+    never read into memory whole: the sandbox gets a path to read from.
+    """
+    content_hash = file_sha256(fileobj)
+    cached = get_parsed(content_hash)
+    if cached is not None:
+        return cached
+
+    file_name = file_name or getattr(fileobj, "name", None)
+    limits = ParseLimits.from_settings()
+    if settings.PARSE_SANDBOX["ENABLED"]:
+        with _local_path(fileobj, file_name) as path:
+            result = sandboxed_parse(path, file_name, limits, pdf_workers=settings.PDF_EXTRACT_WORKERS)
+    else:
+        result = parse_with_limits(fileobj, file_name, limits, pdf_workers=settings.PDF_EXTRACT_WORKERS)
+        fileobj.seek(0)
+    store_parsed(content_hash, result)
+    return result
+
+
+@contextmanager
+def _local_path(fileobj, file_name: str | None):
+    """A path holding the upload's bytes: its own file when it has one on disk, else a copy made in chunks."""
+    if hasattr(fileobj, "temporary_file_path"):
+        yield fileobj.temporary_file_path()
+        return
+    if isinstance(fileobj, io.BufferedReader) and os.path.isfile(fileobj.name):
+        yield fileobj.name
+        return
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file_name or "")[1]) as copy:
+        shutil.copyfileobj(fileobj, copy, _CHUNK_SIZE)
+        copy.flush()
+        fileobj.seek(0)
+        yield copy.name
@@ -0,0 +1,147 @@
+"""
+Rendered DocumentDetailView payloads, cached per document content version.
+
+Each UploadedDocument carries a `content_version` that is bumped whenever its
+passage, questions or answers change (`bump_content_version`: the importer,
+question generation, the question/answer API and the admin all call it). The
+rendered JSON is cached under (document id, version), so an edit never has
+to find and delete old entries: they simply stop being asked for and the
+backend's MAX_ENTRIES culling evicts them.
+
+The version also makes the ETag, and `content_updated_at` the Last-Modified,
+so a client that already has the payload gets a 304 after one indexed
+lookup, without any serialization.
+
+The student quiz payload (`get_quiz_variants`) is a compact, answer-free
+schema stored already compressed: identity, gzip and br bodies share one
+cache entry, so a hit is a byte copy with no serializer or compressor run.
+The br variant is optional: it is built when the `brotli` package (listed in
+requirements.txt) imports, and without it only gzip is precompressed.
+
+Entries live in the "payload" cache alias: in-process LocMem by default,
+or any shared Django cache backend via PAYLOAD_CACHE_BACKEND / _LOCATION.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import QuizAnswer, QuizQuestion, UploadedDocument
+from .serializers import DocumentDetailSerializer
+
+try:
+    import brotli
+except ImportError:     # without it only gzip is precompressed
+    brotli = None
+
+CACHE_ALIAS = "payload"
+
+
+def _stamp(document_id: int, version: int, updated_at) -> str:
+    # The timestamp keeps a re-used id (a deleted and re-created row on SQLite) from matching.
+    return f"{document_id}-v{version}-{int(updated_at.timestamp() * 1_000_000)}"
+
+
+def bump_content_version(*document_ids: int) -> None:
+    """Mark documents' served content as changed. Call after the change, inside its transaction."""
+    UploadedDocument.objects.filter(id__in=document_ids).update(
+        content_version=F('content_version') + 1, content_updated_at=timezone.now(),
+    )
+
+
+def content_state(document_id: int):
+    """(content_version, content_updated_at) of a document, or None if it does not exist."""
+    return (
+        UploadedDocument.objects.filter(pk=document_id)
+        .values_list('content_version', 'content_updated_at')
+        .first()
+    )
+
+
+def etag_for(document_id: int, version: int, updated_at, kind: str = "doc") -> str:
+    return f'"{kind}-{_stamp(document_id, version, updated_at)}"'
+
+
+def render_payload(document_id: int) -> bytes:
+    document = (
+        UploadedDocument.objects
+        .select_related('grade_level', 'skill_category')
+        .prefetch_related('questions__answers')
+        .get(pk=document_id)
+    )
+    return JSONRenderer().render(DocumentDetailSerializer(document).data)
+
+
+def get_payload(document_id: int, version: int, updated_at) -> bytes:
+    """The document's rendered JSON at this content state, rendering and caching it on a miss."""
+    cache = caches[CACHE_ALIAS]
+    key = f"doc-detail:{_stamp(document_id, version, updated_at)}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = render_payload(document_id)
+        cache.set(key, payload)
+    return payload
+
+
+def render_quiz_payload(document_id: int) -> bytes:
+    """
+    What a student needs to take the quiz: title, passage, question ids and
+    text, and choice ids, letters and text. No answer key, explanations or
+    metadata. Field names match DocumentDetailView's, so clients can switch.
+    """
+    document = UploadedDocument.objects.values('id', 'title', 'parsed_text').get(pk=document_id)
+    answers = {}
+    for answer in (
+        QuizAnswer.objects.filter(question__document_id=document_id)
+        .order_by('id').values('id', 'question_id', 'choice_letter', 'choice_text')
+    ):
+        answers.setdefault(answer.pop('question_id'), []).append(answer)
+    document['questions'] = [
+        {**question, 'answers': answers.get(question['id'], [])}
+        for question in (
+            QuizQuestion.objects.filter(document_id=document_id).order_by('position', 'id').values('id', 'question_text')
+        )
+    ]
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress_variants(body: bytes) -> dict[str, bytes]:
+    """The body under each content coding worth sending, keyed by Content-Encoding ("identity" for none)."""
+    variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body)
+    return {coding: data for coding, data in variants.items() if coding == 'identity' or len(data) < len(body)}
+
+
+def get_quiz_variants(document_id: int, version: int, updated_at) -> dict[str, bytes]:
+    """Precompressed quiz payloads at this content state, building and caching them on a miss."""
+    cache = caches[CACHE_ALIAS]
+    key = f"doc-quiz:{_stamp(document_id, version, updated_at)}"
+    variants = cache.get(key)
+    if variants is None:
+        variants = compress_variants(render_quiz_payload(document_id))
+        cache.set(key, variants)
+    return variants
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Best coding in `available` that the Accept-Encoding header allows: br, then gzip, then identity."""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in ('br', 'gzip'):
+        if coding in available and accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
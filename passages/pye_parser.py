@@ -6,13 +6,23 @@ Returns plain dataclasses that a separate DB-writer maps onto
 UploadedDocument / QuizQuestion / QuizAnswer.
 """
 from __future__ import annotations
+import io
 import re
-from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, NamedTuple, Optional
 
-import docx  # python-docx (already in requirements.txt)
 from pypdf import PdfReader
+from pypdf.generic import ArrayObject, IndirectObject
+
+from .docx_reader import PARAGRAPH, iter_docx_blocks
+
+
+# Bump whenever a change can alter parse_pye output (or the grammar that
+# formats.detect_grammar picks) for the same input; cached parses from older
+# versions are then ignored.
+PARSER_VERSION = 2
 
 
 # ---- data shapes -----------------------------------------------------------
@@ -44,6 +54,28 @@ class PYEParseError(Exception):
     pass
 
 
+def parsed_doc_to_dict(doc: ParsedDoc) -> dict:
+    """JSON-friendly form of a ParsedDoc (for caches and job payloads)."""
+    return asdict(doc)
+
+
+def parsed_doc_from_dict(data: dict) -> ParsedDoc:
+    return ParsedDoc(
+        title=data["title"],
+        passage=data["passage"],
+        questions=[
+            Question(
+                number=q["number"],
+                text=q["text"],
+                choices=[Choice(**c) for c in q["choices"]],
+                correct_letter=q["correct_letter"],
+                explanation=q["explanation"],
+            )
+            for q in data["questions"]
+        ],
+    )
+
+
 SUPPORTED_EXTENSIONS = {".docx", ".pdf"}
 
 
@@ -78,9 +110,20 @@ NUMBERED_KEY_MARKER_RE = re.compile(r"(?<!\w)(\d{1,2})\s*[.)]\s*([A-D])\s*(?:\(\
 # fallback: bare "A" with no explanation
 KEY_BARE_RE = re.compile(r"^([A-D])\s*$")
 
+# Question and choice markers in one alternation, so the questions section is
+# scanned once. The branches are QUESTION_MARKER_RE and CHOICE_MARKER_RE.
+QUESTION_TOKEN_RE = re.compile(
+    r'(?<!\w)(?:'
+    r'(?P<number>\d{1,2})\s*[.)]\s+'
+    r'|(?P<letter>[A-D])\s*[.)]\s*["\u201c\u201d]?(?:\s+|(?=[A-Z](?![.)]))|(?=[a-z\d]))'
+    r')',
+    re.S,
+)
+
 
 def _clean(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip()
+    # str.split() and the regex \s agree on what whitespace is, and this avoids a regex pass.
+    return " ".join(s.split())
 
 
 def _paragraph_ref(lines: list[str], index: int) -> str:
@@ -101,7 +144,7 @@ def _preview_readable_paragraphs(lines: list[str], limit: int = 5) -> str:
     return f"First readable paragraphs: {preview}."
 
 
-def _format_error(problem: str, *, hint: str | None = None, context: str | None = None) -> str:
+def format_error(problem: str, *, hint: str | None = None, context: str | None = None) -> str:
     parts = [problem]
     if context:
         parts.append(context)
@@ -119,22 +162,52 @@ def _source_name(source, file_name: str | None = None) -> str:
     return getattr(source, "name", "") or ""
 
 
-def _source_extension(source, file_name: str | None = None) -> str:
+def source_extension(source, file_name: str | None = None) -> str:
     return Path(_source_name(source, file_name)).suffix.lower()
 
 
+def iter_docx_paragraphs(source) -> Iterator[str]:
+    """Body paragraphs of a .docx, streamed from its XML (tables are skipped, as before)."""
+    for block in iter_docx_blocks(source):
+        if block.kind == PARAGRAPH:
+            yield block.text
+
+
 def extract_docx_paragraphs(source) -> list[str]:
     """source: path str or a file-like object. Returns non-normalized paragraph texts."""
-    doc = docx.Document(source)
-    return [p.text for p in doc.paragraphs]
+    return list(iter_docx_paragraphs(source))
+
 
+def _release_page(reader: PdfReader, page) -> None:
+    """Drop an extracted page's content stream from pypdf's resolved-object cache."""
+    contents = page.raw_get("/Contents") if "/Contents" in page else None
+    refs = contents if isinstance(contents, ArrayObject) else [contents]
+    for ref in refs:
+        if isinstance(ref, IndirectObject):
+            reader.resolved_objects.pop((ref.generation, ref.idnum), None)
 
-def extract_pdf_paragraphs(source) -> list[str]:
-    """Extract readable text blocks from a PDF for the PYE parser."""
+
+def iter_pdf_paragraphs(source) -> Iterator[str]:
+    """
+    Yield readable text blocks from a PDF one page at a time.
+
+    Paths are read through a file handle rather than loaded whole, and each
+    page's content stream is released once its text has been yielded, so long
+    practice packets can be fed into `parse_pye` in bounded memory.
+    """
+    handle = open(source, "rb") if isinstance(source, (str, Path)) else None
+    try:
+        yield from _iter_reader_paragraphs(handle or source)
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+def _open_pdf(source) -> PdfReader:
     try:
         reader = PdfReader(source)
     except Exception as exc:
-        raise PYEParseError(_format_error(
+        raise PYEParseError(format_error(
             "Could not read the uploaded PDF.",
             hint="Upload a readable, uncorrupted PDF or export the source document again.",
         )) from exc
@@ -143,80 +216,331 @@ def extract_pdf_paragraphs(source) -> list[str]:
         try:
             reader.decrypt("")
         except Exception as exc:
-            raise PYEParseError(_format_error(
+            raise PYEParseError(format_error(
                 "The uploaded PDF is encrypted or password protected.",
                 hint="Remove the password/encryption and upload the PDF again.",
             )) from exc
+    return reader
+
 
-    paragraphs: list[str] = []
+def _page_lines(reader: PdfReader, page_number: int, page) -> list[str]:
+    try:
+        text = page.extract_text() or ""
+    except Exception as exc:
+        raise PYEParseError(format_error(
+            f"Could not extract text from page {page_number} of the PDF.",
+            hint="Use a text-based PDF instead of a scanned/image-only PDF.",
+        )) from exc
+    _release_page(reader, page)
+
+    # Preserve page-level reading order while giving the parser paragraph-ish blocks.
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _no_pdf_text_error() -> PYEParseError:
+    return PYEParseError(format_error(
+        "No readable text was found in the uploaded PDF.",
+        hint="Upload a text-based PDF. Scanned PDFs need OCR before this app can parse them.",
+    ))
+
+
+def _iter_reader_paragraphs(source) -> Iterator[str]:
+    yield from _iter_pdf_reader(_open_pdf(source))
+
+
+def _iter_pdf_reader(reader: PdfReader) -> Iterator[str]:
+    found_text = False
     for page_number, page in enumerate(reader.pages, start=1):
-        try:
-            text = page.extract_text() or ""
-        except Exception as exc:
-            raise PYEParseError(_format_error(
-                f"Could not extract text from page {page_number} of the PDF.",
-                hint="Use a text-based PDF instead of a scanned/image-only PDF.",
-            )) from exc
+        lines = _page_lines(reader, page_number, page)
+        found_text = found_text or bool(lines)
+        yield from lines
 
-        # Preserve page-level reading order while giving the parser paragraph-ish blocks.
-        paragraphs.extend(line.strip() for line in text.splitlines() if line.strip())
+    if not found_text:
+        raise _no_pdf_text_error()
 
-    if not paragraphs:
-        raise PYEParseError(_format_error(
-            "No readable text was found in the uploaded PDF.",
-            hint="Upload a text-based PDF. Scanned PDFs need OCR before this app can parse them.",
-        ))
 
+# Below this many pages, starting a process pool costs more than it saves.
+PARALLEL_PDF_MIN_PAGES = 24
+
+# Each page-range worker opens the PDF (a path, or the upload's bytes) once, in
+# the pool initializer, and reuses that reader for every range it is given.
+_worker_reader: PdfReader | None = None
+
+
+def _init_pdf_worker(pdf: str | bytes) -> None:
+    global _worker_reader
+    _worker_reader = _open_pdf(io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf)
+
+
+def _extract_page_range(start: int, stop: int) -> list[list[str]]:
+    """Lines of pages [start, stop) (0-based) of the worker's PDF, one list per page."""
+    reader = _worker_reader
+    return [_page_lines(reader, index + 1, reader.pages[index]) for index in range(start, stop)]
+
+
+def _extract_pdf_parallel(source, workers: int) -> list[str]:
+    if isinstance(source, (str, Path)):
+        pdf: str | bytes = str(source)
+    else:
+        source.seek(0)
+        pdf = source.read()
+
+    reader = _open_pdf(io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf)
+    page_count = len(reader.pages)
+    if page_count < PARALLEL_PDF_MIN_PAGES:
+        return list(_iter_pdf_reader(reader))
+    del reader
+
+    # A few ranges per worker so one slow range does not leave the others idle.
+    step = max(1, -(-page_count // (workers * 4)))
+    starts = range(0, page_count, step)
+    stops = [min(start + step, page_count) for start in starts]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(starts)), initializer=_init_pdf_worker, initargs=(pdf,),
+    ) as pool:
+        # map() yields in page order and re-raises a range's PYEParseError, so the
+        # error reported is for the earliest failing page, as in the serial path.
+        ranges = pool.map(_extract_page_range, starts, stops)
+        paragraphs = [line for pages in ranges for lines in pages for line in lines]
+
+    if not paragraphs:
+        raise _no_pdf_text_error()
     return paragraphs
 
 
-def extract_paragraphs(source, file_name: str | None = None) -> list[str]:
-    """Extract parser input paragraphs from a supported upload."""
-    extension = _source_extension(source, file_name)
+def extract_pdf_paragraphs(source, *, workers: int = 1) -> list[str]:
+    """
+    Extract readable text blocks from a PDF for the PYE parser.
+
+    With `workers` > 1, PDFs of PARALLEL_PDF_MIN_PAGES pages or more have their
+    pages extracted by a process pool; each worker opens the PDF once and
+    takes ranges of pages from it. Smaller files are read serially.
+    """
+    if workers > 1:
+        return _extract_pdf_parallel(source, workers)
+    return list(iter_pdf_paragraphs(source))
+
+
+def extract_paragraphs(
+    source, file_name: str | None = None, *, stream: bool = False, pdf_workers: int = 1,
+) -> Iterable[str]:
+    """
+    Extract parser input paragraphs from a supported upload.
+
+    With `stream=True` a generator is returned instead of a list (page by page
+    for PDFs); pass it straight to `parse_pye` to keep memory bounded.
+    Otherwise `pdf_workers` > 1 extracts long PDFs page-parallel.
+    """
+    extension = source_extension(source, file_name)
     if extension == ".pdf":
-        return extract_pdf_paragraphs(source)
+        return iter_pdf_paragraphs(source) if stream else extract_pdf_paragraphs(source, workers=pdf_workers)
     if extension in {"", ".docx"}:
-        return extract_docx_paragraphs(source)
+        return iter_docx_paragraphs(source) if stream else extract_docx_paragraphs(source)
 
     supported = ", ".join(sorted(SUPPORTED_EXTENSIONS))
-    raise PYEParseError(_format_error(
+    raise PYEParseError(format_error(
         f"Unsupported file type '{extension or 'unknown'}'.",
         hint=f"Upload one of these formats: {supported}.",
     ))
 
 
-def _document_text(paragraphs: list[str]) -> str:
-    return "\n".join(p.rstrip() for p in paragraphs if p and p.strip())
-
-
-def _split_marker_chunks(text: str, marker_re: re.Pattern) -> list[tuple[re.Match, str]]:
-    matches = list(marker_re.finditer(text))
-    chunks: list[tuple[re.Match, str]] = []
-    for index, match in enumerate(matches):
-        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
-        chunks.append((match, text[match.end():end].strip()))
-    return chunks
-
-
-def _parse_questions_block(text: str) -> list[Question]:
-    normalized = _clean(text)
-    questions: list[Question] = []
-
-    for question_match, question_chunk in _split_marker_chunks(normalized, QUESTION_MARKER_RE):
-        choice_chunks = _split_marker_chunks(question_chunk, CHOICE_MARKER_RE)
-        if choice_chunks:
-            question_text = _clean(question_chunk[:choice_chunks[0][0].start()])
+class Token(NamedTuple):
+    """One lexical unit of a PYE document, in document order."""
+    kind: str                  # one of the TOKEN_* constants below
+    text: str = ""
+    number: Optional[int] = None
+    letter: Optional[str] = None
+
+
+TOKEN_TITLE = "title"
+TOKEN_PASSAGE = "passage"
+TOKEN_QUESTIONS_HEADER = "questions_header"
+TOKEN_QUESTION = "question"
+TOKEN_CHOICE = "choice"
+TOKEN_TEXT = "text"
+TOKEN_ANSWER_KEY_HEADER = "answer_key_header"
+TOKEN_KEY = "key"
+TOKEN_KEY_LINE = "key_line"
+
+
+class _MarkerLexer:
+    """
+    Incremental scanner over normalized section text.
+
+    Text is appended piece by piece and each character is scanned a bounded
+    number of times: once a marker can no longer change it is emitted together
+    with the text before it, and only a short tail is kept for the next piece.
+    """
+
+    # Longer than any marker in normalized text ("12 . B ( " is 9 chars), so a
+    # match starting before the last _TAIL chars cannot change with more text.
+    _TAIL = 16
+
+    def __init__(self, pattern: re.Pattern):
+        self._pattern = pattern
+        self._buffer = ""
+        self._emitted = 0
+
+    def feed(self, text: str) -> list[tuple[Optional[re.Match], str]]:
+        text = _clean(text)
+        if not text:
+            return []
+        self._buffer = f"{self._buffer} {text}" if self._buffer else text
+        return self._scan(final=False)
+
+    def finish(self) -> list[tuple[Optional[re.Match], str]]:
+        pieces = self._scan(final=True)
+        self._buffer = ""
+        self._emitted = 0
+        return pieces
+
+    def _scan(self, *, final: bool) -> list[tuple[Optional[re.Match], str]]:
+        buffer = self._buffer
+        settled = len(buffer) if final else len(buffer) - self._TAIL
+        pieces: list[tuple[Optional[re.Match], str]] = []
+        emitted = self._emitted
+        for match in self._pattern.finditer(buffer, emitted):
+            if match.start() > settled:
+                break               # may still grow or move once more text arrives
+            if match.start() > emitted:
+                pieces.append((None, buffer[emitted:match.start()]))
+            pieces.append((match, match.group(0)))
+            emitted = match.end()
+
+        if settled > emitted:
+            pieces.append((None, buffer[emitted:settled]))
+            emitted = settled
+
+        # Keep one already-emitted character so lookbehinds still see it.
+        keep = max(emitted - 1, 0)
+        self._buffer = buffer[keep:]
+        self._emitted = emitted - keep
+        return pieces
+
+
+_HEAD, _QUESTIONS, _ANSWER_KEY = range(3)
+
+
+class _PYELexer:
+    """
+    Turns a paragraph stream into Tokens in one linear pass.
+
+    Section headers are searched across at most two consecutive paragraphs, so
+    only the previous paragraph is held back. Within a section, markers are
+    found by a single combined pattern (questions + choices, or key entries).
+    """
+
+    _PREVIEW_LIMIT = 5
+
+    def __init__(self):
+        self._section = _HEAD
+        self._pending: str | None = None
+        self._preview: list[str] = []
+        self._seen_title = False
+        self._question_lexer = _MarkerLexer(QUESTION_TOKEN_RE)
+        self._key_lexer = _MarkerLexer(NUMBERED_KEY_MARKER_RE)
+
+    def feed(self, paragraph: str) -> Iterator[Token]:
+        if not paragraph or not paragraph.strip():
+            return
+        paragraph = paragraph.rstrip()
+        self._remember_preview(paragraph)
+
+        if self._section == _ANSWER_KEY:
+            yield from self._section_tokens(paragraph)
+            return
+
+        if self._pending is None:
+            window = paragraph
         else:
-            question_text = _clean(question_chunk)
-
-        question = Question(number=int(question_match.group(1)), text=question_text)
-        for choice_match, choice_text in choice_chunks:
-            question.choices.append(
-                Choice(letter=choice_match.group(1).upper(), text=_clean(choice_text))
-            )
-        questions.append(question)
-
-    return questions
+            window = f"{self._pending}\n{paragraph}"
+        match = self._header_re().search(window)
+        if match is None:
+            if self._pending is not None:
+                yield from self._section_tokens(self._pending)
+            self._pending = paragraph
+            return
+
+        self._pending = None
+        while match is not None:
+            yield from self._section_tokens(window[:match.start()])
+            yield from self._close_section()
+            window = window[match.end():]
+            if self._section == _ANSWER_KEY:
+                yield from self._section_tokens(window)
+                return
+            match = self._header_re().search(window)
+        self._pending = window
+
+    def finish(self) -> Iterator[Token]:
+        if self._pending is not None:
+            yield from self._section_tokens(self._pending)
+            self._pending = None
+
+        if self._section == _HEAD:
+            raise PYEParseError(format_error(
+                "Could not find a 'Questions to Answer' header.",
+                context=_preview_readable_paragraphs(self._preview, limit=self._PREVIEW_LIMIT),
+                hint="Add 'Questions to Answer' as its own paragraph after the passage and before the numbered questions.",
+            ))
+        if self._section == _QUESTIONS:
+            raise PYEParseError(format_error(
+                "Could not find an 'Answer Key' header.",
+                hint="Add 'Answer Key' as its own paragraph after the last question and before the correct answers.",
+            ))
+        if not self._seen_title:
+            raise PYEParseError(format_error(
+                "No title or passage text was found before the questions.",
+                hint="Add a title paragraph and at least one passage paragraph before the 'Questions to Answer' header.",
+            ))
+        yield from self._marker_tokens(self._key_lexer.finish())
+
+    def _header_re(self) -> re.Pattern:
+        return QUESTIONS_HEADER_TEXT if self._section == _HEAD else ANSWER_KEY_HEADER_TEXT
+
+    def _remember_preview(self, paragraph: str) -> None:
+        # One extra line lets the preview know to append "...".
+        if len(self._preview) <= self._PREVIEW_LIMIT:
+            self._preview.append(paragraph)
+
+    def _close_section(self) -> Iterator[Token]:
+        if self._section == _HEAD:
+            self._section = _QUESTIONS
+            yield Token(TOKEN_QUESTIONS_HEADER)
+        else:
+            yield from self._marker_tokens(self._question_lexer.finish())
+            self._section = _ANSWER_KEY
+            yield Token(TOKEN_ANSWER_KEY_HEADER)
+
+    def _section_tokens(self, text: str) -> Iterator[Token]:
+        if self._section == _HEAD:
+            for line in text.splitlines():
+                line = _clean(line)
+                if not line:
+                    continue
+                if self._seen_title:
+                    yield Token(TOKEN_PASSAGE, line)
+                else:
+                    self._seen_title = True
+                    yield Token(TOKEN_TITLE, line)
+        elif self._section == _QUESTIONS:
+            yield from self._marker_tokens(self._question_lexer.feed(text))
+        else:
+            yield from self._marker_tokens(self._key_lexer.feed(text))
+            for line in text.splitlines():
+                yield Token(TOKEN_KEY_LINE, line)
+
+    @staticmethod
+    def _marker_tokens(pieces: list[tuple[Optional[re.Match], str]]) -> Iterator[Token]:
+        for match, text in pieces:
+            if match is None:
+                yield Token(TOKEN_TEXT, text)
+            elif match.lastgroup == "number":
+                yield Token(TOKEN_QUESTION, text, number=int(match.group("number")))
+            elif match.lastgroup == "letter":
+                yield Token(TOKEN_CHOICE, text, letter=match.group("letter").upper())
+            else:
+                yield Token(TOKEN_KEY, text, number=int(match.group(1)), letter=match.group(2).upper())
 
 
 def _strip_wrapping_parens(text: str) -> str:
@@ -226,97 +550,146 @@ def _strip_wrapping_parens(text: str) -> str:
     return text.strip()
 
 
-def _parse_answer_key_block(text: str) -> dict[int, tuple[str, str]]:
-    normalized = _clean(text)
-    keyed_answers: dict[int, tuple[str, str]] = {}
-
-    for key_match, explanation in _split_marker_chunks(normalized, NUMBERED_KEY_MARKER_RE):
-        keyed_answers[int(key_match.group(1))] = (
-            key_match.group(2).upper(),
-            _strip_wrapping_parens(explanation),
+class _DocumentBuilder:
+    """State machine that assembles a ParsedDoc from the lexer's tokens."""
+
+    def __init__(self):
+        self._title = ""
+        self._passage_parts: list[str] = []
+        self._in_answer_key = False
+
+        self._questions: list[Question] = []
+        self._question: Question | None = None
+        # Text pieces of the question (index 0) and of each of its choices.
+        self._parts: list[list[str]] = []
+        self._choice_markers: list[str] = []
+
+        self._keyed_answers: dict[int, tuple[str, str]] = {}
+        self._key: Token | None = None
+        self._key_parts: list[str] = []
+        self._legacy_entries: list[tuple[str, list[str]]] = []
+
+    def add(self, token: Token) -> None:
+        kind = token.kind
+        if kind == TOKEN_TEXT:
+            if self._in_answer_key:
+                if self._key is not None:
+                    self._key_parts.append(token.text)
+            elif self._question is not None:
+                self._parts[-1].append(token.text)
+        elif kind == TOKEN_CHOICE:
+            if self._question is not None:
+                self._question.choices.append(Choice(letter=token.letter, text=""))
+                self._parts.append([])
+                self._choice_markers.append(token.text)
+        elif kind == TOKEN_QUESTION:
+            self._close_question()
+            self._question = Question(number=token.number, text="")
+            self._parts = [[]]
+            self._choice_markers = []
+        elif kind == TOKEN_KEY:
+            self._close_key()
+            self._key = token
+        elif kind == TOKEN_KEY_LINE:
+            self._add_legacy_line(token.text)
+        elif kind == TOKEN_PASSAGE:
+            self._passage_parts.append(token.text)
+        elif kind == TOKEN_TITLE:
+            self._title = token.text
+        elif kind == TOKEN_ANSWER_KEY_HEADER:
+            self._close_question()
+            self._in_answer_key = True
+
+    def _close_question(self) -> None:
+        question = self._question
+        if question is None:
+            return
+        # The last choice runs up to the next question, where trailing space is
+        # cut; re-match its marker there, since a trailing "D." is no marker.
+        if question.choices:
+            region = (self._choice_markers[-1] + "".join(self._parts[-1])).rstrip()
+            match = CHOICE_MARKER_RE.match(region)
+            if match is None:
+                question.choices.pop()
+                self._parts.pop()
+                self._parts[-1].append(region)
+            else:
+                self._parts[-1] = [region[match.end():]]
+
+        question.text = "".join(self._parts[0]).strip()
+        for choice, parts in zip(question.choices, self._parts[1:]):
+            choice.text = "".join(parts).strip()
+        self._questions.append(question)
+        self._question = None
+
+    def _close_key(self) -> None:
+        if self._key is None:
+            return
+        self._keyed_answers[self._key.number] = (
+            self._key.letter,
+            _strip_wrapping_parens("".join(self._key_parts)),
         )
+        self._key = None
+        self._key_parts = []
 
-    return keyed_answers
-
-
-def _parse_legacy_answer_key(lines: list[str]) -> list[tuple[str, str]]:
-    key_entries: list[tuple[str, str]] = []
-    for ln in lines:
-        t = ln.strip()
+    def _add_legacy_line(self, line: str) -> None:
+        """Un-numbered answer-key lines ('B (explanation)'), matched to questions by order."""
+        t = line.strip()
         if not t:
-            continue
+            return
         mk = KEY_RE.match(t)
         mb = KEY_BARE_RE.match(t)
         if mk:
-            key_entries.append((mk.group(1), _clean(mk.group(2))))
+            self._legacy_entries.append((mk.group(1), [_clean(mk.group(2))]))
         elif mb:
-            key_entries.append((mb.group(1), ""))
-        elif key_entries:
-            letter, expl = key_entries[-1]
-            key_entries[-1] = (letter, _clean(expl + " " + t))
-    return key_entries
-
-
-def parse_pye(paragraphs: list[str]) -> ParsedDoc:
-    text = _document_text(paragraphs)
-    lines = [p.rstrip() for p in paragraphs]
-
-    q_match = QUESTIONS_HEADER_TEXT.search(text)
-    if q_match is None:
-        raise PYEParseError(_format_error(
-            "Could not find a 'Questions to Answer' header.",
-            context=_preview_readable_paragraphs(lines),
-            hint="Add 'Questions to Answer' as its own paragraph after the passage and before the numbered questions.",
-        ))
-
-    a_match = ANSWER_KEY_HEADER_TEXT.search(text, q_match.end())
-    if a_match is None:
-        raise PYEParseError(_format_error(
-            "Could not find an 'Answer Key' header.",
-            hint="Add 'Answer Key' as its own paragraph after the last question and before the correct answers.",
-        ))
-    if not q_match.start() < a_match.start():
-        raise PYEParseError(_format_error(
-            "The section headers are out of order.",
-            hint="Put the title and passage first, then 'Questions to Answer', then questions, then 'Answer Key'.",
-        ))
-
-    # --- title + passage ---
-    head_text = text[:q_match.start()]
-    non_empty_head = [_clean(ln) for ln in head_text.splitlines() if ln.strip()]
-    if not non_empty_head:
-        raise PYEParseError(_format_error(
-            "No title or passage text was found before the questions.",
-            hint="Add a title paragraph and at least one passage paragraph before the 'Questions to Answer' header.",
-        ))
-    title = _clean(non_empty_head[0])
-    passage = _clean(" ".join(non_empty_head[1:]))
-
-    # --- questions block ---
-    questions = _parse_questions_block(text[q_match.end():a_match.start()])
-
-    # --- answer key (matched positionally to questions) ---
-    answer_text = text[a_match.end():]
-    keyed_answers = _parse_answer_key_block(answer_text)
-    if keyed_answers:
-        for q in questions:
-            if q.number not in keyed_answers:
-                continue
-            letter, explanation = keyed_answers[q.number]
-            q.correct_letter = letter
-            q.explanation = explanation
-            for c in q.choices:
-                c.is_correct = (c.letter == letter)
-        return ParsedDoc(title=title, passage=passage, questions=questions)
-
-    key_entries = _parse_legacy_answer_key(answer_text.splitlines())
-    for q, (letter, explanation) in zip(questions, key_entries):
-        q.correct_letter = letter
-        q.explanation = explanation
-        for c in q.choices:
-            c.is_correct = (c.letter == letter)
-
-    return ParsedDoc(title=title, passage=passage, questions=questions)
+            self._legacy_entries.append((mb.group(1), []))
+        elif self._legacy_entries:
+            self._legacy_entries[-1][1].append(_clean(t))
+
+    def build(self) -> ParsedDoc:
+        self._close_question()
+        self._close_key()
+
+        questions = self._questions
+        if self._keyed_answers:
+            for q in questions:
+                if q.number not in self._keyed_answers:
+                    continue
+                q.correct_letter, q.explanation = self._keyed_answers[q.number]
+                for c in q.choices:
+                    c.is_correct = (c.letter == q.correct_letter)
+        else:
+            # --- answer key (matched positionally to questions) ---
+            for q, (letter, parts) in zip(questions, self._legacy_entries):
+                q.correct_letter = letter
+                q.explanation = " ".join(part for part in parts if part)
+                for c in q.choices:
+                    c.is_correct = (c.letter == letter)
+
+        # Passage lines are already _clean()ed, so joining them needs no re-normalizing.
+        return ParsedDoc(title=self._title, passage=" ".join(self._passage_parts), questions=questions)
+
+
+def tokenize_pye(paragraphs: Iterable[str]) -> Iterator[Token]:
+    """Lex PYE paragraphs into Tokens. Raises PYEParseError if a section is missing."""
+    lexer = _PYELexer()
+    for paragraph in paragraphs:
+        yield from lexer.feed(paragraph)
+    yield from lexer.finish()
+
+
+def parse_pye(paragraphs: Iterable[str]) -> ParsedDoc:
+    """
+    Parse PYE paragraphs into a ParsedDoc.
+
+    `paragraphs` may be any iterable, including the generator returned by
+    `extract_paragraphs(..., stream=True)`. It is tokenized and assembled in a
+    single linear pass.
+    """
+    builder = _DocumentBuilder()
+    for token in tokenize_pye(paragraphs):
+        builder.add(token)
+    return builder.build()
 
 
 def validate(doc: ParsedDoc) -> list[str]:
@@ -369,7 +742,7 @@ def format_validation_errors(problems: list[str], limit: int = 5) -> str:
     if len(problems) > limit:
         shown.append(f"...and {len(problems) - limit} more issue(s).")
 
-    return _format_error(
+    return format_error(
         "The document was uploaded, but its quiz format is incomplete.",
         hint=" ".join(shown),
     )
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Re-parse documents whose questions came from an older parser (`reparse_stale`).
+
+Every import records the pye_parser.PARSER_VERSION it ran with, a hash of the
+extracted text and a hash of the parse (see importer.stamp_parser_version).
+After a parser bump, workers re-read and re-parse the stale files without
+touching the database, and the parent applies each batch:
+
+- extracted text and parse both unchanged: parser_version is bumped with one
+  UPDATE for the whole batch, and no question rows are read or written;
+- anything else: import_parsed_doc, which only rewrites the rows that changed.
+
+Failed files keep their old version, so the next run retries them.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .formats import parsed_doc_hash
+from .importer import import_parsed_doc
+from .models import UploadedDocument
+from .pye_parser import PARSER_VERSION, PYEParseError, parsed_doc_from_dict, parsed_doc_to_dict
+from .sandbox import ParseLimits, parse_with_limits
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReparseTask:
+    document_id: int
+    file_name: str
+    extracted_hash: str
+    parsed_hash: str
+
+
+@dataclass
+class ReparseOutcome:
+    """Result of re-parsing one document in a worker; picklable."""
+    document_id: int
+    extracted_hash: str = ""
+    unchanged: bool = False
+    parsed: dict | None = None          # only when something changed
+    problems: list[str] = field(default_factory=list)
+    error: str = ""
+
+
+def stale_tasks(*, force: bool = False):
+    """ReparseTasks for documents parsed by an older parser (every document with `force`), by id."""
+    documents = UploadedDocument.objects.exclude(file='').order_by('id')
+    if not force:
+        documents = documents.filter(parser_version__lt=PARSER_VERSION)
+    for row in documents.values_list('id', 'file', 'extracted_hash', 'parsed_hash').iterator(chunk_size=2000):
+        yield ReparseTask(*row)
+
+
+def reparse_task(task: ReparseTask) -> ReparseOutcome:
+    """Re-read and re-parse one document's file. Runs in a worker; never touches the database."""
+    outcome = ReparseOutcome(task.document_id)
+    try:
+        with default_storage.open(task.file_name, 'rb') as fh:
+            result = parse_with_limits(fh, task.file_name, ParseLimits.from_settings())
+        outcome.extracted_hash = result.extracted_hash
+
+        outcome.problems = result.problems
+        outcome.unchanged = (
+            outcome.extracted_hash == task.extracted_hash and parsed_doc_hash(result.parsed) == task.parsed_hash
+        )
+        if not outcome.unchanged:
+            outcome.parsed = parsed_doc_to_dict(result.parsed)
+    except PYEParseError as exc:
+        outcome.error = str(exc)
+    except Exception as exc:
+        outcome.error = f"Unexpected parser error: {exc}"
+    return outcome
+
+
+def apply_outcomes(outcomes: list[ReparseOutcome]) -> dict:
+    """Write a batch of worker results. Returns counts of unchanged, reimported and failed documents."""
+    unchanged = [o.document_id for o in outcomes if not o.error and o.unchanged]
+    changed = [o for o in outcomes if not o.error and not o.unchanged]
+    failed = [o for o in outcomes if o.error]
+    for outcome in failed:
+        logger.warning("Could not re-parse document %s: %s", outcome.document_id, outcome.error.splitlines()[0])
+
+    with transaction.atomic():
+        if unchanged:
+            UploadedDocument.objects.filter(id__in=unchanged).update(parser_version=PARSER_VERSION)
+        documents = UploadedDocument.objects.in_bulk([o.document_id for o in changed])
+        for outcome in changed:
+            document = documents.get(outcome.document_id)
+            if document is not None:        # deleted while the batch was parsing
+                import_parsed_doc(
+                    document, parsed_doc_from_dict(outcome.parsed), extracted_hash=outcome.extracted_hash,
+                )
+
+    return {'unchanged': len(unchanged), 'reimported': len(changed), 'failed': len(failed)}
@@ -0,0 +1,223 @@
+"""
+Parse uploads in a resource-limited child process.
+
+`sandboxed_parse` runs `parse_with_limits` in a fresh subprocess with a
+wall-clock timeout and an RLIMIT_AS address-space cap (plus RLIMIT_CPU as a
+backstop), so a PDF that never finishes extracting, a .docx zip bomb or a
+pathological paragraph can only take down that child. Inside, the input is
+checked before extraction (.docx compression ratio and uncompressed size) and
+while it is extracted (paragraph and character counts, checked as each
+paragraph is read), so an oversized document stops early.
+
+The upload is handed over as a path (or bytes) and read from disk inside the
+child, so the parent never holds the whole file.
+
+Long PDFs are extracted page-parallel inside the child when `pdf_workers` > 1.
+RLIMIT_AS is per process, so the pool workers do not share the child's cap:
+each one forked from the child is capped at its own `worker_memory_mb`, and a
+parse can use at most memory_mb + pdf_workers x worker_memory_mb. The child
+runs in its own session, and the whole process group, workers included, is
+killed when the parse ends, so nothing it started outlives it.
+
+Every limit violation surfaces as a PYEParseError with a readable message,
+like any other unparseable upload.
+"""
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import signal
+import zipfile
+from dataclasses import dataclass
+
+from .formats import ParseResult, parse_source
+from .pye_parser import PYEParseError, format_error, parsed_doc_from_dict, parsed_doc_to_dict, source_extension
+
+try:
+    import resource
+except ImportError:     # Windows: no rlimits, the timeout still applies
+    resource = None
+
+
+@dataclass(frozen=True)
+class ParseLimits:
+    timeout: float = 30.0                   # seconds of wall-clock time
+    memory_mb: int = 1024                   # address-space cap for the parse process
+    worker_memory_mb: int = 512             # address-space cap for each of its PDF pool workers
+    max_paragraphs: int = 50_000
+    max_chars: int = 5_000_000
+    max_zip_ratio: float = 100.0            # uncompressed / compressed, per .docx member
+    max_uncompressed_mb: int = 200          # whole .docx, all members
+
+    @classmethod
+    def from_settings(cls) -> ParseLimits:
+        from django.conf import settings
+
+        config = settings.PARSE_SANDBOX
+        return cls(
+            timeout=config["TIMEOUT"],
+            memory_mb=config["MEMORY_MB"],
+            worker_memory_mb=config["WORKER_MEMORY_MB"],
+            max_paragraphs=config["MAX_PARAGRAPHS"],
+            max_chars=config["MAX_CHARS"],
+            max_zip_ratio=config["MAX_ZIP_RATIO"],
+            max_uncompressed_mb=config["MAX_UNCOMPRESSED_MB"],
+        )
+
+
+def _limit_error(problem: str) -> PYEParseError:
+    return PYEParseError(format_error(
+        problem,
+        hint="Split the document into smaller files or export it again from Word or Google Docs.",
+    ))
+
+
+def _open_source(source):
+    """Bytes become a file-like object; paths and file-like objects pass through."""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def check_docx_archive(source, limits: ParseLimits) -> None:
+    """Reject .docx packages that would inflate far beyond their upload size. Reads only the zip directory."""
+    try:
+        with zipfile.ZipFile(source) as archive:
+            members = archive.infolist()
+    except zipfile.BadZipFile:
+        return      # not a zip: the reader's fallback raises the usual error
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+    total = 0
+    for member in members:
+        total += member.file_size
+        ratio = member.file_size / max(member.compress_size, 1)
+        if ratio > limits.max_zip_ratio and member.file_size > 1024 * 1024:
+            raise _limit_error(
+                f"The .docx part '{member.filename}' expands {ratio:.0f}x when unzipped "
+                f"(the limit is {limits.max_zip_ratio:.0f}x)."
+            )
+    if total > limits.max_uncompressed_mb * 1024 * 1024:
+        raise _limit_error(
+            f"The .docx unzips to {total / (1024 * 1024):.0f} MB (the limit is {limits.max_uncompressed_mb} MB)."
+        )
+
+
+class TextBudget:
+    """formats.iter_source's `on_text` hook: raises once the text read so far passes the paragraph or character limit."""
+
+    def __init__(self, limits: ParseLimits):
+        self.limits = limits
+        self.paragraphs = 0
+        self.chars = 0
+
+    def __call__(self, text: str) -> None:
+        self.paragraphs += 1
+        self.chars += len(text)
+        if self.paragraphs > self.limits.max_paragraphs:
+            raise _limit_error(f"The document has more than {self.limits.max_paragraphs} paragraphs.")
+        if self.chars > self.limits.max_chars:
+            raise _limit_error(f"The document has more than {self.limits.max_chars} characters of text.")
+
+
+def parse_with_limits(source, file_name: str | None, limits: ParseLimits, *, pdf_workers: int = 1) -> ParseResult:
+    """
+    formats.parse_source with the size checks, but no process isolation.
+    `source` is a path, a seekable binary file-like object, or bytes.
+    """
+    source = _open_source(source)
+    if source_extension(source, file_name) in {"", ".docx"}:
+        check_docx_archive(source, limits)
+    return parse_source(source, file_name, pdf_workers=pdf_workers, on_text=TextBudget(limits))
+
+
+def _limit_memory(memory_mb: int) -> None:
+    memory = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+def _apply_rlimits(limits: ParseLimits, pdf_workers: int) -> None:
+    if resource is None:
+        return
+    _limit_memory(limits.memory_mb)
+    cpu = int(limits.timeout) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    if pdf_workers > 1 and hasattr(os, "register_at_fork"):
+        # Runs in every process forked from this child, i.e. the PDF pool workers.
+        os.register_at_fork(after_in_child=lambda: _limit_memory(limits.worker_memory_mb))
+
+
+def _child(conn, source, file_name: str | None, limits: ParseLimits, pdf_workers: int) -> None:
+    try:
+        if hasattr(os, "setsid"):
+            os.setsid()     # own process group, so the parent can kill anything started here
+        _apply_rlimits(limits, pdf_workers)
+        result = parse_with_limits(source, file_name, limits, pdf_workers=pdf_workers)
+        conn.send(("ok", parsed_doc_to_dict(result.parsed), result.problems, result.grammar, result.extracted_hash))
+    except PYEParseError as exc:
+        conn.send(("error", str(exc)))
+    except MemoryError:
+        conn.send(("error", str(_limit_error(
+            f"Parsing the document needed more than {limits.memory_mb} MB of memory."
+        ))))
+    except Exception as exc:
+        conn.send(("error", f"Unexpected parser error: {exc}"))
+    finally:
+        conn.close()
+
+
+def _context():
+    # fork is cheapest and needs no re-import; fall back where it does not exist.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+def _kill_group(pid: int) -> None:
+    if not hasattr(os, "killpg"):
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass        # the group is already gone, or the child died before setsid()
+
+
+def sandboxed_parse(
+    source, file_name: str | None = None, limits: ParseLimits | None = None, *, pdf_workers: int = 1,
+) -> ParseResult:
+    """
+    parse_with_limits in a child process. `source` is a path or bytes (a path
+    keeps the file out of both processes' memory until the child reads it);
+    `pdf_workers` > 1 extracts long PDFs page-parallel within the child.
+    Raises PYEParseError when the parse fails, breaks a limit, runs out of
+    time or memory, or the child dies.
+    """
+    limits = limits or ParseLimits()
+    context = _context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_child, args=(sender, source, file_name, limits, pdf_workers), name="parse-sandbox",
+    )
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(limits.timeout):
+            raise _limit_error(f"Parsing the document took longer than {limits.timeout:g} seconds.")
+        try:
+            message = receiver.recv()
+        except EOFError:
+            process.join(1)
+            raise _limit_error(
+                f"The parser stopped unexpectedly (exit code {process.exitcode}); "
+                "the document may need more memory or CPU time than uploads are allowed."
+            )
+    finally:
+        receiver.close()
+        _kill_group(process.pid)
+        if process.is_alive():
+            process.kill()
+        process.join()
+
+    if message[0] == "error":
+        raise PYEParseError(message[1])
+    _, parsed, problems, grammar, extracted_hash = message
+    return ParseResult(parsed_doc_from_dict(parsed), problems, grammar, extracted_hash)
@@ -0,0 +1,168 @@
+"""
+Full-text search over document titles, passages and question text.
+
+The index is a side table kept in step by `index_documents`, which the
+importer, question generation, the corpus importer and the document and
+question edit paths call next to `bump_content_version`:
+
+- PostgreSQL: passages_documentsearch(document_id, vector tsvector) with a
+  GIN index; title weighted A, passage B, questions C; ranked with ts_rank_cd,
+  snippets from ts_headline.
+- SQLite: the FTS5 table passages_documentsearch_fts (rowid = document id,
+  porter stemming); ranked with bm25, snippets from snippet().
+
+Each search term matches as a prefix and all terms must match. On any other
+database engine search falls back to title/passage `icontains`, unranked.
+Run `rebuild_search_index` after a bulk load that bypassed the importer.
+"""
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+
+PG_TABLE = "passages_documentsearch"
+FTS_TABLE = "passages_documentsearch_fts"
+MAX_TERMS = 12
+SNIPPET_WORDS = 24
+# Highlight markers that cannot occur in text, turned into <mark> after escaping.
+_START, _STOP = "\x02", "\x03"
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    document_id: int
+    rank: float
+    snippet: str        # HTML-escaped passage excerpt, matches wrapped in <mark>
+
+
+def engine() -> str | None:
+    """"postgresql", "sqlite", or None when the database has no supported full-text index."""
+    return connection.vendor if connection.vendor in ("postgresql", "sqlite") else None
+
+
+def terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _pg_query(words: list[str]) -> str:
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _fts_query(words: list[str]) -> str:
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def index_documents(*document_ids: int) -> None:
+    """Rebuild the index rows of these documents from the database (deleted ones are dropped)."""
+    document_ids = [document_id for document_id in document_ids if document_id is not None]
+    if not document_ids or engine() is None:
+        return
+    placeholders = ", ".join(["%s"] * len(document_ids))
+    with connection.cursor() as cursor:
+        if engine() == "postgresql":
+            cursor.execute(f"DELETE FROM {PG_TABLE} WHERE document_id IN ({placeholders})", document_ids)
+            cursor.execute(f"""
+                INSERT INTO {PG_TABLE} (document_id, vector)
+                SELECT d.id,
+                       setweight(to_tsvector('english', coalesce(d.title, '')), 'A')
+                       || setweight(to_tsvector('english', coalesce(d.parsed_text, '')), 'B')
+                       || setweight(to_tsvector('english', coalesce(
+                              (SELECT string_agg(q.question_text, ' ') FROM passages_quizquestion q
+                               WHERE q.document_id = d.id), '')), 'C')
+                FROM passages_uploadeddocument d WHERE d.id IN ({placeholders})
+            """, document_ids)
+        else:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", document_ids)
+            cursor.execute(f"""
+                INSERT INTO {FTS_TABLE} (rowid, title, body, questions)
+                SELECT d.id, coalesce(d.title, ''), coalesce(d.parsed_text, ''),
+                       coalesce((SELECT group_concat(q.question_text, ' ') FROM passages_quizquestion q
+                                 WHERE q.document_id = d.id), '')
+                FROM passages_uploadeddocument d WHERE d.id IN ({placeholders})
+            """, document_ids)
+
+
+def rebuild_index(batch_size: int = 1000) -> int:
+    """Re-index every document and drop rows of deleted ones. Returns how many documents were indexed."""
+    from .models import UploadedDocument
+
+    if engine() is None:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {PG_TABLE if engine() == 'postgresql' else FTS_TABLE}")
+    ids = list(UploadedDocument.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(ids), batch_size):
+        index_documents(*ids[start:start + batch_size])
+    return len(ids)
+
+
+def matching(queryset, query: str):
+    """`queryset` narrowed to documents matching `query`, in its own order."""
+    from django.db.models import Q
+    from django.db.models.expressions import RawSQL
+
+    words = terms(query)
+    if not words:
+        return queryset
+    if engine() == "postgresql":
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT document_id FROM {PG_TABLE} WHERE vector @@ to_tsquery('english', %s)", [_pg_query(words)],
+        ))
+    if engine() == "sqlite":
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts_query(words)],
+        ))
+    return queryset.filter(Q(title__icontains=query) | Q(parsed_text__icontains=query))
+
+
+def _render_snippet(text: str) -> str:
+    return html.escape(text or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def ranked(queryset, query: str, *, limit: int = 20, offset: int = 0) -> list[SearchHit]:
+    """
+    The best matches for `query` among the documents of `queryset`, best
+    first, with highlighted passage snippets.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    scope_sql, scope_params = queryset.order_by().values("id").query.sql_with_params()
+
+    if engine() == "postgresql":
+        sql = f"""
+            SELECT hit.document_id, hit.rank,
+                   ts_headline('english', coalesce(d.parsed_text, ''), to_tsquery('english', %s),
+                               'StartSel={_START}, StopSel={_STOP}, MaxFragments=1, MaxWords={SNIPPET_WORDS}, MinWords=8')
+            FROM (
+                SELECT s.document_id, ts_rank_cd(s.vector, to_tsquery('english', %s)) AS rank
+                FROM {PG_TABLE} s
+                WHERE s.vector @@ to_tsquery('english', %s) AND s.document_id IN ({scope_sql})
+                ORDER BY rank DESC, s.document_id DESC
+                LIMIT %s OFFSET %s
+            ) hit JOIN passages_uploadeddocument d ON d.id = hit.document_id
+            ORDER BY hit.rank DESC, hit.document_id DESC
+        """
+        pg_query = _pg_query(words)
+        params = [pg_query, pg_query, pg_query, *scope_params, limit, offset]
+    elif engine() == "sqlite":
+        # bm25 is lower-is-better; weights are title, body, questions.
+        sql = f"""
+            SELECT rowid, -bm25({FTS_TABLE}, 10.0, 1.0, 0.5) AS rank,
+                   snippet({FTS_TABLE}, -1, '{_START}', '{_STOP}', '…', {SNIPPET_WORDS})
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s AND rowid IN ({scope_sql})
+            ORDER BY rank DESC, rowid DESC
+            LIMIT %s OFFSET %s
+        """
+        params = [_fts_query(words), *scope_params, limit, offset]
+    else:
+        documents = matching(queryset, query).order_by("-uploaded_at", "-id")[offset:offset + limit]
+        return [SearchHit(d.id, 0.0, html.escape(d.excerpt)) for d in documents]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [SearchHit(row[0], float(row[1]), _render_snippet(row[2])) for row in cursor.fetchall()]
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Max
 from .models import (
     UploadedDocument, GradeLevel, SkillCategory,
-    QuizQuestion, QuizAnswer, QuizResponse, UserAnswer, Profile, Classroom, Topic, Assignment
+    QuizQuestion, QuizAnswer, QuizResponse, UserAnswer, Profile, Classroom, Topic, Assignment,
+    IngestionJob, UploadSession,
 )
 
 class UserSerializer(serializers.ModelSerializer):
@@ -104,6 +106,52 @@ class UploadedDocumentSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class DocumentListSerializer(serializers.ModelSerializer):
+    """Catalog rows: metadata plus the stored excerpt and word count, never the passage."""
+    topic_name = serializers.CharField(source='topic.name', read_only=True)
+    program_display = serializers.CharField(source='get_program_display', read_only=True)
+    difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
+
+    # Columns the list query loads (UploadedDocumentViewSet); keep in step with `fields`.
+    load_only = (
+        'id', 'title', 'uploaded_at', 'excerpt', 'word_count', 'grade_level', 'skill_category',
+        'topic', 'topic__name', 'program', 'difficulty', 'uploader',
+    )
+
+    class Meta:
+        model = UploadedDocument
+        fields = [
+            'id', 'title', 'uploaded_at', 'excerpt', 'word_count', 'grade_level', 'skill_category',
+            'topic', 'topic_name', 'program', 'program_display', 'difficulty', 'difficulty_display', 'uploader',
+        ]
+        read_only_fields = fields
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    part_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'file_name', 'size', 'sha256', 'chunk_size', 'part_count', 'backend', 'status',
+            'document', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'chunk_size', 'backend', 'status', 'document', 'created_at', 'updated_at']
+        extra_kwargs = {'sha256': {'required': False}}
+
+
+class IngestionJobSerializer(serializers.ModelSerializer):
+    document_title = serializers.CharField(source='document.title', read_only=True)
+
+    class Meta:
+        model = IngestionJob
+        fields = [
+            'id', 'document', 'document_title', 'status', 'problems', 'error', 'grammar',
+            'attempts', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
 class QuizAnswerSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizAnswer
@@ -114,7 +162,14 @@ class QuizQuestionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = QuizQuestion
-        fields = ['id', 'document', 'question_text', 'explanation', 'answers', 'created_at']
+        fields = ['id', 'document', 'question_text', 'explanation', 'position', 'answers', 'created_at']
+
+    def create(self, validated_data):
+        if 'position' not in validated_data:
+            # Unless placed, a question added through the API goes after the document's others.
+            last = validated_data['document'].questions.aggregate(last=Max('position'))['last']
+            validated_data['position'] = 0 if last is None else last + 1
+        return super().create(validated_data)
 
 class QuizResponseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,340 @@
+"""
+Recording graded quiz submissions, directly or through a write-behind queue.
+
+Normally `record_submission` writes the QuizResponse and its UserAnswers at
+once (grading.save_submission). With SUBMISSION_QUEUE["BURST_MODE"] on, e.g.
+while a whole school finishes a timed practice test, the request only appends
+the graded submission to a local spool directory and returns the score; the
+`flush_submissions` command then writes queued submissions in large batches
+(two bulk INSERTs per batch).
+
+Idempotency keys come from clients, so they are scoped to the submitting
+user and the document: the same key from another student, or for another
+quiz, is a different submission.
+
+Each spool entry is one JSON file, fsynced and then hard-linked into
+pending/ under a name derived from its (user, document, key) scope, so an
+entry is either fully on disk or not there at all, and a retried submission
+finds the entry of the first attempt. Flushing skips scopes that already
+have a QuizResponse, so a flusher that dies between committing and deleting
+its files only makes the next flush delete them. Entries whose document or user was deleted while
+they waited are dropped, as the cascade would have deleted their rows. An
+entry whose chosen answers were deleted (its stored score would no longer
+match its answers), or that still cannot be written, is moved to failed/ so
+it cannot block the queue. Database errors such as a restart or a lock
+timeout leave the batch queued; the flusher waits and retries it.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, DataError, IntegrityError, close_old_connections, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .grading import GradedQuiz, save_submission
+from .models import QuizAnswer, QuizResponse, UploadedDocument, UserAnswer
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 64
+# Errors that come from the entries themselves (not from the database being unavailable).
+BAD_ENTRY_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+
+class IdempotencyKeyError(ValueError):
+    """The client's Idempotency-Key is unusable."""
+
+
+class StaleEntryError(ValueError):
+    """A queued submission picked answers that were deleted while it waited."""
+
+
+@dataclass(frozen=True)
+class Receipt:
+    """What the client is told about a recorded submission. `response_id` is None until a queued one is flushed."""
+    response_id: int | None
+    score: int
+    total_questions: int
+    queued: bool = False
+
+    @property
+    def percentage(self) -> float:
+        return round((self.score / self.total_questions) * 100, 2)
+
+
+def burst_mode() -> bool:
+    return settings.SUBMISSION_QUEUE["BURST_MODE"]
+
+
+def _root() -> Path:
+    return Path(settings.SUBMISSION_QUEUE["DIR"])
+
+
+def _pending_dir() -> Path:
+    return _root() / "pending"
+
+
+def _scope(user_id: int | None, document_id: int, idempotency_key: str) -> tuple:
+    return (user_id, document_id, idempotency_key)
+
+
+def _entry_scope(entry: dict) -> tuple:
+    return _scope(entry["user_id"], entry["document_id"], entry["idempotency_key"])
+
+
+def _entry_path(scope: tuple) -> Path:
+    return _pending_dir() / f"{hashlib.sha256(json.dumps(scope).encode()).hexdigest()[:40]}.json"
+
+
+def _existing_response(scope: tuple) -> QuizResponse | None:
+    user_id, document_id, idempotency_key = scope
+    return QuizResponse.objects.filter(
+        user_id=user_id, document_id=document_id, idempotency_key=idempotency_key,
+    ).first()
+
+
+def _receipt_for_row(response: QuizResponse) -> Receipt:
+    return Receipt(response.id, response.score, response.total_questions)
+
+
+def record_submission(
+    graded: GradedQuiz, *, user=None, user_name: str = '', duration_seconds: int = 0,
+    idempotency_key: str | None = None,
+) -> Receipt:
+    """
+    Record a graded submission: queued in burst mode, written now otherwise.
+    A key the same user already used for this document returns the first
+    submission's receipt.
+    """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+        raise IdempotencyKeyError(f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    scope = _scope(user.pk if user else None, graded.document_id, idempotency_key)
+    if idempotency_key:
+        existing = _existing_response(scope)
+        if existing is not None:
+            return _receipt_for_row(existing)
+
+    if burst_mode():
+        return enqueue_submission(
+            graded, user=user, user_name=user_name, duration_seconds=duration_seconds,
+            idempotency_key=idempotency_key or uuid.uuid4().hex,
+        )
+    try:
+        response = save_submission(
+            graded, user=user, user_name=user_name, duration_seconds=duration_seconds,
+            idempotency_key=idempotency_key,
+        )
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        # A concurrent retry with the same key won the insert.
+        return _receipt_for_row(_existing_response(scope))
+    return _receipt_for_row(response)
+
+
+def enqueue_submission(graded: GradedQuiz, *, user, user_name: str, duration_seconds: int,
+                       idempotency_key: str) -> Receipt:
+    """Append the submission to the spool. Nothing is written to the database."""
+    entry = {
+        "idempotency_key": idempotency_key,
+        "document_id": graded.document_id,
+        "user_id": user.pk if user else None,
+        "user_name": user_name,
+        "duration_seconds": duration_seconds,
+        "score": graded.score,
+        "total_questions": graded.total_questions,
+        "submitted_at": timezone.now().isoformat(),
+        "answers": [[a.question_id, a.answer_id, a.is_correct] for a in graded.answers],
+    }
+    path = _entry_path(_entry_scope(entry))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(json.dumps(entry).encode())
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.link(tmp, path)          # atomic, and fails if this key is already queued
+    except FileExistsError:
+        entry = json.loads(path.read_bytes())
+    finally:
+        os.unlink(tmp)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return Receipt(None, entry["score"], entry["total_questions"], queued=True)
+
+
+def pending_count() -> int:
+    pending = _pending_dir()
+    return sum(1 for _ in pending.glob("*.json")) if pending.is_dir() else 0
+
+
+@contextmanager
+def _flush_lock():
+    """Yields False if another flusher on this host holds the lock."""
+    _root().mkdir(parents=True, exist_ok=True)
+    with open(_root() / "flush.lock", "w") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _persist(entries: list[dict]) -> int:
+    """Write queued entries that are not in the database yet. Returns how many responses were created."""
+    keys = {e["idempotency_key"] for e in entries}
+    flushed = set(
+        QuizResponse.objects.filter(idempotency_key__in=keys).values_list("user_id", "document_id", "idempotency_key")
+    )
+    fresh = [e for e in entries if _entry_scope(e) not in flushed]
+    if not fresh:
+        return 0
+
+    # Skip whatever was deleted while the entry waited in the queue.
+    documents = set(
+        UploadedDocument.objects.filter(id__in={e["document_id"] for e in fresh}).values_list("id", flat=True)
+    )
+    choices = set(QuizAnswer.objects.filter(
+        id__in={answer_id for e in fresh for _, answer_id, _ in e["answers"]},
+    ).values_list("id", "question_id"))
+    user_ids = {e["user_id"] for e in fresh} - {None}
+    users = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True)) if user_ids else set()
+    for reason, gone in (
+        ("deleted documents", lambda e: e["document_id"] not in documents),
+        ("deleted users", lambda e: e["user_id"] is not None and e["user_id"] not in users),
+    ):
+        dropped = [e["idempotency_key"] for e in fresh if gone(e)]
+        if dropped:
+            logger.warning("Dropping %d queued submission(s) for %s: %s", len(dropped), reason, dropped)
+            fresh = [e for e in fresh if not gone(e)]
+    if not fresh:
+        return 0
+    # Keeping the score but dropping answers would store a response that contradicts itself.
+    stale = [e["idempotency_key"] for e in fresh if any((a, q) not in choices for q, a, _ in e["answers"])]
+    if stale:
+        raise StaleEntryError(f"Queued submission(s) {stale} picked answers that were deleted")
+
+    QuizResponse.objects.bulk_create([
+        QuizResponse(
+            document_id=e["document_id"], user_id=e["user_id"], user_name=e["user_name"],
+            duration_seconds=e["duration_seconds"], score=e["score"], total_questions=e["total_questions"],
+            submitted_at=parse_datetime(e["submitted_at"]), idempotency_key=e["idempotency_key"],
+        )
+        for e in fresh
+    ])
+    # Re-read the ids rather than rely on the backend returning them from bulk_create.
+    response_ids = {
+        _scope(user_id, document_id, key): response_id
+        for user_id, document_id, key, response_id in QuizResponse.objects.filter(
+            idempotency_key__in={e["idempotency_key"] for e in fresh},
+        ).values_list("user_id", "document_id", "idempotency_key", "id")
+    }
+    UserAnswer.objects.bulk_create([
+        UserAnswer(
+            response_id=response_ids[_entry_scope(e)], question_id=question_id,
+            selected_answer_id=answer_id, is_correct=is_correct,
+        )
+        for e in fresh
+        for question_id, answer_id, is_correct in e["answers"]
+    ])
+    return len(fresh)
+
+
+def _quarantine(path: Path) -> None:
+    failed = _root() / "failed"
+    failed.mkdir(exist_ok=True)
+    os.replace(path, failed / path.name)
+
+
+def flush_pending(batch_size: int | None = None) -> int:
+    """
+    Write up to `batch_size` queued submissions, oldest first, in one
+    transaction, then remove their spool files. Returns how many entries
+    left the queue (0 if another flusher is running).
+    """
+    batch_size = batch_size or settings.SUBMISSION_QUEUE["BATCH_SIZE"]
+    pending = _pending_dir()
+    if not pending.is_dir():
+        return 0
+    with _flush_lock() as acquired:
+        if not acquired:
+            return 0
+        paths = sorted(pending.glob("*.json"), key=lambda p: p.stat().st_mtime_ns)[:batch_size]
+        entries, done = [], []
+        for path in paths:
+            try:
+                entries.append(json.loads(path.read_bytes()))
+                done.append(path)
+            except (OSError, ValueError):
+                logger.exception("Unreadable queued submission %s; moving it aside", path)
+                _quarantine(path)
+        if not entries:
+            return 0
+        try:
+            with transaction.atomic():
+                created = _persist(entries)
+        except BAD_ENTRY_ERRORS:
+            logger.exception("Writing %d queued submission(s) failed; retrying them one at a time", len(entries))
+            created = 0
+            for entry, path in zip(entries, list(done)):
+                try:
+                    with transaction.atomic():
+                        created += _persist([entry])
+                except BAD_ENTRY_ERRORS:
+                    logger.exception("Queued submission %s cannot be written; moving it aside", path)
+                    _quarantine(path)
+                    done.remove(path)
+        for path in done:
+            path.unlink(missing_ok=True)
+        logger.info("Flushed %d queued submission(s), %d new", len(entries), created)
+        return len(entries)
+
+
+def flusher_loop(poll_interval: float = 1.0, once: bool = False, batch_size: int | None = None) -> int:
+    """
+    Body of the `flush_submissions` process: drain the queue in batches,
+    sleeping when it is empty. A database error is logged and the batch
+    retried after SUBMISSION_QUEUE["RETRY_SECONDS"] on fresh connections.
+    With `once=True` it exits once drained, and database errors propagate.
+    """
+    batch_size = batch_size or settings.SUBMISSION_QUEUE["BATCH_SIZE"]
+    flushed = 0
+    while True:
+        close_old_connections()
+        try:
+            while True:
+                count = flush_pending(batch_size)
+                flushed += count
+                if count < batch_size:
+                    break
+        except DatabaseError:
+            if once:
+                raise
+            logger.exception("Flushing queued submissions failed; retrying")
+            connections.close_all()
+            time.sleep(settings.SUBMISSION_QUEUE["RETRY_SECONDS"])
+            continue
+        if once:
+            return flushed
+        time.sleep(poll_interval)
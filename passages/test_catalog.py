@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from passages.importer import import_parsed_doc
+from passages.models import EXCERPT_LENGTH, Topic, UploadedDocument
+from passages.test_importer import parsed_doc
+
+
+class CatalogListTests(TestCase):
+    def make_documents(self, count, uploaded_at=None):
+        documents = [
+            UploadedDocument.objects.create(title=f'Doc {n}', file='documents/x.docx', parsed_text='word ' * 50)
+            for n in range(count)
+        ]
+        if uploaded_at is not None:
+            UploadedDocument.objects.filter(id__in=[d.id for d in documents]).update(uploaded_at=uploaded_at)
+        return documents
+
+    def walk(self, page_size, **params):
+        """Ids of every document, following `next` links."""
+        ids, response = [], self.client.get('/api/documents/', {'page_size': page_size, **params})
+        while True:
+            body = response.json()
+            ids += [row['id'] for row in body['results']]
+            if not body['next']:
+                return ids
+            response = self.client.get(body['next'])
+
+    def test_list_is_slim_and_never_loads_the_passage(self):
+        topic = Topic.objects.create(name='Science')
+        UploadedDocument.objects.create(
+            title='Doc', file='documents/x.docx', parsed_text='The fox ran.  Far\naway.', topic=topic,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            body = self.client.get('/api/documents/').json()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('parsed_text', queries[0]['sql'])
+        row = body['results'][0]
+        self.assertNotIn('parsed_text', row)
+        self.assertEqual((row['excerpt'], row['word_count'], row['topic_name']), ('The fox ran. Far away.', 5, 'Science'))
+        self.assertEqual(self.client.get(f"/api/documents/{row['id']}/").json()['parsed_text'], 'The fox ran.  Far\naway.')
+
+    def test_excerpt_follows_the_passage(self):
+        document = UploadedDocument.objects.create(title='Doc', file='documents/x.docx')
+        self.assertEqual((document.excerpt, document.word_count), ('', 0))
+        import_parsed_doc(document, parsed_doc(1))
+        document.refresh_from_db()
+        self.assertEqual((document.excerpt, document.word_count), ('Passage.', 1))
+
+        document.parsed_text = 'lengthy ' * 100
+        document.save(update_fields=['parsed_text'])
+        document.refresh_from_db()
+        self.assertEqual(document.word_count, 100)
+        self.assertLessEqual(len(document.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(document.excerpt.endswith('lengthy'))
+
+    def test_cursor_pages_cover_ties_once_in_order(self):
+        now = timezone.now()
+        older = self.make_documents(5, uploaded_at=now - timedelta(hours=1))
+        tied = self.make_documents(7, uploaded_at=now)
+        expected = [d.id for d in sorted(tied, key=lambda d: -d.id)] + [d.id for d in sorted(older, key=lambda d: -d.id)]
+        self.assertEqual(self.walk(page_size=3), expected)
+
+    def test_pages_are_stable_while_documents_are_added(self):
+        self.make_documents(6)
+        first = self.client.get('/api/documents/', {'page_size': 3}).json()
+        self.make_documents(2)          # newer than everything already listed
+        second = self.client.get(first['next']).json()
+        seen = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(seen)), 6)
+        self.assertIsNone(second['next'])
+
+    def test_filters_apply_within_pages(self):
+        self.make_documents(4)
+        sat = UploadedDocument.objects.create(title='SAT', file='documents/x.docx', program='sat')
+        self.assertEqual(self.walk(page_size=2, program='sat'), [sat.id])
+
+    def test_bad_cursor_is_404(self):
+        self.assertEqual(self.client.get('/api/documents/', {'cursor': 'not-a-cursor'}).status_code, 404)
@@ -0,0 +1,90 @@
+import csv
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from passages.benchmarks.corpus import build_pye_paragraphs
+from passages.corpus_import import discover_files
+from passages.models import QuizAnswer, QuizQuestion, UploadedDocument
+from passages.test_ingestion import build_docx_upload
+
+
+def write_docx(path, title, questions=2):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(build_docx_upload([title, *build_pye_paragraphs(questions=questions)[1:]]).read())
+
+
+class ImportPyeCorpusTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        settings_override = override_settings(MEDIA_ROOT=str(self.tmp / 'media'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.corpus = self.tmp / 'corpus'
+        write_docx(self.corpus / 'grade3' / 'rivers.docx', 'Rivers')
+        write_docx(self.corpus / 'grade4' / 'unit1' / 'lakes.docx', 'Lakes', questions=3)
+        (self.corpus / 'grade4' / 'broken.docx').write_bytes(b'not a docx')
+        (self.corpus / 'notes.txt').write_text('ignored')
+
+        write_docx(self.tmp / 'oceans.docx', 'Oceans')
+        with zipfile.ZipFile(self.corpus / 'vendor.zip', 'w') as archive:
+            archive.write(self.tmp / 'oceans.docx', 'pack/oceans.docx')
+            archive.writestr('__MACOSX/pack/._oceans.docx', b'')
+
+        self.state_file = self.tmp / 'state.jsonl'
+
+    def run_import(self, *extra):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            'import_pye_corpus', str(self.corpus), '--workers', '1', '--batch-size', '2',
+            '--state-file', str(self.state_file), *extra, stdout=out, stderr=err,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_discovers_nested_files_and_zip_members(self):
+        sources = [f.source for f in discover_files([self.corpus])]
+        self.assertEqual(len(sources), 4)
+        self.assertTrue(any(s.endswith('vendor.zip!pack/oceans.docx') for s in sources))
+        self.assertFalse(any('notes.txt' in s or '__MACOSX' in s for s in sources))
+
+    def test_imports_corpus_and_reports_failures(self):
+        report = self.tmp / 'errors.csv'
+        out, err = self.run_import('--error-report', str(report))
+
+        self.assertEqual(
+            sorted(UploadedDocument.objects.values_list('title', flat=True)), ['Lakes', 'Oceans', 'Rivers'],
+        )
+        self.assertEqual(QuizQuestion.objects.count(), 7)
+        self.assertEqual(QuizAnswer.objects.filter(is_correct=True).count(), 7)
+        self.assertIn('files/sec', out)
+        self.assertIn('questions/sec', out)
+        self.assertIn('broken.docx', err)
+
+        with report.open() as fh:
+            rows = list(csv.DictReader(fh))
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]['source'].endswith('broken.docx'))
+
+    def test_rerun_resumes_from_state_file(self):
+        self.run_import()
+        write_docx(self.corpus / 'grade5' / 'deserts.docx', 'Deserts')
+
+        out, _ = self.run_import()
+
+        self.assertIn('3 already imported', out)
+        self.assertEqual(UploadedDocument.objects.count(), 4)
+        self.assertEqual(UploadedDocument.objects.filter(title='Rivers').count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        out, _ = self.run_import('--dry-run')
+
+        self.assertIn('Parsed 3 document(s) with 7 question(s)', out)
+        self.assertFalse(UploadedDocument.objects.exists())
+        self.assertFalse(self.state_file.exists())
@@ -0,0 +1,89 @@
+import io
+import zipfile
+
+import docx
+from django.test import SimpleTestCase
+
+from passages.docx_parser import parse_uploaded_docx
+from passages.docx_reader import PARAGRAPH, ROW, DocxBlock, iter_docx_blocks
+from passages.pye_parser import extract_docx_paragraphs
+
+
+def save(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def rename_main_part(buffer, new_name='word/main.xml'):
+    """Rewrite a .docx so its main part is not at word/document.xml."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(buffer) as src, zipfile.ZipFile(out, 'w') as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            name = item.filename.replace('word/document.xml', new_name).replace('document.xml.rels', 'main.xml.rels')
+            if item.filename in ('[Content_Types].xml', '_rels/.rels'):
+                data = data.replace(b'word/document.xml', new_name.encode())
+            dst.writestr(name, data)
+    out.seek(0)
+    return out
+
+
+class DocxReaderTests(SimpleTestCase):
+    def test_blocks_in_body_order_with_merged_cells_once(self):
+        document = docx.Document()
+        document.add_paragraph('1. Pick one.')
+        table = document.add_table(rows=3, cols=3)
+        table.cell(0, 0).merge(table.cell(0, 2)).text = 'Choose the best answer.'
+        table.cell(1, 2).merge(table.cell(2, 2)).text = 'Notes'
+        for cell, text in zip([table.cell(1, 0), table.cell(1, 1), table.cell(2, 0), table.cell(2, 1)], 'ABCD'):
+            cell.text = f'{text}. choice'
+        document.add_paragraph('Answer Key')
+
+        self.assertEqual(list(iter_docx_blocks(save(document))), [
+            DocxBlock(PARAGRAPH, '1. Pick one.'),
+            DocxBlock(ROW, cells=('Choose the best answer.',)),
+            DocxBlock(ROW, cells=('A. choice', 'B. choice', 'Notes')),
+            DocxBlock(ROW, cells=('C. choice', 'D. choice')),
+            DocxBlock(PARAGRAPH, 'Answer Key'),
+        ])
+
+    def test_paragraph_text_matches_python_docx(self):
+        document = docx.Document()
+        paragraph = document.add_paragraph('Tab')
+        paragraph.add_run().add_tab()
+        paragraph.add_run('and break')
+        paragraph.add_run().add_break()
+        paragraph.add_run('end  ')
+        document.add_paragraph('')
+        buffer = save(document)
+
+        expected = [p.text for p in docx.Document(buffer).paragraphs]
+        buffer.seek(0)
+        self.assertEqual(extract_docx_paragraphs(buffer), expected)
+        self.assertEqual(expected[-2], 'Tab\tand break\nend  ')
+
+    def test_falls_back_to_python_docx_for_renamed_main_part(self):
+        document = docx.Document()
+        for line in ['Title', 'Passage.', 'Questions to Answer']:
+            document.add_paragraph(line)
+        buffer = rename_main_part(save(document))
+
+        self.assertEqual(extract_docx_paragraphs(buffer), ['Title', 'Passage.', 'Questions to Answer'])
+
+    def test_labeled_parser_reads_choices_from_tables(self):
+        document = docx.Document()
+        document.add_paragraph('The fox ran through the forest.')
+        document.add_paragraph('Questions')
+        document.add_paragraph('1. Where did the fox run?')
+        table = document.add_table(rows=2, cols=2)
+        for cell, text in zip(table._cells, ['A) Forest', 'B) River', 'C) Cave', 'D) Field']):
+            cell.text = text
+        document.add_paragraph('Answer: A')
+
+        parsed = parse_uploaded_docx(save(document))
+
+        question = parsed.questions[0]
+        self.assertEqual([a['choice_letter'] for a in question['answers']], ['A', 'B', 'C', 'D'])
+        self.assertEqual(question['correct_choice'], 'A')
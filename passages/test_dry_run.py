@@ -0,0 +1,101 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from passages.dry_run import commit_validated
+from passages.models import IngestionJob, Profile, UploadedDocument
+from passages.test_ingestion import PYE_LINES, build_docx_upload
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'parse': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'parse-tests'},
+    'dry_run': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'dry-run-tests'},
+}
+IN_PROCESS = {**settings.PARSE_SANDBOX, 'ENABLED': False}
+
+
+class DryRunValidationTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        staging = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(staging.cleanup)
+        self.media = media.name
+        settings_override = override_settings(
+            MEDIA_ROOT=media.name,
+            UPLOAD_STAGING={**settings.UPLOAD_STAGING, 'DIR': staging.name},
+            CACHES=LOCMEM_CACHES,
+            PARSE_SANDBOX=IN_PROCESS,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(username='dry_teacher', password='pw12345!')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        self.client.force_login(self.teacher)
+
+    def _validate(self, lines):
+        return self.client.post('/api/documents/validate/', {'file': build_docx_upload(lines)})
+
+    def test_validate_writes_nothing_and_reports_structured_problems(self):
+        r = self._validate([line for line in PYE_LINES if line != 'D.Across the field'])
+        self.assertEqual(r.status_code, 200, r.content)
+        body = r.json()
+        self.assertFalse(body['valid'])
+        self.assertEqual(body['question_count'], 1)
+        self.assertEqual(body['problems'][0]['question'], 1)
+        self.assertIn('expected exactly four answer choices', body['problems'][0]['message'])
+        self.assertIn('quiz format is incomplete', body['detail'])
+        self.assertTrue(body['token'])
+        self.assertFalse(UploadedDocument.objects.exists())
+        self.assertEqual(os.listdir(self.media), [])
+
+    def test_unreadable_file_is_a_400(self):
+        r = self.client.post('/api/documents/validate/', {'file': SimpleUploadedFile('broken.docx', b'not a document')})
+        self.assertEqual(r.status_code, 400)
+        self.assertFalse(r.json()['valid'])
+
+    def test_commit_reuses_the_parse_and_the_token_is_single_use(self):
+        token = self._validate(PYE_LINES).json()['token']
+
+        with mock.patch('passages.parse_cache.parse_with_limits', side_effect=AssertionError('re-parsed')):
+            r = self.client.post('/api/documents/commit/', {'token': token, 'program': 'sat'})
+        self.assertEqual(r.status_code, 201, r.content)
+        document = UploadedDocument.objects.get(id=r.json()['id'])
+        self.assertEqual(document.title, 'Sample Passage Title')
+        self.assertEqual(document.program, 'sat')
+        self.assertEqual(document.uploader, self.teacher)
+        self.assertEqual(document.questions.count(), 1)
+        self.assertTrue(document.file.name.endswith('.docx'))
+        self.assertEqual(r.json()['ingestion_job']['status'], IngestionJob.STATUS_VALIDATED)
+
+        again = self.client.post('/api/documents/commit/', {'token': token})
+        self.assertEqual(again.status_code, 410)
+        self.assertEqual(UploadedDocument.objects.count(), 1)
+
+    def test_token_belongs_to_the_teacher_who_validated(self):
+        token = self._validate(PYE_LINES).json()['token']
+        other = User.objects.create_user(username='dry_other', password='pw12345!')
+        Profile.objects.create(user=other, role=Profile.ROLE_TEACHER)
+        self.client.force_login(other)
+        self.assertEqual(self.client.post('/api/documents/commit/', {'token': token}).status_code, 410)
+
+    def test_tokens_survive_parse_cache_culling(self):
+        token = self._validate(PYE_LINES).json()['token']
+        caches['parse'].clear()
+        r = self.client.post('/api/documents/commit/', {'token': token})
+        self.assertEqual(r.status_code, 201, r.content)
+
+    def test_failed_import_leaves_no_file_behind(self):
+        token = self._validate(PYE_LINES).json()['token']
+        with mock.patch('passages.dry_run.import_parsed_doc', side_effect=RuntimeError('import failed')):
+            with self.assertRaisesMessage(RuntimeError, 'import failed'):
+                commit_validated(token, self.teacher)
+        self.assertFalse(UploadedDocument.objects.exists())
+        self.assertEqual([files for _, _, files in os.walk(self.media) if files], [])
@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+
+from passages.models import GradeLevel, Profile, SkillCategory, Topic, UploadedDocument
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        caches['facets'].clear()
+        self.grade7 = GradeLevel.objects.create(name='Grade 7')
+        self.grade8 = GradeLevel.objects.create(name='Grade 8')
+        self.skill = SkillCategory.objects.create(name='Main idea')
+        self.science = Topic.objects.create(name='Science')
+        for grade, program, difficulty in [
+            (self.grade7, 'sat', 'easy'), (self.grade7, 'sat', 'hard'), (self.grade8, 'sat', 'easy'),
+            (self.grade8, 'shsat', 'easy'), (None, 'standard', ''),
+        ]:
+            self.add(grade_level=grade, program=program, difficulty=difficulty)
+
+    def add(self, **fields):
+        return UploadedDocument.objects.create(title='Doc', file='documents/x.docx', topic=self.science, **fields)
+
+    def facets(self, **params):
+        return self.client.get('/api/documents/facets/', params).json()
+
+    @staticmethod
+    def counts(body, facet):
+        return {option['value']: option['count'] for option in body['facets'][facet]}
+
+    def test_counts_every_facet(self):
+        body = self.facets()
+        self.assertEqual(body['total'], 5)
+        self.assertEqual(body['facets']['grade_level'], [
+            {'value': self.grade7.id, 'label': 'Grade 7', 'count': 2},
+            {'value': self.grade8.id, 'label': 'Grade 8', 'count': 2},
+        ])
+        self.assertEqual(body['facets']['program'], [
+            {'value': 'standard', 'label': 'Standard Reading', 'count': 1},
+            {'value': 'shsat', 'label': 'SHSAT', 'count': 1},
+            {'value': 'sat', 'label': 'SAT Reading & Writing', 'count': 3},
+        ])
+        self.assertEqual(self.counts(body, 'difficulty'), {'easy': 3, 'hard': 1})
+        self.assertEqual(self.counts(body, 'topic'), {self.science.id: 5})
+        self.assertEqual(body['facets']['skill_category'], [])
+
+    def test_a_facet_ignores_its_own_filter(self):
+        body = self.facets(program='sat', grade_level=self.grade7.id)
+        self.assertEqual(body['total'], 2)
+        self.assertEqual(self.counts(body, 'program'), {'sat': 2})
+        self.assertEqual(self.counts(body, 'grade_level'), {self.grade7.id: 2, self.grade8.id: 1})
+        self.assertEqual(self.counts(body, 'difficulty'), {'easy': 1, 'hard': 1})
+        listed = self.client.get('/api/documents/', {'program': 'sat', 'grade_level': self.grade7.id}).json()
+        self.assertEqual(len(listed['results']), body['total'])
+
+    def test_one_query_per_facet_then_cached(self):
+        with self.assertNumQueries(5):
+            first = self.facets(difficulty='easy')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.facets(difficulty='easy'), first)
+        with self.assertNumQueries(5):
+            self.facets(difficulty='hard')
+
+    def test_edits_invalidate_the_cache(self):
+        self.assertEqual(self.facets()['total'], 5)
+        teacher = User.objects.create_user(username='facet_teacher', password='pw12345!')
+        Profile.objects.create(user=teacher, role=Profile.ROLE_TEACHER)
+        self.client.force_login(teacher)
+        document = UploadedDocument.objects.filter(program='standard').get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/documents/{document.id}/', {'program': 'sat'}, content_type='application/json')
+        self.assertEqual(self.counts(self.facets(), 'program'), {'shsat': 1, 'sat': 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/documents/{document.id}/')
+        self.assertEqual(self.facets()['total'], 4)
@@ -0,0 +1,99 @@
+import io
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from passages import formats
+from passages.benchmarks.corpus import build_pye_paragraphs
+from passages.formats import (
+    GRAMMAR_LABELED, GRAMMAR_LOOKAHEAD_BLOCKS, GRAMMAR_PYE, detect_grammar, extract_source, parse_extraction,
+    parse_source, parse_upload,
+)
+from passages.test_ingestion import PYE_LINES, build_docx_upload
+
+LABELED_LINES = [
+    'The fox ran through the forest.',
+    'Questions to Answer',
+    '1. Where did the fox run?',
+    'A) Through the forest', 'B) Into the river', 'C) Into the cave', 'D) Across the field',
+    'Answer: A',
+    'Explanation: The passage says so.',
+]
+
+
+class GrammarDetectionTests(SimpleTestCase):
+    def test_pye_upload(self):
+        result = parse_upload(build_docx_upload(PYE_LINES))
+        self.assertEqual(result.grammar, GRAMMAR_PYE)
+        self.assertEqual(result.parsed.title, 'Sample Passage Title')
+        self.assertEqual(result.parsed.questions[0].correct_letter, 'A')
+        self.assertEqual(result.problems, [])
+
+    def test_labeled_upload_even_with_pye_header(self):
+        result = parse_upload(build_docx_upload(LABELED_LINES))
+        self.assertEqual(result.grammar, GRAMMAR_LABELED)
+        self.assertEqual(result.parsed.title, '')
+        self.assertEqual(result.parsed.passage, 'The fox ran through the forest.')
+        question = result.parsed.questions[0]
+        self.assertEqual((question.number, question.correct_letter), (1, 'A'))
+        self.assertEqual([c.is_correct for c in question.choices], [True, False, False, False])
+        self.assertEqual(question.explanation, 'The passage says so.')
+        self.assertEqual(result.problems, [])
+
+    def test_answer_key_without_pye_header_is_labeled(self):
+        extraction = extract_source(build_docx_upload([
+            'Passage text.', '1. Question?', 'A) a', 'B) b', 'C) c', 'D) d', 'Answer Key', '1. B (because)',
+        ]))
+        self.assertEqual(detect_grammar(extraction), GRAMMAR_LABELED)
+
+    def test_unrecognised_text_falls_back_to_pye_errors(self):
+        extraction = extract_source(build_docx_upload(['Just a title', 'No questions here.']))
+        self.assertEqual(detect_grammar(extraction), GRAMMAR_PYE)
+
+    def test_upload_is_decoded_once_with_table_cells_for_labeled_parser(self):
+        upload = build_docx_upload(LABELED_LINES[:3], table_rows=[['A) Through the forest', 'B) Into the river']])
+        with mock.patch('passages.formats.iter_docx_blocks', wraps=formats.iter_docx_blocks) as reader:
+            extraction = extract_source(upload)
+
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual(extraction.paragraphs, LABELED_LINES[:3])
+        self.assertEqual(extraction.lines[-2:], ['A) Through the forest', 'B) Into the river'])
+
+    def test_text_is_reported_while_it_is_read(self):
+        seen = []
+
+        def stop_at_third(text):
+            seen.append(text)
+            if len(seen) == 3:
+                raise RuntimeError('too long')
+
+        with mock.patch('passages.formats.iter_docx_blocks', wraps=formats.iter_docx_blocks) as reader:
+            with self.assertRaisesMessage(RuntimeError, 'too long'):
+                extract_source(build_docx_upload(PYE_LINES), on_text=stop_at_third)
+        self.assertEqual(seen, PYE_LINES[:3])
+        self.assertEqual(reader.call_count, 1)
+
+    def test_serial_pdf_extraction_streams_pages(self):
+        with mock.patch('passages.pye_parser.iter_pdf_paragraphs', return_value=iter(['Title', 'Body'])) as pages:
+            extraction = extract_source(io.BytesIO(b'%PDF'), 'a.pdf')
+        pages.assert_called_once()
+        self.assertEqual(extraction, (['Title', 'Body'], ['Title', 'Body']))
+
+    def test_grammar_is_chosen_from_a_prefix_and_the_rest_is_streamed(self):
+        paragraphs = build_pye_paragraphs(passage_paragraphs=10, questions=40)
+        read = []
+        started_after = []
+        parse_pye = formats.parse_pye
+
+        def record_start(stream):
+            started_after.append(len(read))
+            return parse_pye(stream)
+
+        with mock.patch('passages.formats.parse_pye', side_effect=record_start):
+            result = parse_source(build_docx_upload(paragraphs), on_text=read.append)
+
+        header = paragraphs.index('Questions to Answer')
+        self.assertEqual(started_after, [header + 1 + GRAMMAR_LOOKAHEAD_BLOCKS])
+        self.assertEqual(len(read), len(paragraphs))
+        self.assertEqual(result, parse_extraction(extract_source(build_docx_upload(paragraphs))))
+        self.assertEqual(len(result.parsed.questions), 40)
@@ -0,0 +1,196 @@
+import asyncio
+import random
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from passages.gemini_utils import parse_questions
+from passages.generation import (
+    GenerationError, GenerationService, StubBackend, TokenBucket, chunk_passage,
+    generate_for_documents, generate_passage_questions, merge_questions,
+)
+from passages.models import UploadedDocument
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'generation': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'generation-tests',
+    },
+}
+
+
+class FlakyBackend:
+    """Fails the first `failures` calls, then answers like the stub."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.models = []
+        self.active = self.peak = 0
+
+    async def generate(self, prompt, model):
+        self.models.append(model)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if len(self.models) <= self.failures:
+                raise RuntimeError('429 Resource exhausted')
+            return await StubBackend().generate(prompt, model)
+        finally:
+            self.active -= 1
+
+
+def service(backend, **kwargs):
+    kwargs.setdefault('rate_per_second', 1000)
+    kwargs.setdefault('burst', 1000)
+    return GenerationService(backend, base_delay=0, **kwargs)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenerationServiceTests(SimpleTestCase):
+    def setUp(self):
+        caches['generation'].clear()
+
+    def test_stub_output_parses_into_seven_questions(self):
+        output = service(StubBackend()).generate('The fox ran. The forest was dark. Owls watched.')
+        questions = parse_questions(output)
+        self.assertEqual(len(questions), 7)
+        self.assertTrue(all(q['correct_choice'] for q in questions))
+        self.assertEqual(output, service(StubBackend()).generate('The fox ran. The forest was dark. Owls watched.'))
+
+    def test_cached_by_passage_and_prompt_version(self):
+        backend = StubBackend()
+        svc = service(backend)
+        results = asyncio.run(svc.generate_many(['Same passage.', 'Same passage.', 'Other passage.']))
+        svc.generate('Same passage.')
+
+        self.assertEqual(backend.calls, 2)
+        self.assertEqual(results[0], results[1])
+
+        with mock.patch('passages.generation.PROMPT_VERSION', 99):
+            svc.generate('Same passage.')
+        self.assertEqual(backend.calls, 3)
+
+    def test_retries_then_falls_back_to_next_model(self):
+        backend = FlakyBackend(failures=3)
+        output = service(backend, models=('primary', 'fallback'), max_retries=2).generate('Passage.')
+
+        self.assertIn('Answer:', output)
+        self.assertEqual(backend.models, ['primary', 'primary', 'fallback', 'fallback'])
+
+    def test_exhausted_retries_raise_and_are_not_cached(self):
+        svc = service(FlakyBackend(failures=10), models=('primary',), max_retries=2)
+        with self.assertRaisesMessage(GenerationError, '429'):
+            svc.generate('Passage.')
+        self.assertIsNone(svc.cached('Passage.'))
+
+    def test_concurrency_limit(self):
+        backend = FlakyBackend()
+        asyncio.run(service(backend, max_concurrency=3).generate_many([f'Passage {i}.' for i in range(12)]))
+        self.assertEqual(len(backend.models), 12)
+        self.assertEqual(backend.peak, 3)
+
+    def test_token_bucket_spaces_calls_after_burst(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.5, 1.0])
+        now[0] = 10.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+
+def question(text):
+    return {'question_text': text, 'answers': [], 'correct_choice': 'A', 'explanation': ''}
+
+
+class PromptRecordingBackend(StubBackend):
+    def __init__(self):
+        super().__init__()
+        self.passages = []
+
+    async def generate(self, prompt, model):
+        self.passages.append(prompt.rsplit('Passage:\n', 1)[-1])
+        return await super().generate(prompt, model)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChunkedGenerationTests(SimpleTestCase):
+    def setUp(self):
+        caches['generation'].clear()
+
+    def test_chunks_overlap_and_cover_the_passage(self):
+        text = ' '.join(f'Sentence {i} ends here.' for i in range(600))
+        chunks = chunk_passage(text, size=1000, overlap=100, max_chunks=50)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(c) <= 1000 for c in chunks))
+        self.assertTrue(chunks[0].startswith('Sentence 0 '))
+        self.assertTrue(chunks[-1].endswith('Sentence 599 ends here.'))
+        for left, right in zip(chunks, chunks[1:]):
+            self.assertIn(right[:50], left)
+        self.assertEqual(chunk_passage('Short passage.'), ['Short passage.'])
+
+    def test_chunk_count_is_capped(self):
+        self.assertEqual(len(chunk_passage('word ' * 20000, size=1000, overlap=100, max_chunks=5)), 5)
+
+    def test_chunks_never_exceed_the_cap_and_cover_the_text(self):
+        rng = random.Random(9)
+        for _ in range(300):
+            words = ['x' * rng.randint(1, 60) for _ in range(rng.randint(50, 4000))]
+            text = ' '.join(word + rng.choice(['', '', '', '.', '.\n']) for word in words)
+            max_chunks = rng.randint(1, 10)
+            chunks = chunk_passage(text, size=rng.randint(500, 3000), overlap=rng.randint(0, 300),
+                                   max_chunks=max_chunks)
+            self.assertLessEqual(len(chunks), max_chunks)
+            self.assertTrue(all(chunks))
+            self.assertTrue(text.strip().startswith(chunks[0].strip()))
+            self.assertTrue(text.strip().endswith(chunks[-1].strip()))
+
+    def test_a_passage_that_fits_is_sent_as_is(self):
+        self.assertEqual(chunk_passage('  Short passage.\n'), ['  Short passage.\n'])
+        self.assertEqual(chunk_passage(' \n '), [])
+
+    def test_merge_dedupes_normalized_text_and_round_robins(self):
+        merged = merge_questions([
+            [question('What is X?'), question('Why Y?'), question('Who is Z?')],
+            [question('what is x'), question('When W?')],
+        ], count=3)
+        self.assertEqual([q['question_text'] for q in merged], ['What is X?', 'Why Y?', 'When W?'])
+
+    def test_long_passage_draws_from_every_chunk(self):
+        backend = PromptRecordingBackend()
+        text = ' '.join(f'Sentence {i} ends here.' for i in range(1000))
+
+        questions = generate_passage_questions(text, service=service(backend))
+
+        self.assertEqual(len(questions), 7)
+        self.assertEqual(backend.passages, chunk_passage(text))
+        self.assertIn('Sentence 999 ends here.', backend.passages[-1])
+
+    def test_failed_chunks_are_skipped_unless_all_fail(self):
+        text = ' '.join(f'Sentence {i} ends here.' for i in range(1000))
+        flaky = FlakyBackend(failures=1)
+        self.assertEqual(len(generate_passage_questions(text, service=service(flaky, models=('m',), max_retries=1))), 7)
+
+        caches['generation'].clear()
+        with self.assertRaises(GenerationError):
+            generate_passage_questions(text, service=service(FlakyBackend(failures=100), models=('m',), max_retries=1))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GenerateForDocumentsTests(TestCase):
+    def test_batch_generates_and_saves_for_each_document(self):
+        caches['generation'].clear()
+        docs = [
+            UploadedDocument.objects.create(title=f'Doc {i}', file='documents/x.docx', parsed_text=f'Passage {i}. More.')
+            for i in range(3)
+        ]
+        docs.append(UploadedDocument.objects.create(title='Empty', file='documents/y.docx', parsed_text=''))
+
+        results = generate_for_documents(docs, service=service(StubBackend()))
+
+        self.assertEqual(sorted(results), sorted(d.id for d in docs[:3]))
+        for document in docs[:3]:
+            self.assertEqual(document.questions.count(), 7)
+        self.assertFalse(docs[3].questions.exists())
@@ -0,0 +1,143 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from passages import grading
+from passages.importer import import_parsed_doc
+from passages.models import Profile, QuizAnswer, QuizResponse, UploadedDocument, UserAnswer
+from passages.test_importer import parsed_doc
+
+
+class SubmitQuizGradingTests(TestCase):
+    def setUp(self):
+        grading.answer_key_cache.clear()
+        self.document = self.make_document(4)
+        self.student = User.objects.create_user(username='grading_student', password='pw12345!')
+
+    def make_document(self, count):
+        document = UploadedDocument.objects.create(title='Quiz', file='documents/x.docx')
+        import_parsed_doc(document, parsed_doc(count))
+        return document
+
+    def answers_for(self, document, letters):
+        """One {"question_id", "selected_answer_id"} per question, picking `letters` in order."""
+        return [
+            {'question_id': question.id, 'selected_answer_id': question.answers.get(choice_letter=letter).id}
+            for question, letter in zip(document.questions.order_by('id'), letters)
+        ]
+
+    def submit(self, document, answers):
+        return self.client.post('/api/submit-quiz/', {
+            'document_id': document.id, 'answers': answers, 'time_spent': 42,
+        }, content_type='application/json')
+
+    def test_scores_in_memory_and_writes_every_answer(self):
+        self.client.force_login(self.student)
+        r = self.submit(self.document, self.answers_for(self.document, 'BBAC'))
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json()['score'], 2)
+        self.assertEqual(r.json()['total_questions'], 4)
+        self.assertEqual(r.json()['percentage'], 50.0)
+        correct = dict(
+            QuizAnswer.objects.filter(question__document=self.document, is_correct=True).values_list('question_id', 'id')
+        )
+        self.assertEqual(r.json()['review'], [
+            {'question_id': question_id, 'correct_answer_id': answer_id, 'explanation': 'Because.'}
+            for question_id, answer_id in sorted(correct.items())
+        ])
+
+        response = QuizResponse.objects.get(id=r.json()['response_id'])
+        self.assertEqual((response.user, response.user_name, response.duration_seconds), (self.student, 'grading_student', 42))
+        self.assertEqual(
+            [(a.selected_answer.choice_letter, a.is_correct) for a in response.user_answers.order_by('question_id')],
+            [('B', True), ('B', True), ('A', False), ('C', False)],
+        )
+
+    def test_query_count_does_not_grow_with_the_quiz(self):
+        long_document = self.make_document(20)
+        small = self.answers_for(self.document, 'BBBB')
+        large = self.answers_for(long_document, 'B' * 20)
+
+        with CaptureQueriesContext(connection) as few:
+            self.submit(self.document, small)
+        with CaptureQueriesContext(connection) as many:
+            r = self.submit(long_document, large)
+        self.assertEqual(r.json()['score'], 20)
+        self.assertEqual(len(many), len(few))
+        self.assertLessEqual(len(few), 6)
+
+    def test_foreign_question_or_choice_is_rejected_without_writing(self):
+        other = self.make_document(4)
+        foreign_question = self.answers_for(other, 'B')
+        r = self.submit(self.document, foreign_question)
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('not part of document', r.json()['error'])
+
+        mismatched = self.answers_for(self.document, 'BB')
+        mismatched[0]['selected_answer_id'] = mismatched[1]['selected_answer_id']
+        r = self.submit(self.document, mismatched)
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('not a choice of question', r.json()['error'])
+
+        twice = self.answers_for(self.document, 'B') * 2
+        self.assertEqual(self.submit(self.document, twice).status_code, 400)
+        self.assertFalse(QuizResponse.objects.exists())
+        self.assertFalse(UserAnswer.objects.exists())
+
+    def test_document_without_questions_is_rejected(self):
+        empty = UploadedDocument.objects.create(title='Empty', file='documents/x.docx')
+        r = self.submit(empty, [])
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()['error'], 'No questions found for this document')
+
+
+class AnswerKeyCacheTests(TestCase):
+    def setUp(self):
+        grading.answer_key_cache.clear()
+        self.document = UploadedDocument.objects.create(title='Quiz', file='documents/x.docx')
+        import_parsed_doc(self.document, parsed_doc(3))
+
+    def test_hit_costs_one_lookup_and_skips_the_join(self):
+        grading.answer_key(self.document.id)
+        with self.assertNumQueries(1):
+            key = grading.answer_key(self.document.id)
+        self.assertEqual(key.total_questions, 3)
+        stats = grading.answer_key_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_reimport_and_answer_edits_invalidate(self):
+        first = grading.answer_key(self.document.id)
+        import_parsed_doc(self.document, parsed_doc(3, correct='C'))
+        second = grading.answer_key(self.document.id)
+        self.assertNotEqual(second.correct, first.correct)
+        self.assertEqual(set(second.correct.values()), set(
+            QuizAnswer.objects.filter(question__document=self.document, is_correct=True).values_list('id', flat=True)
+        ))
+
+        teacher = User.objects.create_user(username='key_teacher', password='pw12345!')
+        Profile.objects.create(user=teacher, role=Profile.ROLE_TEACHER)
+        self.client.force_login(teacher)
+        question_id, answer_id = next(iter(second.correct.items()))
+        self.client.patch(f'/api/answers/{answer_id}/', {'is_correct': False}, content_type='application/json')
+        self.assertIsNone(grading.answer_key(self.document.id).correct[question_id])
+        self.assertEqual(grading.answer_key_cache.stats()['misses'], 3)
+
+    def test_least_recently_used_is_evicted(self):
+        others = [UploadedDocument.objects.create(title='Quiz', file='documents/x.docx') for _ in range(2)]
+        cache = grading.AnswerKeyCache(max_entries=2)
+        cache.get(self.document.id)
+        cache.get(others[0].id)
+        cache.get(self.document.id)
+        cache.get(others[1].id)        # evicts others[0], the least recently used
+        cache.get(self.document.id)
+        cache.get(others[0].id)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (2, 4, 2))
+
+    def test_stats_endpoint_is_teacher_only(self):
+        teacher = User.objects.create_user(username='stats_teacher', password='pw12345!')
+        Profile.objects.create(user=teacher, role=Profile.ROLE_TEACHER)
+        self.assertEqual(self.client.get('/api/grading/cache-stats/').status_code, 403)
+        self.client.force_login(teacher)
+        body = self.client.get('/api/grading/cache-stats/').json()
+        self.assertEqual(set(body), {'pid', 'hits', 'misses', 'evictions', 'entries', 'max_entries'})
@@ -0,0 +1,135 @@
+from django.test import TestCase
+
+from passages.importer import import_parsed_doc
+from passages.models import QuizAnswer, QuizResponse, UploadedDocument, UserAnswer
+from passages.pye_parser import Choice, ParsedDoc, Question
+
+
+def parsed_doc(count, correct='B', first_text='Question 1?'):
+    questions = []
+    for number in range(1, count + 1):
+        questions.append(Question(
+            number=number,
+            text=first_text if number == 1 else f'Question {number}?',
+            choices=[Choice(letter, f'choice {letter}', letter == correct) for letter in 'ABCD'],
+            correct_letter=correct,
+            explanation='Because.',
+        ))
+    return ParsedDoc(title='Title', passage='Passage.', questions=questions)
+
+
+class ImportParsedDocTests(TestCase):
+    def setUp(self):
+        self.document = UploadedDocument.objects.create(title='Upload', file='documents/x.docx')
+
+    def snapshot(self):
+        return {
+            q.id: (q.question_text, [(a.id, a.choice_text, a.is_correct) for a in q.answers.order_by('id')])
+            for q in self.document.questions.all()
+        }
+
+    def test_reimport_of_same_content_keeps_rows_and_history(self):
+        import_parsed_doc(self.document, parsed_doc(3))
+        before = self.snapshot()
+        question = self.document.questions.order_by('id').first()
+        response = QuizResponse.objects.create(document=self.document, score=1, total_questions=3)
+        UserAnswer.objects.create(
+            response=response, question=question,
+            selected_answer=question.answers.get(choice_letter='B'), is_correct=True,
+        )
+
+        import_parsed_doc(self.document, parsed_doc(3))
+
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(UserAnswer.objects.count(), 1)
+
+    def test_reimport_updates_only_changed_rows(self):
+        import_parsed_doc(self.document, parsed_doc(3))
+        before = self.snapshot()
+
+        import_parsed_doc(self.document, parsed_doc(2, correct='C', first_text='Question one?'))
+
+        after = self.snapshot()
+        self.assertEqual(list(after), list(before)[:2])
+        first_id = list(after)[0]
+        self.assertEqual(after[first_id][0], 'Question one?')
+        self.assertEqual(
+            [a[0] for a in after[first_id][1]], [a[0] for a in before[first_id][1]],
+        )
+        self.assertEqual(
+            QuizAnswer.objects.filter(question__document=self.document, is_correct=True)
+            .values_list('choice_letter', flat=True).distinct().get(),
+            'C',
+        )
+
+    def test_question_inserted_at_the_top_keeps_the_others(self):
+        import_parsed_doc(self.document, parsed_doc(3))
+        before = self.snapshot()
+        question = self.document.questions.get(question_text='Question 1?')
+        response = QuizResponse.objects.create(document=self.document, score=1, total_questions=3)
+        UserAnswer.objects.create(
+            response=response, question=question,
+            selected_answer=question.answers.get(choice_letter='B'), is_correct=True,
+        )
+        inserted = parsed_doc(3)
+        inserted.questions.insert(0, Question(
+            number=0, text='A  new first question?',
+            choices=[Choice(letter, f'choice {letter}', letter == 'A') for letter in 'ABCD'],
+            correct_letter='A', explanation='',
+        ))
+
+        import_parsed_doc(self.document, inserted)
+
+        after = self.snapshot()
+        self.assertEqual({qid: after[qid] for qid in before}, before)
+        [new_id] = set(after) - set(before)
+        self.assertEqual(after[new_id][0], 'A  new first question?')
+        self.assertEqual(UserAnswer.objects.get().question.question_text, 'Question 1?')
+
+    def test_quiz_follows_the_file_order_after_an_insert_and_a_reorder(self):
+        import_parsed_doc(self.document, parsed_doc(3))
+        ids = {q.question_text: q.id for q in self.document.questions.all()}
+        edited = parsed_doc(3)
+        edited.questions.insert(1, Question(
+            number=0, text='Inserted?', choices=[Choice(letter, f'choice {letter}', letter == 'A') for letter in 'ABCD'],
+            correct_letter='A', explanation='',
+        ))
+
+        import_parsed_doc(self.document, edited)
+
+        order = ['Question 1?', 'Inserted?', 'Question 2?', 'Question 3?']
+        quiz = self.client.get(f'/api/documents/{self.document.id}/quiz/').json()
+        self.assertEqual([q['question_text'] for q in quiz['questions']], order)
+        detail = self.client.get(f'/api/documents/{self.document.id}/detail/').json()
+        self.assertEqual([q['question_text'] for q in detail['questions']], order)
+        kept = {q.question_text: q.id for q in self.document.questions.exclude(question_text='Inserted?')}
+        self.assertEqual(kept, ids)
+
+        edited.questions.reverse()
+        import_parsed_doc(self.document, edited)
+        self.assertEqual([q.question_text for q in self.document.questions.all()], order[::-1])
+        self.assertEqual({q.question_text: q.id for q in self.document.questions.exclude(question_text='Inserted?')}, ids)
+
+    def test_removed_question_takes_only_its_own_row(self):
+        import_parsed_doc(self.document, parsed_doc(3))
+        before = self.snapshot()
+        shorter = parsed_doc(3)
+        del shorter.questions[0]
+
+        import_parsed_doc(self.document, shorter)
+
+        after = self.snapshot()
+        self.assertEqual(list(after), list(before)[1:])
+        self.assertEqual({qid: before[qid] for qid in after}, after)
+
+    def test_query_count_does_not_grow_with_questions(self):
+        # Includes the two statements that refresh the document's search index row.
+        with self.assertNumQueries(10):
+            import_parsed_doc(self.document, parsed_doc(5))
+        other = UploadedDocument.objects.create(title='Other', file='documents/y.docx')
+        with self.assertNumQueries(10):
+            import_parsed_doc(other, parsed_doc(50))
+        self.assertEqual(QuizAnswer.objects.filter(question__document=other).count(), 200)
+
+        with self.assertNumQueries(9):
+            import_parsed_doc(other, parsed_doc(50, correct='D'))
@@ -0,0 +1,117 @@
+import io
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from docx import Document
+
+from passages.ingestion import claim_next_job, process_pending_jobs
+from passages.models import IngestionJob, Profile, QuizQuestion, UploadedDocument
+
+PYE_LINES = [
+    'Sample Passage Title',
+    'The fox ran through the forest. The forest was quiet and dark.',
+    'Questions to Answer',
+    '1. Where did the fox run?',
+    'A.Through the forest',
+    'B.Into the river',
+    'C.Into the cave',
+    'D.Across the field',
+    'Answer Key with Explanations:',
+    'A (The passage says the fox ran through the forest.)',
+]
+
+
+def build_docx_upload(lines, name='passage.docx', table_rows=()):
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
+    if table_rows:
+        table = doc.add_table(rows=len(table_rows), cols=len(table_rows[0]))
+        for row, cells in zip(table.rows, table_rows):
+            for cell, text in zip(row.cells, cells):
+                cell.text = text
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return SimpleUploadedFile(
+        name,
+        buffer.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    )
+
+
+class IngestionQueueTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(username='ingest_teacher', password='pw12345!')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        self.client.force_login(self.teacher)
+
+    def _upload(self, lines):
+        return self.client.post('/api/documents/', {
+            'title': 'Uploaded Title',
+            'file': build_docx_upload(lines),
+        })
+
+    def test_upload_returns_queued_job_without_parsing(self):
+        r = self._upload(PYE_LINES)
+        self.assertEqual(r.status_code, 202, r.content)
+        self.assertEqual(r.json()['ingestion_job']['status'], IngestionJob.STATUS_QUEUED)
+        self.assertFalse(QuizQuestion.objects.exists())
+
+    def test_worker_parses_job_and_status_endpoint_reports_problems(self):
+        r = self._upload(PYE_LINES)
+        job_id = r.json()['ingestion_job']['id']
+
+        self.assertEqual(process_pending_jobs(), 1)
+
+        r = self.client.get(f'/api/ingestion-jobs/{job_id}/')
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(r.json()['status'], IngestionJob.STATUS_VALIDATED)
+        self.assertEqual(r.json()['problems'], [])
+        self.assertEqual(r.json()['grammar'], 'pye')
+
+        document = UploadedDocument.objects.get(id=r.json()['document'])
+        self.assertEqual(document.title, 'Sample Passage Title')
+        self.assertEqual(document.questions.count(), 1)
+
+    def test_labeled_upload_is_detected_and_imported(self):
+        r = self._upload([
+            'The fox ran through the forest.',
+            '1. Where did the fox run?',
+            'A) Through the forest', 'B) Into the river', 'C) Into the cave', 'D) Across the field',
+            'Answer: A',
+            'Explanation: The passage says so.',
+        ])
+        job_id = r.json()['ingestion_job']['id']
+        process_pending_jobs()
+
+        job = IngestionJob.objects.get(id=job_id)
+        self.assertEqual((job.status, job.grammar), (IngestionJob.STATUS_VALIDATED, 'labeled'))
+        self.assertEqual(job.document.title, 'Uploaded Title')
+        question = job.document.questions.get()
+        self.assertEqual(question.answers.get(is_correct=True).choice_letter, 'A')
+
+    def test_unparseable_upload_marks_job_failed(self):
+        r = self._upload(['Just a title', 'No questions here.'])
+        job_id = r.json()['ingestion_job']['id']
+
+        process_pending_jobs()
+
+        job = IngestionJob.objects.get(id=job_id)
+        self.assertEqual(job.status, IngestionJob.STATUS_FAILED)
+        self.assertIn("Questions to Answer", job.error)
+        self.assertEqual(job.attempts, 1)
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        self._upload(PYE_LINES)
+
+        job = claim_next_job()
+        self.assertEqual(job.status, IngestionJob.STATUS_PARSING)
+        self.assertIsNone(claim_next_job())
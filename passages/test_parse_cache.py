@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from passages import parse_cache
+from passages.pye_parser import parse_pye
+from passages.test_ingestion import PYE_LINES, build_docx_upload
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'parse': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'parse-cache-tests',
+        'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3},
+    },
+}
+
+# Parse in-process so the mocked parser sees the calls.
+IN_PROCESS = {**settings.PARSE_SANDBOX, 'ENABLED': False}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PARSE_SANDBOX=IN_PROCESS)
+class ParseCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['parse'].clear()
+
+    def test_same_bytes_are_parsed_once(self):
+        with mock.patch('passages.formats.parse_pye', wraps=parse_pye) as parser:
+            first = parse_cache.parse_file(build_docx_upload(PYE_LINES), file_name='a.docx')
+            second = parse_cache.parse_file(build_docx_upload(PYE_LINES), file_name='b.docx')
+
+        self.assertEqual(parser.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(second[0].questions[0].correct_letter, 'A')
+
+    def test_parser_version_bump_invalidates_entries(self):
+        parse_cache.parse_file(build_docx_upload(PYE_LINES), file_name='a.docx')
+
+        with mock.patch('passages.parse_cache.PARSER_VERSION', 999), \
+                mock.patch('passages.formats.parse_pye', wraps=parse_pye) as parser:
+            parse_cache.parse_file(build_docx_upload(PYE_LINES), file_name='a.docx')
+
+        self.assertEqual(parser.call_count, 1)
+
+    def test_cache_is_size_bounded(self):
+        hashes = []
+        for index in range(6):
+            upload = build_docx_upload([f'Title {index}', *PYE_LINES[1:]])
+            hashes.append(parse_cache.file_sha256(upload))
+            parse_cache.parse_file(upload, file_name='a.docx')
+
+        cached = [h for h in hashes if parse_cache.get_parsed(h) is not None]
+        self.assertLessEqual(len(cached), 3)
+        self.assertIsNotNone(parse_cache.get_parsed(hashes[-1]))
+
+    def test_sandbox_reads_the_upload_from_a_path(self):
+        upload = build_docx_upload(PYE_LINES)
+        expected = upload.file.getvalue()
+
+        def parse_from_disk(source, file_name, limits, *, pdf_workers):
+            self.assertIsInstance(source, str)
+            self.assertEqual(pdf_workers, settings.PDF_EXTRACT_WORKERS)     # the pool runs inside the sandbox
+            with open(source, 'rb') as fh:
+                self.assertEqual(fh.read(), expected)
+            return parse_cache.parse_with_limits(source, file_name, limits)
+
+        with override_settings(PARSE_SANDBOX={**IN_PROCESS, 'ENABLED': True}), \
+                mock.patch('passages.parse_cache.sandboxed_parse', side_effect=parse_from_disk), \
+                mock.patch.object(upload.file, 'read', wraps=upload.file.read) as reads:
+            result = parse_cache.parse_file(upload, file_name='a.docx')
+        self.assertEqual(result.parsed.title, 'Sample Passage Title')
+        self.assertNotIn(mock.call(), reads.call_args_list)      # never read whole
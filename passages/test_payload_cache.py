@@ -0,0 +1,143 @@
+import gzip
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from passages import payload_cache
+from passages.importer import import_parsed_doc
+from passages.models import UploadedDocument
+from passages.test_importer import parsed_doc
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'payload': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'payload-tests'},
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DocumentPayloadCacheTests(TestCase):
+    def setUp(self):
+        caches['payload'].clear()
+        self.document = UploadedDocument.objects.create(title='Upload', file='documents/x.docx')
+        import_parsed_doc(self.document, parsed_doc(3))
+        self.url = f'/api/documents/{self.document.id}/detail/'
+
+    def test_repeat_fetches_are_served_from_the_cache(self):
+        with mock.patch.object(payload_cache, 'render_payload', wraps=payload_cache.render_payload) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(first.json()['questions']), 3)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', first)
+
+    def test_conditional_fetch_gets_304_without_serializing(self):
+        first = self.client.get(self.url)
+        with mock.patch.object(payload_cache, 'render_payload', side_effect=AssertionError), \
+                self.assertNumQueries(1):
+            r = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r['ETag'], first['ETag'])
+
+        r = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(r.status_code, 304)
+
+    def test_reimport_invalidates(self):
+        first = self.client.get(self.url)
+        import_parsed_doc(self.document, parsed_doc(3, first_text='Edited question?'))
+
+        r = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], first['ETag'])
+        self.assertEqual(r.json()['questions'][0]['question_text'], 'Edited question?')
+
+    def test_question_and_answer_edits_invalidate(self):
+        first = self.client.get(self.url)
+        question = self.document.questions.order_by('id').first()
+        self.client.patch(
+            f'/api/questions/{question.id}/', {'question_text': 'Patched?'}, content_type='application/json',
+        )
+        second = self.client.get(self.url)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['questions'][0]['question_text'], 'Patched?')
+
+        answer = question.answers.order_by('id').first()
+        self.client.delete(f'/api/answers/{answer.id}/')
+        third = self.client.get(self.url)
+        self.assertNotEqual(third['ETag'], second['ETag'])
+        self.assertEqual(len(third.json()['questions'][0]['answers']), 3)
+
+    def test_missing_document_is_404(self):
+        self.assertEqual(self.client.get('/api/documents/999999/detail/').status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuizPayloadTests(TestCase):
+    def setUp(self):
+        caches['payload'].clear()
+        self.document = UploadedDocument.objects.create(title='Upload', file='documents/x.docx')
+        import_parsed_doc(self.document, parsed_doc(3))
+        self.url = f'/api/documents/{self.document.id}/quiz/'
+
+    def test_schema_is_minimal_and_has_no_answer_key(self):
+        body = self.client.get(self.url).json()
+        self.assertEqual(set(body), {'id', 'title', 'parsed_text', 'questions'})
+        self.assertEqual(set(body['questions'][0]), {'id', 'question_text', 'answers'})
+        self.assertEqual(set(body['questions'][0]['answers'][0]), {'id', 'choice_letter', 'choice_text'})
+        self.assertEqual([a['choice_letter'] for a in body['questions'][0]['answers']], list('ABCD'))
+        self.assertNotIn(b'is_correct', self.client.get(self.url).content)
+
+    def test_gzip_is_precompressed_and_hits_are_byte_copies(self):
+        plain = self.client.get(self.url)
+        with mock.patch.object(payload_cache, 'render_quiz_payload', side_effect=AssertionError), \
+                mock.patch('gzip.compress', side_effect=AssertionError):
+            zipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', zipped['Vary'])
+        self.assertEqual(gzip.decompress(zipped.content), plain.content)
+        self.assertNotEqual(zipped['ETag'], plain['ETag'])
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+        r = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=zipped['ETag'])
+        self.assertEqual(r.status_code, 304)
+
+    @skipUnless(payload_cache.brotli, 'brotli is not installed')
+    def test_br_is_preferred_and_has_its_own_etag(self):
+        plain = self.client.get(self.url)
+        zipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch.object(payload_cache, 'render_quiz_payload', side_effect=AssertionError):
+            squeezed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(squeezed['Content-Encoding'], 'br')
+        self.assertEqual(payload_cache.brotli.decompress(squeezed.content), plain.content)
+        self.assertEqual(len({plain['ETag'], zipped['ETag'], squeezed['ETag']}), 3)
+
+        r = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=squeezed['ETag'])
+        self.assertEqual(r.status_code, 304)
+        r = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=squeezed['ETag'])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+
+    def test_without_brotli_only_gzip_is_precompressed(self):
+        with mock.patch.object(payload_cache, 'brotli', None):
+            variants = payload_cache.compress_variants(b'{"questions":[]}' * 50)
+        self.assertEqual(set(variants), {'identity', 'gzip'})
+
+    def test_etag_names_the_encoding_served(self):
+        tiny = UploadedDocument.objects.create(title='T', file='documents/t.docx')
+        url = f'/api/documents/{tiny.id}/quiz/'
+        plain = self.client.get(url)
+        asked = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        # Compressing a body this small would grow it, so it is served as is, under the identity tag.
+        self.assertFalse(asked.has_header('Content-Encoding'))
+        self.assertEqual(asked.content, plain.content)
+        self.assertEqual(asked['ETag'], plain['ETag'])
+        r = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(r.status_code, 304)
+
+    def test_accept_encoding_negotiation(self):
+        self.assertEqual(payload_cache.choose_encoding('gzip;q=0, br', {'identity', 'gzip'}), 'identity')
+        self.assertEqual(payload_cache.choose_encoding('*', {'identity', 'gzip'}), 'gzip')
+        self.assertEqual(payload_cache.choose_encoding('br, gzip', {'identity', 'gzip', 'br'}), 'br')
+        self.assertEqual(payload_cache.choose_encoding('', {'identity', 'gzip'}), 'identity')
@@ -0,0 +1,142 @@
+import functools
+import io
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+from pypdf import PdfWriter
+from pypdf.generic import NameObject, StreamObject
+
+from passages.benchmarks.corpus import CorpusSpec, build_pye_paragraphs, write_pdf, write_spec
+from passages.pye_parser import (
+    TOKEN_ANSWER_KEY_HEADER, TOKEN_CHOICE, TOKEN_KEY, TOKEN_KEY_LINE, TOKEN_PASSAGE, TOKEN_QUESTION,
+    TOKEN_QUESTIONS_HEADER, TOKEN_TEXT, TOKEN_TITLE, PYEParseError, extract_paragraphs, extract_pdf_paragraphs,
+    iter_pdf_paragraphs, parse_pye, tokenize_pye, validate,
+)
+
+
+def spawned_pool():
+    """Run the page-range pool under spawn, where patches made in the test process do not reach the workers."""
+    return mock.patch('passages.pye_parser.ProcessPoolExecutor', functools.partial(
+        ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn'),
+    ))
+
+
+class StreamingPDFTests(SimpleTestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name) / 'packet.pdf'
+        self.pages = write_pdf(build_pye_paragraphs(passage_paragraphs=40, questions=6), self.path)
+
+    def test_streaming_parse_matches_eager_parse(self):
+        self.assertGreater(self.pages, 2)
+        eager = parse_pye(extract_pdf_paragraphs(self.path))
+        streamed = parse_pye(iter_pdf_paragraphs(self.path))
+
+        self.assertEqual(streamed, eager)
+        self.assertEqual(len(streamed.questions), 6)
+        self.assertEqual(validate(streamed), [])
+
+    def test_extract_paragraphs_stream_returns_generator_for_pdf(self):
+        paragraphs = extract_paragraphs(self.path, stream=True)
+        self.assertFalse(isinstance(paragraphs, list))
+        self.assertEqual(next(iter(paragraphs)), 'Synthetic Passage 0')
+
+    def test_page_parallel_extraction_matches_serial(self):
+        serial = extract_pdf_paragraphs(self.path)
+        with mock.patch('passages.pye_parser.PARALLEL_PDF_MIN_PAGES', 2):
+            self.assertEqual(extract_pdf_paragraphs(self.path, workers=2), serial)
+            upload = io.BytesIO(self.path.read_bytes())
+            self.assertEqual(extract_paragraphs(upload, file_name='packet.pdf', pdf_workers=3), serial)
+
+    def test_small_pdf_skips_the_process_pool(self):
+        with mock.patch('passages.pye_parser.ProcessPoolExecutor') as pool:
+            paragraphs = extract_pdf_paragraphs(self.path, workers=4)
+        pool.assert_not_called()
+        self.assertEqual(paragraphs, extract_pdf_paragraphs(self.path))
+
+    def test_page_parallel_extraction_works_under_spawn(self):
+        serial = extract_pdf_paragraphs(self.path)
+        with mock.patch('passages.pye_parser.PARALLEL_PDF_MIN_PAGES', 2), spawned_pool():
+            self.assertEqual(extract_pdf_paragraphs(self.path, workers=2), serial)
+
+    def test_page_parallel_extraction_reports_the_failing_page(self):
+        # Page 3's content stream uses a filter pypdf cannot decode.
+        writer = PdfWriter(clone_from=self.path)
+        broken = StreamObject()
+        broken.set_data(b'0 0 m')
+        broken[NameObject('/Filter')] = NameObject('/BogusDecode')
+        writer.pages[2][NameObject('/Contents')] = writer._add_object(broken)
+        writer.write(self.path)
+
+        with mock.patch('passages.pye_parser.PARALLEL_PDF_MIN_PAGES', 2), spawned_pool():
+            with self.assertRaisesMessage(PYEParseError, 'Could not extract text from page 3 of the PDF.'):
+                extract_pdf_paragraphs(self.path, workers=2)
+
+    def test_unreadable_pdf_raises_parse_error_while_streaming(self):
+        self.path.write_bytes(b'not a pdf')
+        with self.assertRaises(PYEParseError):
+            parse_pye(iter_pdf_paragraphs(self.path))
+
+
+class IncrementalParseTests(SimpleTestCase):
+    def test_section_header_split_across_paragraphs(self):
+        doc = parse_pye(iter([
+            'Title', 'Passage text.', 'Questions to', 'Answer',
+            '1. Why?', 'A. one', 'B. two', 'C. three', 'D. four',
+            'Answer', 'Key', '1. C (Because.)',
+        ]))
+        self.assertEqual(doc.passage, 'Passage text.')
+        self.assertEqual(doc.questions[0].correct_letter, 'C')
+        self.assertEqual(doc.questions[0].explanation, 'Because.')
+
+    def test_missing_questions_header_previews_first_paragraphs(self):
+        with self.assertRaisesMessage(PYEParseError, "; ...") as ctx:
+            parse_pye(iter(f'Line {i}' for i in range(10)))
+        self.assertIn("'Line 0'", str(ctx.exception))
+        self.assertNotIn("'Line 5'", str(ctx.exception))
+
+
+class TokenizerTests(SimpleTestCase):
+    def test_tokens_follow_document_order(self):
+        tokens = list(tokenize_pye([
+            'Title', 'Passage text.', 'Questions to Answer',
+            '1. Why?', 'A. one', 'B.two',
+            'Answer Key', '1. B (Because.)',
+        ]))
+        kinds = [t.kind for t in tokens if t.kind != TOKEN_TEXT]
+        self.assertEqual(kinds, [
+            TOKEN_TITLE, TOKEN_PASSAGE, TOKEN_QUESTIONS_HEADER,
+            TOKEN_QUESTION, TOKEN_CHOICE, TOKEN_CHOICE,
+            TOKEN_ANSWER_KEY_HEADER, TOKEN_KEY_LINE, TOKEN_KEY,
+        ])
+        self.assertEqual([t.letter for t in tokens if t.kind == TOKEN_CHOICE], ['A', 'B'])
+
+    def test_markers_split_across_paragraphs(self):
+        doc = parse_pye([
+            'Title', 'Passage text.', 'Questions to Answer',
+            '1', '. Why? A', '. one B. two', 'C. “', 'quoted” D.',
+            '2. Next? A. x', 'Answer Key', '1', '. D (Because.)',
+        ])
+        first = doc.questions[0]
+        self.assertEqual(first.text, 'Why?')
+        self.assertEqual([c.text for c in first.choices], ['one', 'two', 'quoted” D.'])
+        self.assertEqual(first.correct_letter, 'D')
+        self.assertEqual(doc.questions[1].choices[0].text, 'x')
+
+
+class SyntheticCorpusTests(SimpleTestCase):
+    def test_messy_worksheets_parse_like_clean_ones(self):
+        clean = parse_pye(build_pye_paragraphs(passage_paragraphs=5, questions=8, seed=3))
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt in ('docx', 'pdf'):
+                path = write_spec(CorpusSpec(5, 8, format=fmt, messy=True, seed=3), tmp)
+                parsed = parse_pye(extract_paragraphs(str(path)))
+
+                self.assertEqual(validate(parsed), [], fmt)
+                self.assertEqual([q.correct_letter for q in parsed.questions],
+                                 [q.correct_letter for q in clean.questions], fmt)
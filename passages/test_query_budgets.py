@@ -0,0 +1,169 @@
+"""
+Per-endpoint query budgets for every GET route under /api/.
+
+Each route is fetched against a small data set and again after the data set
+grows several times over. The query count must stay the same (no N+1) and
+within the route's budget. A new route fails `test_every_route_has_a_budget`
+until it is given one here.
+"""
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from passages.importer import import_parsed_doc
+from passages.ingestion import enqueue_document
+from passages.models import (
+    Assignment, Classroom, GradeLevel, IngestionJob, Profile, QuizAnswer, QuizQuestion, QuizResponse, SkillCategory,
+    Topic, UploadedDocument, UploadSession, UserAnswer,
+)
+from passages.test_importer import parsed_doc
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'payload': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'query-budget-tests'},
+    # Budget the uncached facet counts.
+    'facets': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+# Route name -> maximum queries for one GET, session and permission lookups included.
+BUDGETS = {
+    'api-root': 2,
+    'csrf_ping': 4,
+    'user_profile': 3,
+    'documents-list': 3,
+    'documents-detail': 3,
+    'documents-search': 4,
+    'documents-facets': 7,
+    'document_detail': 6,
+    'document_quiz': 6,
+    'answer_key_cache_stats': 3,
+    'questions-list': 4,
+    'questions-detail': 4,
+    'answers-list': 3,
+    'answers-detail': 3,
+    'responses-list': 3,
+    'responses-detail': 3,
+    'grade-levels-list': 3,
+    'grade-levels-detail': 3,
+    'skill-categories-list': 3,
+    'skill-categories-detail': 3,
+    'topics-list': 3,
+    'topics-detail': 3,
+    'classrooms-list': 5,
+    'classrooms-detail': 5,
+    'classrooms-assignments': 6,
+    'ingestion-jobs-list': 3,
+    'ingestion-jobs-detail': 3,
+    'uploads-detail': 4,
+    'student_dashboard': 3,
+    'my_assignments': 3,
+}
+
+# Routes that only answer other methods (POST-only actions, auth forms).
+NOT_GET_ROUTES = {
+    'documents-validate', 'documents-commit', 'classrooms-join', 'classrooms-remove-student',
+    'classrooms-regenerate-code', 'uploads-list', 'uploads-parts', 'uploads-complete',
+    'submit_quiz', 'user_register', 'user_login', 'user_logout',
+}
+STUDENT_ROUTES = {'student_dashboard', 'my_assignments'}
+QUERY_STRINGS = {'documents-search': '?q=passage'}
+
+
+def api_route_names():
+    """Names of every named URL under api/ (router routes and plain views)."""
+    names = set()
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            route = prefix + str(pattern.pattern)
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, route)
+            elif isinstance(pattern, URLPattern) and pattern.name and 'api/' in route and 'format' not in route:
+                names.add(pattern.name)
+
+    walk(get_resolver().url_patterns, '')
+    return names
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='budget_teacher', password='pw12345!')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        self.student = User.objects.create_user(username='budget_student', password='pw12345!')
+        Profile.objects.create(user=self.student, role=Profile.ROLE_STUDENT)
+        self.classroom = Classroom.objects.create(name='Period 1', teacher=self.teacher)
+        self.grade = GradeLevel.objects.create(name='Grade 7')
+        self.skill = SkillCategory.objects.create(name='Main idea')
+        self.topic = Topic.objects.create(name='Science')
+        self.add_data(2)
+
+    def add_data(self, count):
+        """Documents with questions, answers, responses, assignments, jobs and enrolled students."""
+        for _ in range(count):
+            document = UploadedDocument.objects.create(
+                title='Doc', file='documents/x.docx', uploader=self.teacher,
+                grade_level=self.grade, skill_category=self.skill, topic=self.topic,
+            )
+            import_parsed_doc(document, parsed_doc(4))
+            enqueue_document(document)
+            Assignment.objects.create(classroom=self.classroom, document=document, assigned_by=self.teacher)
+            response = QuizResponse.objects.create(
+                document=document, user=self.student, score=1, total_questions=4,
+            )
+            question = document.questions.first()
+            UserAnswer.objects.create(
+                response=response, question=question, selected_answer=question.answers.first(), is_correct=False,
+            )
+            student = User.objects.create_user(username=f'budget_student_{User.objects.count()}')
+            self.classroom.students.add(student)
+        self.classroom.students.add(self.student)
+        self.document = document
+        self.upload_session_id = self.make_upload_session()
+
+    def make_upload_session(self):
+        return UploadSession.objects.create(
+            uploader=self.teacher, file_name='a.pdf', size=1, chunk_size=1, storage_name='documents/a.pdf',
+        ).id
+
+    def url_for(self, name):
+        pk_for = {
+            'documents-detail': lambda: self.document.id,
+            'document_detail': lambda: self.document.id,
+            'document_quiz': lambda: self.document.id,
+            'questions-detail': lambda: QuizQuestion.objects.first().id,
+            'answers-detail': lambda: QuizAnswer.objects.first().id,
+            'responses-detail': lambda: QuizResponse.objects.first().id,
+            'grade-levels-detail': lambda: self.grade.id,
+            'skill-categories-detail': lambda: self.skill.id,
+            'topics-detail': lambda: self.topic.id,
+            'classrooms-detail': lambda: self.classroom.id,
+            'classrooms-assignments': lambda: self.classroom.id,
+            'ingestion-jobs-detail': lambda: IngestionJob.objects.first().id,
+            'uploads-detail': lambda: self.upload_session_id,
+        }
+        return reverse(name, kwargs={'pk': pk_for[name]()}) if name in pk_for else reverse(name)
+
+    def count_queries(self, name):
+        self.client.force_login(self.student if name in STUDENT_ROUTES else self.teacher)
+        url = self.url_for(name) + QUERY_STRINGS.get(name, '')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 300, f'{name}: GET {url} -> {response.status_code}')
+        return len(queries)
+
+    def test_every_route_has_a_budget(self):
+        missing = api_route_names() - set(BUDGETS) - NOT_GET_ROUTES
+        self.assertFalse(missing, f'Give these routes a query budget in {__name__}.BUDGETS: {sorted(missing)}')
+
+    def test_query_counts_are_flat_and_within_budget(self):
+        small = {name: self.count_queries(name) for name in BUDGETS}
+        self.add_data(6)
+        large = {name: self.count_queries(name) for name in BUDGETS}
+
+        for name, budget in BUDGETS.items():
+            with self.subTest(route=name):
+                self.assertEqual(large[name], small[name], f'{name} grows with the data (N+1 query)')
+                self.assertLessEqual(large[name], budget, f'{name} ran {large[name]} queries')
@@ -0,0 +1,110 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from passages.importer import import_document
+from passages.models import QuizQuestion, UploadedDocument
+from passages.pye_parser import PARSER_VERSION
+from passages.reprocess import apply_outcomes, reparse_task, stale_tasks
+from passages.test_ingestion import PYE_LINES, build_docx_upload
+
+NEXT_VERSION = PARSER_VERSION + 1
+
+
+class _BothVersions:
+    """Pretend the parser was bumped, everywhere the version is read."""
+    def __enter__(self):
+        self._patches = [
+            mock.patch('passages.reprocess.PARSER_VERSION', NEXT_VERSION),
+            mock.patch('passages.importer.PARSER_VERSION', NEXT_VERSION),
+        ]
+        for patch in self._patches:
+            patch.start()
+
+    def __exit__(self, *exc):
+        for patch in reversed(self._patches):
+            patch.stop()
+
+
+class ReparseStaleTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _import(self, lines, name='passage.docx'):
+        document = UploadedDocument(title='Uploaded Title')
+        document.file.save(name, ContentFile(build_docx_upload(lines).read()), save=True)
+        import_document(document)
+        document.refresh_from_db()
+        return document
+
+    def test_import_stamps_version_and_hashes(self):
+        document = self._import(PYE_LINES)
+        self.assertEqual(document.parser_version, PARSER_VERSION)
+        self.assertEqual(len(document.extracted_hash), 64)
+        self.assertEqual(len(document.parsed_hash), 64)
+        self.assertEqual(list(stale_tasks()), [])
+
+    def test_unchanged_document_only_gets_its_version_bumped(self):
+        document = self._import(PYE_LINES)
+        question_ids = list(document.questions.values_list('id', flat=True))
+
+        with _BothVersions():
+            tasks = list(stale_tasks())
+            self.assertEqual([t.document_id for t in tasks], [document.id])
+            outcome = reparse_task(tasks[0])
+            self.assertTrue(outcome.unchanged)
+            self.assertIsNone(outcome.parsed)
+            with self.assertNumQueries(3):     # savepoint, one UPDATE, release
+                counts = apply_outcomes([outcome])
+            self.assertEqual(list(stale_tasks()), [])
+
+        self.assertEqual(counts, {'unchanged': 1, 'reimported': 0, 'failed': 0})
+        document.refresh_from_db()
+        self.assertEqual(document.parser_version, NEXT_VERSION)
+        self.assertEqual(list(document.questions.values_list('id', flat=True)), question_ids)
+
+    def test_changed_file_is_reimported(self):
+        document = self._import(PYE_LINES)
+        edited = [line.replace('Where did the fox run?', 'Where did the fox go?') for line in PYE_LINES]
+        with document.file.storage.open(document.file.name, 'wb') as fh:
+            fh.write(build_docx_upload(edited).read())
+
+        with _BothVersions():
+            counts = apply_outcomes([reparse_task(task) for task in stale_tasks()])
+
+        self.assertEqual(counts, {'unchanged': 0, 'reimported': 1, 'failed': 0})
+        document.refresh_from_db()
+        self.assertEqual(document.parser_version, NEXT_VERSION)
+        self.assertEqual(QuizQuestion.objects.get(document=document).question_text, 'Where did the fox go?')
+
+    def test_unreadable_file_stays_stale(self):
+        document = self._import(PYE_LINES)
+        with document.file.storage.open(document.file.name, 'wb') as fh:
+            fh.write(b'not a document')
+
+        with _BothVersions():
+            outcome = reparse_task(next(stale_tasks()))
+            with self.assertLogs('passages.reprocess', 'WARNING'):
+                counts = apply_outcomes([outcome])
+            self.assertEqual([t.document_id for t in stale_tasks()], [document.id])
+
+        self.assertTrue(outcome.error)
+        self.assertEqual(counts['failed'], 1)
+        self.assertEqual(document.questions.count(), 1)
+
+    def test_command_reports_counts(self):
+        self._import(PYE_LINES, 'one.docx')
+        self._import(PYE_LINES, 'two.docx')
+        out = io.StringIO()
+        with _BothVersions():
+            call_command('reparse_stale', '--workers', '1', stdout=out)
+        self.assertIn('2 document(s) to re-parse', out.getvalue())
+        self.assertIn('2 unchanged (version bumped), 0 re-imported, 0 failed.', out.getvalue())
@@ -0,0 +1,149 @@
+import io
+import os
+import resource
+import subprocess
+import tempfile
+import time
+import unittest
+import zipfile
+from multiprocessing import get_all_start_methods
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from passages import pye_parser
+from passages.benchmarks.corpus import build_pye_paragraphs, write_pdf
+from passages.docx_reader import iter_docx_blocks
+from passages.formats import parse_upload
+from passages.pye_parser import PYEParseError
+from passages.sandbox import ParseLimits, parse_with_limits, sandboxed_parse
+from passages.test_ingestion import PYE_LINES, build_docx_upload
+
+def docx_bytes(lines=PYE_LINES, extra_member=None):
+    buffer = io.BytesIO(build_docx_upload(lines).read())
+    if extra_member:
+        with zipfile.ZipFile(buffer, 'a', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(*extra_member)
+    return buffer.getvalue()
+
+
+def process_running(pid):
+    """True while `pid` exists and is not a zombie waiting to be reaped."""
+    try:
+        with open(f'/proc/{pid}/stat') as fh:
+            return fh.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+class LimitTests(SimpleTestCase):
+    def test_zip_bomb_is_rejected_before_extraction(self):
+        data = docx_bytes(extra_member=('word/media/bomb.xml', b'\0' * (20 * 1024 * 1024)))
+        with mock.patch('passages.sandbox.parse_source') as parse:
+            with self.assertRaisesMessage(PYEParseError, "The .docx part 'word/media/bomb.xml' expands"):
+                parse_with_limits(data, 'bomb.docx', ParseLimits())
+        parse.assert_not_called()
+
+    def test_uncompressed_size_limit(self):
+        data = docx_bytes(extra_member=('word/media/big.bin', os.urandom(2 * 1024 * 1024)))
+        with self.assertRaisesMessage(PYEParseError, 'MB (the limit is 1 MB).'):
+            parse_with_limits(data, 'big.docx', ParseLimits(max_uncompressed_mb=1))
+
+    def test_paragraph_and_character_limits(self):
+        with self.assertRaisesMessage(PYEParseError, 'The document has more than 5 paragraphs.'):
+            parse_with_limits(docx_bytes(), 'a.docx', ParseLimits(max_paragraphs=5))
+        with self.assertRaisesMessage(PYEParseError, 'The document has more than 20 characters of text.'):
+            parse_with_limits(docx_bytes(), 'a.docx', ParseLimits(max_chars=20))
+
+    def test_limits_stop_extraction_early(self):
+        read = []
+
+        def counting_reader(source):
+            for block in iter_docx_blocks(source):
+                read.append(block)
+                yield block
+
+        with mock.patch('passages.formats.iter_docx_blocks', side_effect=counting_reader):
+            with self.assertRaises(PYEParseError):
+                parse_with_limits(docx_bytes(['paragraph'] * 1000), 'a.docx', ParseLimits(max_paragraphs=5))
+        self.assertEqual(len(read), 6)
+
+
+@unittest.skipUnless('fork' in get_all_start_methods(), 'patches reach the child only when it is forked')
+class SandboxTests(SimpleTestCase):
+    def test_result_matches_in_process_parse(self):
+        data = docx_bytes()
+        self.assertEqual(sandboxed_parse(data, 'a.docx'), parse_upload(io.BytesIO(data), 'a.docx'))
+
+    def test_parse_errors_come_back_unchanged(self):
+        data = docx_bytes(['Just a title', 'No questions here.'])
+        with self.assertRaises(PYEParseError) as in_process:
+            parse_upload(io.BytesIO(data), 'a.docx')
+        with self.assertRaisesMessage(PYEParseError, str(in_process.exception)):
+            sandboxed_parse(data, 'a.docx')
+
+    def test_slow_parse_is_killed_at_the_timeout(self):
+        started = time.monotonic()
+        with mock.patch('passages.sandbox.parse_source', side_effect=lambda *args, **kwargs: time.sleep(30)):
+            with self.assertRaisesMessage(PYEParseError, 'took longer than 0.5 seconds'):
+                sandboxed_parse(docx_bytes(), 'a.docx', ParseLimits(timeout=0.5))
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_processes_started_by_the_parse_die_with_it(self):
+        pid_file = tempfile.NamedTemporaryFile(delete=False)
+        self.addCleanup(os.unlink, pid_file.name)
+
+        def spawn_and_hang(*args, **kwargs):
+            helper = subprocess.Popen(['sleep', '60'])
+            with open(pid_file.name, 'w') as fh:
+                fh.write(str(helper.pid))
+            time.sleep(30)
+
+        with mock.patch('passages.sandbox.parse_source', side_effect=spawn_and_hang):
+            with self.assertRaisesMessage(PYEParseError, 'took longer than'):
+                sandboxed_parse(docx_bytes(), 'a.docx', ParseLimits(timeout=1))
+        helper_pid = int(open(pid_file.name).read())
+        deadline = time.monotonic() + 5
+        while process_running(helper_pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(process_running(helper_pid))
+
+    def test_long_pdfs_are_extracted_by_capped_workers_in_the_child(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        workdir = Path(temp_dir.name)
+        pdf = workdir / 'packet.pdf'
+        write_pdf(build_pye_paragraphs(passage_paragraphs=40, questions=6), pdf)
+        init = pye_parser._init_pdf_worker
+
+        def record_worker(source):
+            # Which processes initialised a pool worker, and the address-space cap each one had.
+            (workdir / f'worker-{os.getpid()}').write_text(str(resource.getrlimit(resource.RLIMIT_AS)[0]))
+            init(source)
+
+        def workers():
+            return sorted(path.read_text() for path in workdir.glob('worker-*'))
+
+        limits = ParseLimits(worker_memory_mb=900)
+        with mock.patch('passages.pye_parser.PARALLEL_PDF_MIN_PAGES', 2), \
+                mock.patch('passages.pye_parser._init_pdf_worker', record_worker):
+            serial = sandboxed_parse(str(pdf), 'packet.pdf', limits)
+            self.assertEqual(workers(), [])
+            parallel = sandboxed_parse(str(pdf), 'packet.pdf', limits, pdf_workers=2)
+        self.assertEqual(workers(), [str(900 * 1024 * 1024)] * 2)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(len(parallel.parsed.questions), 6)
+
+    def test_memory_cap(self):
+        def allocate(*args, **kwargs):
+            return bytearray(2 * 1024 ** 3)
+
+        with mock.patch('passages.sandbox.parse_source', side_effect=allocate):
+            with self.assertRaisesMessage(PYEParseError, 'needed more than 1024 MB of memory'):
+                sandboxed_parse(docx_bytes(), 'a.docx', ParseLimits(memory_mb=1024))
+
+    def test_crashed_child(self):
+        with mock.patch('passages.sandbox.parse_source', side_effect=lambda *args, **kwargs: os._exit(3)):
+            with self.assertRaisesMessage(PYEParseError, 'The parser stopped unexpectedly (exit code 3)'):
+                sandboxed_parse(docx_bytes(), 'a.docx')
@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from passages import search
+from passages.importer import import_parsed_doc
+from passages.models import Profile, UploadedDocument
+from passages.pye_parser import Choice, ParsedDoc, Question
+
+
+def worksheet(title, passage, question='What happened?'):
+    return ParsedDoc(title=title, passage=passage, questions=[Question(
+        number=1, text=question, choices=[Choice(letter, f'choice {letter}', letter == 'A') for letter in 'ABCD'],
+        correct_letter='A', explanation='',
+    )])
+
+
+class FullTextSearchTests(TestCase):
+    def add(self, title, passage, question='What happened?', **fields):
+        document = UploadedDocument.objects.create(title='Upload', file='documents/x.docx', **fields)
+        import_parsed_doc(document, worksheet(title, passage, question))
+        return document
+
+    def hits(self, query, **params):
+        return self.client.get('/api/documents/search/', {'q': query, **params}).json()['results']
+
+    def test_matches_titles_passages_and_questions_ranked(self):
+        volcano = self.add('Volcanoes', 'Magma rises through the crust.')
+        mention = self.add('Islands', 'Some islands began as a volcano long ago.')
+        question = self.add('Mountains', 'Peaks form slowly.', question='Which volcano erupted first?')
+        self.add('Rivers', 'Water carves canyons.')
+
+        results = self.hits('volcano')
+        self.assertEqual(results[0]['id'], volcano.id)      # title matches weigh most
+        self.assertEqual({r['id'] for r in results}, {volcano.id, mention.id, question.id})
+        self.assertNotIn('parsed_text', results[0])
+        self.assertIn('<mark>', self.hits('islands')[0]['snippet'])
+
+    def test_terms_are_prefixes_and_all_must_match(self):
+        document = self.add('Photosynthesis', 'Plants convert sunlight into chemical energy.')
+        self.add('Sunlight', 'Light travels fast.')
+        self.assertEqual([r['id'] for r in self.hits('photo sunl')], [document.id])
+        self.assertEqual(self.hits(''), [])
+
+    def test_snippets_are_escaped(self):
+        self.add('Markup', 'The tag <script>alert(1)</script> is shown as text here.')
+        snippet = self.hits('shown')[0]['snippet']
+        self.assertIn('&lt;script&gt;', snippet)
+        self.assertIn('<mark>shown</mark>', snippet)
+
+    def test_index_follows_reimports_edits_and_deletes(self):
+        document = self.add('Weather', 'Clouds gather before storms.')
+        import_parsed_doc(document, worksheet('Weather', 'Fog settles in valleys.'))
+        self.assertEqual(self.hits('clouds'), [])
+        self.assertEqual([r['id'] for r in self.hits('fog')], [document.id])
+
+        teacher = User.objects.create_user(username='search_teacher', password='pw12345!')
+        Profile.objects.create(user=teacher, role=Profile.ROLE_TEACHER)
+        self.client.force_login(teacher)
+        question = document.questions.get()
+        self.client.patch(f'/api/questions/{question.id}/', {'question_text': 'Why do hurricanes spin?'},
+                          content_type='application/json')
+        self.assertEqual([r['id'] for r in self.hits('hurricanes')], [document.id])
+
+        self.client.delete(f'/api/documents/{document.id}/')
+        self.assertEqual(self.hits('fog'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {search.FTS_TABLE} WHERE rowid = %s', [document.id])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_list_filters_apply(self):
+        sat = self.add('Tides', 'The moon pulls the ocean.', program='sat')
+        self.add('Tides again', 'The moon pulls the ocean twice a day.', program='shsat')
+        self.assertEqual([r['id'] for r in self.hits('moon', program='sat')], [sat.id])
+        listed = self.client.get('/api/documents/', {'search': 'ocean', 'program': 'sat'}).json()['results']
+        self.assertEqual([r['id'] for r in listed], [sat.id])
+
+    def test_rebuild_restores_a_bulk_loaded_bank(self):
+        UploadedDocument.objects.bulk_create([
+            UploadedDocument(title='Bulk', file='documents/x.docx', parsed_text='Glaciers carve fjords.'),
+        ])
+        self.assertEqual(self.hits('glaciers'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.hits('glaciers')), 1)
+        self.assertEqual(len(search.ranked(UploadedDocument.objects.all(), 'fjord')), 1)
@@ -0,0 +1,191 @@
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+from django.test import TestCase, override_settings
+
+from passages import grading, submission_queue
+from passages.importer import import_parsed_doc
+from passages.models import QuizAnswer, QuizResponse, UploadedDocument, UserAnswer
+from passages.test_importer import parsed_doc
+
+
+class SubmissionQueueTests(TestCase):
+    def setUp(self):
+        grading.answer_key_cache.clear()
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        settings_override = override_settings(
+            SUBMISSION_QUEUE={**settings.SUBMISSION_QUEUE, 'DIR': spool.name, 'BURST_MODE': True},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.document = UploadedDocument.objects.create(title='Quiz', file='documents/x.docx')
+        import_parsed_doc(self.document, parsed_doc(3))
+        self.student = User.objects.create_user(username='burst_student', password='pw12345!')
+
+    def answers_for(self, letters='BBA', document=None):
+        return [
+            {'question_id': q.id, 'selected_answer_id': q.answers.get(choice_letter=letter).id}
+            for q, letter in zip((document or self.document).questions.order_by('id'), letters)
+        ]
+
+    def submit(self, letters='BBA', key=None, document=None, answers=None):
+        document = document or self.document
+        answers = answers or self.answers_for(letters, document)
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post('/api/submit-quiz/', {
+            'document_id': document.id, 'answers': answers, 'time_spent': 30,
+        }, content_type='application/json', **headers)
+
+    def test_burst_mode_scores_now_and_writes_nothing_until_flushed(self):
+        self.client.force_login(self.student)
+        grading.answer_key(self.document.id)
+        answers = self.answers_for()
+        with self.assertNumQueries(3):      # session, user and the answer-key stamp check; no writes
+            r = self.submit(answers=answers)
+        self.assertEqual(r.status_code, 202, r.content)
+        self.assertEqual(r.json()['score'], 2)
+        self.assertTrue(r.json()['queued'])
+        self.assertIsNone(r.json()['response_id'])
+        self.assertFalse(QuizResponse.objects.exists())
+        self.assertEqual(submission_queue.pending_count(), 1)
+
+        call_command('flush_submissions', '--once', stdout=mock.MagicMock())
+        response = QuizResponse.objects.get()
+        self.assertEqual((response.user, response.score, response.total_questions), (self.student, 2, 3))
+        self.assertEqual(response.user_answers.count(), 3)
+        self.assertEqual(submission_queue.pending_count(), 0)
+
+    def test_flush_writes_a_batch_with_constant_queries(self):
+        for _ in range(5):
+            self.submit()
+        self.assertEqual(submission_queue.pending_count(), 5)
+        with self.assertNumQueries(8):      # savepoint pair, 3 lookups, 2 inserts and the id re-read
+            self.assertEqual(submission_queue.flush_pending(batch_size=100), 5)
+        self.assertEqual(QuizResponse.objects.count(), 5)
+        self.assertEqual(UserAnswer.objects.count(), 15)
+
+    def test_retried_submission_is_recorded_once(self):
+        first = self.submit(key='attempt-1')
+        retry = self.submit('CCC', key='attempt-1')
+        self.assertEqual(retry.json()['score'], first.json()['score'])
+        self.assertEqual(submission_queue.pending_count(), 1)
+
+        submission_queue.flush_pending()
+        after_flush = self.submit(key='attempt-1')
+        self.assertEqual(after_flush.status_code, 200)
+        self.assertEqual(after_flush.json()['response_id'], QuizResponse.objects.get().id)
+        self.assertEqual(submission_queue.pending_count(), 0)
+
+    def test_reflushing_entries_already_written_does_not_duplicate(self):
+        self.submit(key='attempt-2')
+        entries = list(submission_queue._pending_dir().glob('*.json'))
+        contents = {path: path.read_bytes() for path in entries}
+        submission_queue.flush_pending()
+        for path, data in contents.items():     # a flusher that died after commit, before unlinking
+            path.write_bytes(data)
+        self.assertEqual(submission_queue.flush_pending(), 1)
+        self.assertEqual(QuizResponse.objects.count(), 1)
+        self.assertEqual(UserAnswer.objects.count(), 3)
+
+    def test_entries_for_deleted_documents_are_dropped(self):
+        other = UploadedDocument.objects.create(title='Gone', file='documents/x.docx')
+        import_parsed_doc(other, parsed_doc(3))
+        self.submit(document=other)
+        self.submit()
+        other.delete()
+        with self.assertLogs('passages.submission_queue', 'WARNING'):
+            self.assertEqual(submission_queue.flush_pending(), 2)
+        self.assertEqual(QuizResponse.objects.get().document, self.document)
+
+    def test_entries_for_deleted_users_are_dropped(self):
+        self.client.force_login(self.student)
+        self.submit()
+        self.client.logout()
+        self.submit()
+        self.student.delete()
+        with self.assertLogs('passages.submission_queue', 'WARNING') as logs:
+            self.assertEqual(submission_queue.flush_pending(), 2)
+        self.assertIn('deleted users', logs.output[0])
+        self.assertIsNone(QuizResponse.objects.get().user)
+        self.assertEqual(submission_queue.pending_count(), 0)
+
+    def test_an_entry_that_cannot_be_written_is_moved_aside(self):
+        self.submit(key='good')
+        self.submit(key='poison')
+        persist = submission_queue._persist
+
+        def fail_on_poison(entries):
+            if any(e['idempotency_key'] == 'poison' for e in entries):
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return persist(entries)
+
+        with mock.patch('passages.submission_queue._persist', side_effect=fail_on_poison):
+            with self.assertLogs('passages.submission_queue', 'ERROR'):
+                self.assertEqual(submission_queue.flush_pending(), 2)
+        self.assertEqual(QuizResponse.objects.get().idempotency_key, 'good')
+        self.assertEqual(submission_queue.pending_count(), 0)
+        self.assertEqual(len(list((submission_queue._root() / 'failed').glob('*.json'))), 1)
+
+    def test_an_entry_whose_chosen_answer_was_deleted_is_moved_aside(self):
+        other = UploadedDocument.objects.create(title='Edited', file='documents/y.docx')
+        import_parsed_doc(other, parsed_doc(3))
+        self.submit(document=other, key='edited')
+        self.submit(key='intact')
+        QuizAnswer.objects.filter(question__document=other, choice_letter='B').delete()
+
+        with self.assertLogs('passages.submission_queue', 'ERROR'):
+            self.assertEqual(submission_queue.flush_pending(), 2)
+        self.assertEqual(QuizResponse.objects.get().idempotency_key, 'intact')
+        self.assertEqual(UserAnswer.objects.count(), 3)
+        self.assertEqual(len(list((submission_queue._root() / 'failed').glob('*.json'))), 1)
+
+    def test_flusher_survives_database_errors(self):
+        class Stop(Exception):
+            pass
+
+        flush = mock.Mock(side_effect=[OperationalError('database is locked'), 0])
+        with mock.patch('passages.submission_queue.flush_pending', flush), \
+                mock.patch('passages.submission_queue.connections') as connections, \
+                mock.patch('passages.submission_queue.time.sleep', side_effect=[None, Stop]) as sleep:
+            with self.assertLogs('passages.submission_queue', 'ERROR'), self.assertRaises(Stop):
+                submission_queue.flusher_loop(poll_interval=1.0)
+        self.assertEqual(flush.call_count, 2)
+        connections.close_all.assert_called_once_with()
+        self.assertEqual(sleep.call_args_list, [
+            mock.call(settings.SUBMISSION_QUEUE['RETRY_SECONDS']), mock.call(1.0),
+        ])
+
+        with mock.patch('passages.submission_queue.flush_pending', side_effect=OperationalError('gone')):
+            with self.assertRaises(OperationalError):
+                submission_queue.flusher_loop(once=True)
+
+    def test_the_same_key_from_two_users_records_both(self):
+        other = User.objects.create_user(username='burst_classmate', password='pw12345!')
+        for burst in (True, False):
+            with override_settings(SUBMISSION_QUEUE={**settings.SUBMISSION_QUEUE, 'BURST_MODE': burst}):
+                self.client.force_login(self.student)
+                mine = self.submit('BBB', key=f'shared-{burst}')
+                self.client.force_login(other)
+                theirs = self.submit('CCC', key=f'shared-{burst}')
+            self.assertEqual((mine.json()['score'], theirs.json()['score']), (3, 0))
+        submission_queue.flush_pending()
+        self.assertEqual(
+            sorted(QuizResponse.objects.values_list('idempotency_key', 'user__username', 'score')),
+            [('shared-False', 'burst_classmate', 0), ('shared-False', 'burst_student', 3),
+             ('shared-True', 'burst_classmate', 0), ('shared-True', 'burst_student', 3)],
+        )
+
+    def test_direct_mode_honours_idempotency_keys(self):
+        with override_settings(SUBMISSION_QUEUE={**settings.SUBMISSION_QUEUE, 'BURST_MODE': False}):
+            first = self.submit(key='attempt-3')
+            retry = self.submit('CCC', key='attempt-3')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.json()['response_id'], first.json()['response_id'])
+        self.assertEqual(QuizResponse.objects.count(), 1)
+        self.assertEqual(self.submit(key='x' * 65).status_code, 400)
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from botocore.stub import ANY, Stubber
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from storages.backends.s3 import S3Storage
+
+from passages.ingestion import process_pending_jobs
+from passages.models import IngestionJob, Profile, UploadedDocument, UploadSession
+from passages.test_ingestion import PYE_LINES, build_docx_upload
+from passages.uploads import S3MultipartStaging, complete_session, purge_orphaned_copies, staging_dir
+
+CHUNK = 16 * 1024
+IN_PROCESS = {**settings.PARSE_SANDBOX, 'ENABLED': False}
+
+
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        staging = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(staging.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=media.name,
+            UPLOAD_STAGING={**settings.UPLOAD_STAGING, 'BACKEND': 'local', 'DIR': staging.name, 'CHUNK_SIZE': CHUNK},
+            PARSE_SANDBOX=IN_PROCESS,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(username='chunk_teacher', password='pw12345!')
+        Profile.objects.create(user=self.teacher, role=Profile.ROLE_TEACHER)
+        self.client.force_login(self.teacher)
+        self.data = build_docx_upload(PYE_LINES).read()
+        self.parts = [self.data[i:i + CHUNK] for i in range(0, len(self.data), CHUNK)]
+
+    def _start(self, **extra):
+        r = self.client.post('/api/uploads/', {
+            'file_name': 'passage.docx', 'size': len(self.data), 'title': 'Chunked Title', **extra,
+        })
+        self.assertEqual(r.status_code, 201, r.content)
+        return r.json()
+
+    def _put(self, session_id, number, body):
+        return self.client.put(
+            f'/api/uploads/{session_id}/parts/{number}/', body, content_type='application/octet-stream',
+        )
+
+    def test_parts_in_any_order_then_complete_and_parse_local_copy(self):
+        session = self._start(sha256=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(session['part_count'], len(self.parts))
+        self.assertGreater(len(self.parts), 1)
+
+        for number in reversed(range(1, len(self.parts) + 1)):
+            self.assertEqual(self._put(session['id'], number, self.parts[number - 1]).status_code, 200)
+        self.assertEqual(self._put(session['id'], 1, self.parts[0]).status_code, 200)     # a retried part
+        resumed = self.client.get(f"/api/uploads/{session['id']}/").json()
+        self.assertEqual(resumed['received_parts'], list(range(1, len(self.parts) + 1)))
+
+        r = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual(r.status_code, 202, r.content)
+        self.assertEqual(r.json()['title'], 'Chunked Title')
+        job = IngestionJob.objects.get(id=r.json()['ingestion_job']['id'])
+        with default_storage.open(job.document.file.name, 'rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertTrue(os.path.exists(job.staged_path))
+
+        # The worker parses the staged copy, never the stored file.
+        with mock.patch('django.db.models.fields.files.FieldFile.open', side_effect=AssertionError):
+            process_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestionJob.STATUS_VALIDATED, job.error)
+        self.assertEqual(job.document.questions.count(), 1)
+        self.assertFalse(os.path.exists(job.staged_path))
+
+    def _upload_all(self):
+        session = self._start()
+        for number, part in enumerate(self.parts, start=1):
+            self._put(session['id'], number, part)
+        return session
+
+    def test_a_second_complete_gets_the_same_document(self):
+        session = self._upload_all()
+        loser = UploadSession.objects.get(id=session['id'])     # read while the session was still open
+        r = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual(r.status_code, 202, r.content)
+
+        document, job = complete_session(loser)
+        self.assertEqual((document.id, job.id), (r.json()['id'], r.json()['ingestion_job']['id']))
+        again = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual(again.status_code, 202, again.content)
+        self.assertEqual(again.json()['id'], document.id)
+        self.assertEqual(UploadedDocument.objects.count(), 1)
+        self.assertEqual(IngestionJob.objects.count(), 1)
+
+    def test_copies_no_job_will_read_are_purged(self):
+        open_session = self._start()
+        self._put(open_session['id'], 1, self.parts[0])
+        session = self._upload_all()
+        completed = self.client.post(f"/api/uploads/{session['id']}/complete/").json()
+        job = IngestionJob.objects.get(id=completed['ingestion_job']['id'])
+        validated = Path(settings.UPLOAD_STAGING['DIR']) / 'validated'
+        validated.mkdir()
+
+        self.assertEqual(purge_orphaned_copies(), 0)      # the queued job still needs its copy
+        # The job ran on another host, from the stored file, and left this copy behind.
+        IngestionJob.objects.filter(id=job.id).update(status=IngestionJob.STATUS_VALIDATED)
+        self.assertEqual(purge_orphaned_copies(), 1)
+        self.assertFalse(os.path.exists(job.staged_path))
+        self.assertTrue(staging_dir(UploadSession.objects.get(id=open_session['id'])).is_dir())
+        self.assertTrue(validated.is_dir())
+
+    def test_wrong_part_size_is_rejected(self):
+        session = self._start()
+        r = self._put(session['id'], 1, self.parts[0][:-1])
+        self.assertEqual(r.status_code, 400)
+        self.assertIn(f'should be {CHUNK} bytes', r.json()['detail'])
+        self.assertEqual(self.client.get(f"/api/uploads/{session['id']}/").json()['received_parts'], [])
+
+    def test_complete_reports_missing_parts(self):
+        session = self._start()
+        self._put(session['id'], 1, self.parts[0])
+        r = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('Missing parts: 2', r.json()['detail'])
+
+    def test_checksum_mismatch_is_rejected(self):
+        session = self._start(sha256='0' * 64)
+        for number, part in enumerate(self.parts, start=1):
+            self._put(session['id'], number, part)
+        r = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('SHA-256', r.json()['detail'])
+        self.assertFalse(IngestionJob.objects.exists())
+
+    def test_abort_discards_staged_parts(self):
+        session = self._start()
+        self._put(session['id'], 1, self.parts[0])
+        self.assertEqual(self.client.delete(f"/api/uploads/{session['id']}/").status_code, 204)
+        self.assertFalse(staging_dir(UploadSession.objects.get(id=session['id'])).exists())
+        self.assertEqual(self._put(session['id'], 2, self.parts[1]).status_code, 400)
+
+    def test_rejects_unsupported_type_and_other_teachers(self):
+        r = self.client.post('/api/uploads/', {'file_name': 'notes.txt', 'size': 10, 'title': 'x'})
+        self.assertEqual(r.status_code, 400)
+
+        session = self._start()
+        other = User.objects.create_user(username='other_teacher', password='pw12345!')
+        Profile.objects.create(user=other, role=Profile.ROLE_TEACHER)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f"/api/uploads/{session['id']}/").status_code, 404)
+
+
+class S3MultipartStagingTest(TestCase):
+    def setUp(self):
+        self.storage = S3Storage(
+            bucket_name='docs', access_key='test', secret_key='test', region_name='us-east-1', file_overwrite=True,
+        )
+        self.staging = S3MultipartStaging(self.storage)
+        self.stubber = Stubber(self.storage.connection.meta.client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+        self.session = UploadSession(storage_name='documents/passage.pdf', size=10, chunk_size=10)
+
+    def test_parts_go_straight_to_the_multipart_upload(self):
+        target = {'Bucket': 'docs', 'Key': 'documents/passage.pdf'}
+        self.stubber.add_response(
+            'create_multipart_upload', {'UploadId': 'u1'}, {**target, 'ContentType': 'application/pdf'},
+        )
+        self.stubber.add_response(
+            'upload_part', {'ETag': '"e1"'}, {**target, 'UploadId': 'u1', 'PartNumber': 1, 'Body': ANY},
+        )
+        self.stubber.add_response(
+            'list_parts', {'Parts': [{'PartNumber': 1, 'ETag': '"e1"'}]}, {**target, 'UploadId': 'u1'},
+        )
+        self.stubber.add_response('complete_multipart_upload', {}, {
+            **target, 'UploadId': 'u1', 'MultipartUpload': {'Parts': [{'ETag': '"e1"', 'PartNumber': 1}]},
+        })
+
+        with tempfile.NamedTemporaryFile() as part:
+            part.write(b'0123456789')
+            part.flush()
+            self.staging.start(self.session)
+            self.staging.put_part(self.session, 1, Path(part.name))
+            stored = self.staging.finish(self.session, None)
+
+        self.assertEqual(self.session.s3_upload_id, 'u1')
+        self.assertEqual(stored, 'documents/passage.pdf')
+        self.stubber.assert_no_pending_responses()
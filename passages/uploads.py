@@ -0,0 +1,341 @@
+"""
+Resumable chunked uploads (`/api/uploads/`).
+
+A client opens an UploadSession with the file's name and size, PUTs the parts
+(in any order, retrying as often as needed; GET the session to see which
+parts arrived), then POSTs `complete`. Every part is staged on local disk
+under settings.UPLOAD_STAGING["DIR"]. With the "s3" backend each part is also
+passed straight on as a part of an S3 multipart upload, so completing the
+session stores the file without sending it to S3 a second time.
+
+Completing creates the UploadedDocument and queues its IngestionJob with the
+assembled local copy attached: the worker parses those bytes instead of
+downloading the stored file again, then deletes the copy. Completing is
+serialized on the session row, so of two concurrent `complete` calls one
+creates the document and the other gets that same document back.
+
+The `purge_uploads` command runs `purge_expired_sessions`, which aborts
+abandoned sessions, and `purge_orphaned_copies`, which deletes local copies no
+queued job will read (the job failed for good, its document was deleted, or it
+ran on another host and read the stored file). Run it on every web host.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .ingestion import enqueue_document
+from .models import IngestionJob, UploadedDocument, UploadSession
+from .serializers import UploadedDocumentSerializer
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = ('.docx', '.pdf')
+S3_MIN_PART_SIZE = 5 * 1024 * 1024      # every part but the last, per the S3 API
+_COPY_SIZE = 1024 * 1024
+_PART_RE = re.compile(r"^part-(\d{5})$")
+
+
+class UploadError(Exception):
+    """A request that does not fit the session (bad part, missing parts, closed session)."""
+
+
+def _config() -> dict:
+    return settings.UPLOAD_STAGING
+
+
+def staging_dir(session: UploadSession) -> Path:
+    return Path(_config()["DIR"]) / str(session.id)
+
+
+def _part_path(session: UploadSession, number: int) -> Path:
+    return staging_dir(session) / f"part-{number:05d}"
+
+
+class LocalStaging:
+    """Parts stay on local disk; the assembled file is saved to default_storage on completion."""
+
+    def start(self, session: UploadSession) -> None:
+        pass
+
+    def put_part(self, session: UploadSession, number: int, path: Path) -> None:
+        pass
+
+    def finish(self, session: UploadSession, assembled: Path) -> str:
+        with assembled.open('rb') as fh:
+            return default_storage.save(session.storage_name, File(fh))
+
+    def abort(self, session: UploadSession) -> None:
+        pass
+
+
+class S3MultipartStaging:
+    """Each part is sent on to an S3 multipart upload; completion just stitches them together."""
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    @property
+    def client(self):
+        return self.storage.connection.meta.client
+
+    def _target(self, session: UploadSession) -> dict:
+        # Same key normalization as S3Storage.save, so the FileField name resolves to this object.
+        return {
+            'Bucket': self.storage.bucket_name,
+            'Key': self.storage._normalize_name(session.storage_name),
+        }
+
+    def start(self, session: UploadSession) -> None:
+        params = self.storage._get_write_parameters(session.storage_name)
+        response = self.client.create_multipart_upload(**self._target(session), **params)
+        session.s3_upload_id = response['UploadId']
+
+    def put_part(self, session: UploadSession, number: int, path: Path) -> None:
+        with path.open('rb') as fh:
+            self.client.upload_part(
+                **self._target(session), UploadId=session.s3_upload_id, PartNumber=number, Body=fh,
+            )
+
+    def finish(self, session: UploadSession, assembled: Path) -> str:
+        parts = []
+        paginator = self.client.get_paginator('list_parts')
+        for page in paginator.paginate(**self._target(session), UploadId=session.s3_upload_id):
+            parts += [{'ETag': p['ETag'], 'PartNumber': p['PartNumber']} for p in page.get('Parts', [])]
+        self.client.complete_multipart_upload(
+            **self._target(session), UploadId=session.s3_upload_id, MultipartUpload={'Parts': parts},
+        )
+        return session.storage_name
+
+    def abort(self, session: UploadSession) -> None:
+        if session.s3_upload_id:
+            self.client.abort_multipart_upload(**self._target(session), UploadId=session.s3_upload_id)
+
+
+def get_staging(backend: str):
+    if backend == UploadSession.BACKEND_S3:
+        return S3MultipartStaging()
+    return LocalStaging()
+
+
+def chunk_size_for(backend: str) -> int:
+    size = _config()["CHUNK_SIZE"]
+    return max(size, S3_MIN_PART_SIZE) if backend == UploadSession.BACKEND_S3 else size
+
+
+def _validate_metadata(metadata: dict) -> UploadedDocumentSerializer:
+    serializer = UploadedDocumentSerializer(data=metadata, partial=True)
+    serializer.is_valid(raise_exception=True)
+    return serializer
+
+
+def start_session(user, *, file_name: str, size: int, sha256: str = '', metadata: dict | None = None) -> UploadSession:
+    """Open an upload of `size` bytes. `metadata` holds the UploadedDocument fields (title is required)."""
+    file_name = os.path.basename(file_name)
+    if not file_name.lower().endswith(ALLOWED_EXTENSIONS):
+        raise UploadError("Invalid file format. Only .docx and .pdf files are permitted.")
+    max_size = _config()["MAX_SIZE_MB"] * 1024 * 1024
+    if not 0 < size <= max_size:
+        raise UploadError(f"Uploads must be between 1 byte and {_config()['MAX_SIZE_MB']} MB.")
+    metadata = dict(metadata or {})
+    if not metadata.get('title'):
+        raise UploadError("A title is required.")
+    _validate_metadata(metadata)
+
+    backend = _config()["BACKEND"]
+    storage_name = UploadedDocument._meta.get_field('file').generate_filename(None, file_name)
+    if backend == UploadSession.BACKEND_S3:
+        # The multipart upload writes straight to its final key, so reserve it now.
+        storage_name = default_storage.get_available_name(storage_name)
+    session = UploadSession(
+        uploader=user,
+        file_name=file_name,
+        size=size,
+        chunk_size=chunk_size_for(backend),
+        sha256=sha256.lower(),
+        metadata=metadata,
+        backend=backend,
+        storage_name=storage_name,
+    )
+    get_staging(backend).start(session)
+    session.save()
+    staging_dir(session).mkdir(parents=True, exist_ok=True)
+    return session
+
+
+def expected_part_size(session: UploadSession, number: int) -> int:
+    if number < session.part_count:
+        return session.chunk_size
+    return session.size - session.chunk_size * (session.part_count - 1)
+
+
+def received_parts(session: UploadSession) -> list[int]:
+    """Part numbers fully received so far, ascending."""
+    directory = staging_dir(session)
+    if session.status != UploadSession.STATUS_OPEN or not directory.is_dir():
+        return []
+    return sorted(int(m.group(1)) for m in map(_PART_RE.match, os.listdir(directory)) if m)
+
+
+def _check_open(session: UploadSession) -> None:
+    if session.status != UploadSession.STATUS_OPEN:
+        raise UploadError(f"This upload is already {session.status}.")
+
+
+def write_part(session: UploadSession, number: int, stream) -> int:
+    """
+    Stage part `number` from `stream`. Re-sending a part replaces it, so a
+    client can retry any part whose response it never saw. Returns its size.
+    """
+    _check_open(session)
+    if not 1 <= number <= session.part_count:
+        raise UploadError(f"Part numbers run from 1 to {session.part_count}.")
+    expected = expected_part_size(session, number)
+
+    directory = staging_dir(session)
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=f"part-{number:05d}.", suffix=".tmp")
+    tmp = Path(tmp_name)
+    try:
+        written = 0
+        with os.fdopen(fd, 'wb') as out:
+            # Read one byte past the expected size to catch oversized parts without buffering them.
+            while written <= expected:
+                chunk = stream.read(min(_COPY_SIZE, expected + 1 - written))
+                if not chunk:
+                    break
+                out.write(chunk)
+                written += len(chunk)
+        if written != expected:
+            raise UploadError(f"Part {number} should be {expected} bytes; received {written}.")
+        get_staging(session.backend).put_part(session, number, tmp)
+        os.replace(tmp, _part_path(session, number))    # a part is either complete or absent
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+    return written
+
+
+def _assemble(session: UploadSession) -> Path:
+    assembled = staging_dir(session) / session.file_name
+    digest = hashlib.sha256()
+    with assembled.open('wb') as out:
+        for number in range(1, session.part_count + 1):
+            with _part_path(session, number).open('rb') as part:
+                for chunk in iter(lambda: part.read(_COPY_SIZE), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+    if session.sha256 and digest.hexdigest() != session.sha256:
+        assembled.unlink()
+        raise UploadError("The uploaded file does not match its SHA-256 checksum; abort and upload it again.")
+    return assembled
+
+
+def complete_session(session: UploadSession) -> tuple[UploadedDocument, IngestionJob]:
+    """
+    Store the assembled file, create its document and queue the parse of the
+    local copy. Completing an already completed session returns its document
+    and latest job.
+    """
+    with transaction.atomic():
+        # The conditional UPDATE locks the row until commit: a concurrent call waits here, then matches nothing.
+        claimed = UploadSession.objects.filter(pk=session.pk, status=UploadSession.STATUS_OPEN).update(
+            updated_at=timezone.now(),
+        )
+        if not claimed:
+            session.refresh_from_db()
+            if session.status == UploadSession.STATUS_COMPLETED and session.document is not None:
+                return session.document, session.document.ingestion_jobs.latest('id')
+            _check_open(session)
+
+        missing = sorted(set(range(1, session.part_count + 1)) - set(received_parts(session)))
+        if missing:
+            shown = ", ".join(map(str, missing[:20])) + (", ..." if len(missing) > 20 else "")
+            raise UploadError(f"Missing parts: {shown}.")
+        serializer = _validate_metadata(session.metadata)    # before storing, so a stale topic id leaves no orphan
+
+        assembled = _assemble(session)
+        stored_name = get_staging(session.backend).finish(session, assembled)
+        document = serializer.save(uploader=session.uploader, file=stored_name)
+        job = enqueue_document(document, staged_path=str(assembled))
+        session.status = UploadSession.STATUS_COMPLETED
+        session.document = document
+        session.save(update_fields=['status', 'document', 'updated_at'])
+
+    for number in range(1, session.part_count + 1):
+        _part_path(session, number).unlink(missing_ok=True)
+    return document, job
+
+
+def abort_session(session: UploadSession) -> None:
+    _check_open(session)
+    get_staging(session.backend).abort(session)
+    shutil.rmtree(staging_dir(session), ignore_errors=True)
+    session.status = UploadSession.STATUS_ABORTED
+    session.save(update_fields=['status', 'updated_at'])
+
+
+def purge_expired_sessions(max_age: timedelta | None = None) -> int:
+    """Abort open sessions with no activity for `max_age` (default EXPIRY_HOURS). Returns how many."""
+    max_age = max_age or timedelta(hours=_config()["EXPIRY_HOURS"])
+    expired = UploadSession.objects.filter(
+        status=UploadSession.STATUS_OPEN, updated_at__lt=timezone.now() - max_age,
+    )
+    purged = 0
+    for session in expired.iterator():
+        try:
+            abort_session(session)
+            purged += 1
+        except Exception:
+            logger.exception("Could not abort upload session %s", session.id)
+    return purged
+
+
+def purge_orphaned_copies() -> int:
+    """
+    Delete this host's staging folders of sessions that are no longer open,
+    unless a queued or running job will still read the copy in them. Returns
+    how many folders were removed.
+    """
+    root = Path(_config()["DIR"])
+    if not root.is_dir():
+        return 0
+    folders = {}
+    for entry in root.iterdir():
+        try:
+            folders[uuid.UUID(entry.name)] = entry
+        except ValueError:
+            continue        # not a session folder (dry_run keeps validated/ here)
+    if not folders:
+        return 0
+
+    still_open = set(
+        UploadSession.objects.filter(id__in=folders, status=UploadSession.STATUS_OPEN).values_list('id', flat=True)
+    )
+    pending = {
+        Path(path).parent
+        for path in IngestionJob.objects.filter(
+            status__in=[IngestionJob.STATUS_QUEUED, IngestionJob.STATUS_PARSING],
+        ).exclude(staged_path='').values_list('staged_path', flat=True)
+    }
+    purged = 0
+    for session_id, folder in folders.items():
+        if session_id in still_open or folder in pending:
+            continue
+        shutil.rmtree(folder, ignore_errors=True)
+        purged += 1
+    return purged
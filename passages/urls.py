@@ -7,8 +7,9 @@ from rest_framework import routers
 from .views import (
     SubmitQuizView, UserRegistrationView, UserLoginView, UserLogoutView, UserProfileView,
     UploadedDocumentViewSet, QuizQuestionViewSet, QuizAnswerViewSet,
-    QuizResponseViewSet, GradeLevelViewSet, SkillCategoryViewSet, TopicViewSet, DocumentDetailView,
-    ClassroomViewSet, StudentDashboardView, MyAssignmentsView
+    QuizResponseViewSet, GradeLevelViewSet, SkillCategoryViewSet, TopicViewSet, DocumentDetailView, DocumentQuizView,
+    ClassroomViewSet, StudentDashboardView, MyAssignmentsView, IngestionJobViewSet, UploadSessionViewSet,
+    AnswerKeyCacheStatsView,
 )
 
 # CSRF ping for frontend
@@ -26,6 +27,8 @@ router.register(r'grade-levels', GradeLevelViewSet, basename='grade-levels')
 router.register(r'skill-categories', SkillCategoryViewSet, basename='skill-categories')
 router.register(r'topics', TopicViewSet, basename='topics')
 router.register(r'classrooms', ClassroomViewSet, basename='classrooms')
+router.register(r'ingestion-jobs', IngestionJobViewSet, basename='ingestion-jobs')
+router.register(r'uploads', UploadSessionViewSet, basename='uploads')
 
 # URL patterns
 urlpatterns = [
@@ -37,7 +40,9 @@ urlpatterns = [
     # API endpoints
     path('api/', include(router.urls)),  # /api/documents/, /api/questions/, etc.
     path('api/documents/<int:pk>/detail/', DocumentDetailView.as_view(), name='document_detail'),
+    path('api/documents/<int:pk>/quiz/', DocumentQuizView.as_view(), name='document_quiz'),
     path('api/submit-quiz/', SubmitQuizView.as_view(), name='submit_quiz'),
+    path('api/grading/cache-stats/', AnswerKeyCacheStatsView.as_view(), name='answer_key_cache_stats'),
     path('api/auth/register/', UserRegistrationView.as_view(), name='user_register'),
     path('api/auth/login/',    UserLoginView.as_view(),       name='user_login'),
     path('api/auth/logout/',   UserLogoutView.as_view(),      name='user_logout'),
@@ -5,13 +5,15 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 from django.middleware.csrf import get_token
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 from passages.models import (
     UploadedDocument, QuizQuestion, QuizAnswer,
-    QuizResponse, UserAnswer, GradeLevel, SkillCategory, Classroom, Profile, Assignment, Topic
+    QuizResponse, GradeLevel, SkillCategory, Classroom, Profile, Assignment, Topic,
+    IngestionJob, UploadSession,
 )
 from django import forms
-from docx import Document
 from .forms import UploadedDocumentForm
 from rest_framework import viewsets, status
 from rest_framework.response import Response
@@ -22,21 +24,31 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
 from .serializers import (
     UploadedDocumentSerializer, QuizQuestionSerializer, QuizAnswerSerializer,
-    QuizResponseSerializer, DocumentDetailSerializer, GradeLevelSerializer,
+    QuizResponseSerializer, GradeLevelSerializer,
     SkillCategorySerializer, TopicSerializer, UserRegistrationSerializer, UserSerializer,StudentDashboardSerializer,
-    ClassroomSerializer, AssignmentSerializer
+    ClassroomSerializer, AssignmentSerializer, IngestionJobSerializer, UploadSessionSerializer,
+    DocumentListSerializer,
 )
 from django.http import JsonResponse
+import functools
 import json
 from .authentication import CsrfExemptSessionAuthentication
 from .permissions import IsTeacher
+import io
 import os
-from .docx_parser import parse_uploaded_docx
-from passages.gemini_utils import generate_questions, parse_questions, save_parsed_questions
+from .formats import extract_source
+from passages.gemini_utils import generate_questions, save_parsed_questions
+from passages.generation import generate_passage_questions
 from passages import serializers
 from django.db import transaction
-from .importer import import_document
-from .pye_parser import PYEParseError
+from .ingestion import enqueue_document
+from .pagination import UploadedAtCursorPagination
+from . import dry_run, facets, grading, payload_cache, search, submission_queue, uploads
+from .pye_parser import PYEParseError, format_validation_errors
+
+# UploadedDocument fields a client may send along with a chunked or validated upload.
+DOCUMENT_METADATA_FIELDS = ('title', 'grade_level', 'skill_category', 'topic', 'program', 'difficulty')
+
 
 def upload_document(request):
     parsed_content = None
@@ -46,16 +58,13 @@ def upload_document(request):
         if form.is_valid():
             uploaded_doc = form.save()
 
-            doc = Document(uploaded_doc.file)
-            parsed_content = "\n".join([p.text for p in doc.paragraphs])
+            parsed_content = "\n".join(extract_source(uploaded_doc.file, uploaded_doc.file.name).paragraphs)
             uploaded_doc.parsed_text = parsed_content
 
             try:
                 print("Generating quiz questions with Gemini...")
-                questions_text = generate_questions(parsed_content[:3000])
-                print("Raw Gemini output:\n", questions_text)
-
-                parsed_questions = parse_questions(questions_text)
+                # Chunks of the whole passage are generated in parallel and merged.
+                parsed_questions = generate_passage_questions(parsed_content)
                 print("Parsed questions list:\n", parsed_questions)
 
                 save_parsed_questions(uploaded_doc, parsed_questions)
@@ -89,33 +98,21 @@ def uploaded_documents_list(request):
 
 class UploadedDocumentViewSet(viewsets.ModelViewSet):
     authentication_classes = [CsrfExemptSessionAuthentication]
-    queryset = UploadedDocument.objects.all().order_by('-uploaded_at')
+    queryset = UploadedDocument.objects.select_related('topic').order_by('-uploaded_at', '-id')
     serializer_class = UploadedDocumentSerializer
+    pagination_class = UploadedAtCursorPagination
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'full_text_search'):
+            return DocumentListSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         """Filter by ?grade_level=&program=&difficulty=&topic=&skill_category=&search="""
         queryset = super().get_queryset()
-        params = self.request.query_params
-
-        for field in ('grade_level', 'skill_category', 'topic'):
-            value = params.get(field)
-            if value:
-                queryset = queryset.filter(**{f'{field}_id': value})
-
-        for field in ('program', 'difficulty'):
-            value = params.get(field)
-            if value:
-                queryset = queryset.filter(**{field: value})
-
-        topic_name = params.get('topic_name')
-        if topic_name:
-            queryset = queryset.filter(topic__name__iexact=topic_name)
-
-        search = params.get('search')
-        if search:
-            queryset = queryset.filter(title__icontains=search)
-
-        return queryset
+        if self.action in ('list', 'full_text_search'):
+            queryset = queryset.only(*DocumentListSerializer.load_only)
+        return facets.filter_catalog(queryset, self.request.query_params)
     
     def create(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -131,7 +128,23 @@ class UploadedDocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        return super().create(request, *args, **kwargs)
+        response = super().create(request, *args, **kwargs)
+        # Parsing happens in the ingestion workers; report the queued job to poll.
+        response.data['ingestion_job'] = IngestionJobSerializer(self.ingestion_job).data
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        payload_cache.bump_content_version(serializer.instance.id)
+        search.index_documents(serializer.instance.id)
+        facets.invalidate()
+
+    def perform_destroy(self, instance):
+        document_id = instance.id
+        super().perform_destroy(instance)
+        search.index_documents(document_id)
+        facets.invalidate()
 
     def perform_create(self, serializer):
         user = self.request.user if self.request.user.is_authenticated else None
@@ -142,42 +155,284 @@ class UploadedDocumentViewSet(viewsets.ModelViewSet):
 
         with transaction.atomic():
             instance = serializer.save(uploader=user)
+            self.ingestion_job = enqueue_document(instance)
+        facets.invalidate()
+
+
+    @drf_action(detail=False, methods=['get'], url_path='search', url_name='search')
+    def full_text_search(self, request):
+        """
+        Best matches for ?q= in titles, passages and questions, with highlighted
+        snippets. The list filters apply; page with ?limit= and ?offset=.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError("limit and offset must be integers.")
+
+        queryset = self.get_queryset()
+        hits = search.ranked(queryset, query, limit=limit, offset=offset)
+        documents = queryset.in_bulk([hit.document_id for hit in hits])
+        results = [
+            {**DocumentListSerializer(documents[hit.document_id]).data, 'rank': hit.rank, 'snippet': hit.snippet}
+            for hit in hits
+            if hit.document_id in documents
+        ]
+        return Response({
+            'query': query,
+            'results': results,
+            'next_offset': offset + limit if len(hits) == limit else None,
+        })
+
+    @drf_action(detail=False, methods=['get'], url_path='facets', url_name='facets')
+    def facet_counts(self, request):
+        """
+        How many documents each option of every catalog filter would give,
+        under the current filters: {total, facets: {facet: [{value, label, count}]}}.
+        """
+        return Response(facets.facet_counts(request.query_params))
+
+    @drf_action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsTeacher])
+    def validate(self, request):
+        """Dry run: parse and validate the file, write nothing, return problems and a commit token."""
+        file_obj = request.FILES.get('file')
+        if not file_obj or not file_obj.name.endswith(('.docx', '.pdf')):
+            raise ValidationError("Invalid file format. Only .docx and .pdf files are permitted.")
+        try:
+            token, result = dry_run.validate_upload(file_obj, file_obj.name, request.user)
+        except PYEParseError as exc:
+            return Response({"valid": False, "detail": str(exc), "problems": []}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as exc:
+            return Response(
+                {"valid": False, "detail": f"Unexpected parser error: {exc}", "problems": []},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({
+            "valid": not result.problems,
+            "token": token,
+            "expires_in": int(dry_run.TOKEN_TTL.total_seconds()),
+            "grammar": result.grammar,
+            "title": result.parsed.title,
+            "question_count": len(result.parsed.questions),
+            "problems": dry_run.structure_problems(result.problems),
+            "detail": format_validation_errors(result.problems),
+        })
+
+    @drf_action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsTeacher])
+    def commit(self, request):
+        """Save a validated file under its token, reusing the parse from `validate`."""
+        metadata = {
+            field: request.data[field]
+            for field in DOCUMENT_METADATA_FIELDS if field in request.data
+        }
+        try:
+            document, job = dry_run.commit_validated(request.data.get('token', ''), request.user, metadata)
+        except dry_run.ValidationTokenError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_410_GONE)
+        facets.invalidate()
+        data = self.get_serializer(document).data
+        data['ingestion_job'] = IngestionJobSerializer(job).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class IngestionJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued document parses: queued, parsing, validated (with problems) or failed."""
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = IngestionJobSerializer
+
+    def get_queryset(self):
+        queryset = IngestionJob.objects.select_related('document').order_by('-created_at')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(document__uploader=self.request.user)
+
+        document_id = self.request.query_params.get('document_id')
+        if document_id:
+            queryset = queryset.filter(document_id=document_id)
+        return queryset
+
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads (see passages.uploads):
+
+    POST   /api/uploads/                  {file_name, size, sha256?, title, grade_level?, ...}
+    GET    /api/uploads/<id>/             status and received_parts, to resume
+    PUT    /api/uploads/<id>/parts/<n>/   raw bytes of part n (1-based, chunk_size each but the last)
+    POST   /api/uploads/<id>/complete/    create the document and queue its parse
+    DELETE /api/uploads/<id>/             abort
+    """
+    authentication_classes = [CsrfExemptSessionAuthentication]
+    permission_classes = [IsAuthenticated, IsTeacher]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(uploader=self.request.user)
+
+    def _session_data(self, session):
+        data = self.get_serializer(session).data
+        data['received_parts'] = uploads.received_parts(session)
+        return data
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        metadata = {field: request.data[field] for field in DOCUMENT_METADATA_FIELDS if field in request.data}
+        try:
+            session = uploads.start_session(request.user, **serializer.validated_data, metadata=metadata)
+        except uploads.UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self._session_data(session), status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self._session_data(self.get_object()))
+
+    def destroy(self, request, pk=None):
+        try:
+            uploads.abort_session(self.get_object())
+        except uploads.UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @drf_action(detail=True, methods=['put'], url_path=r'parts/(?P<part_number>[0-9]+)')
+    def parts(self, request, pk=None, part_number=None):
+        session = self.get_object()
+        try:
+            # Streamed from the request body; never goes through request.data or request.FILES.
+            size = uploads.write_part(session, int(part_number), request.stream or io.BytesIO())
+        except uploads.UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"part": int(part_number), "size": size})
+
+    @drf_action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        try:
+            document, job = uploads.complete_session(session)
+        except uploads.UploadError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        facets.invalidate()
+        data = UploadedDocumentSerializer(document, context=self.get_serializer_context()).data
+        data['ingestion_job'] = IngestionJobSerializer(job).data
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+def _versioned_payload_response(request, pk, etag_kind, render):
+    """
+    Serve a payload cached per document content version (passages.payload_cache)
+    with ETag / Last-Modified revalidation. `render(version, updated_at)` returns
+    (body, content_encoding); it is only called when the client's copy is stale.
+    `etag_kind` is a string, or a callable taking (version, updated_at) when the
+    representation served depends on the cached content.
+    """
+    state = payload_cache.content_state(pk)
+    if state is None:
+        raise Http404
+    version, updated_at = state
+    if callable(etag_kind):
+        etag_kind = etag_kind(version, updated_at)
+    headers = {
+        'ETag': payload_cache.etag_for(pk, version, updated_at, kind=etag_kind),
+        'Last-Modified': http_date(updated_at.timestamp()),
+        'Cache-Control': 'no-cache',       # may be stored, but always revalidated
+    }
+    response = get_conditional_response(
+        request, etag=headers['ETag'], last_modified=int(updated_at.timestamp()),
+    )
+    if response is None:
+        body, encoding = render(version, updated_at)
+        response = HttpResponse(body, content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Content-Length'] = len(body)
+    for name, value in headers.items():
+        response[name] = value
+    return response
 
-            if instance.file:
-                try:
-                    print(f"Running PYE Parser on {instance.file.name}")
-                    import_document(instance)  # parse, validate, and save in one call
-                    print("Successfully parsed and saved document data.")
-                except PYEParseError as e:
-                    print(f"Parser failed: {e}")
-                    raise ValidationError(f"Document Error: {str(e)}")
-                except Exception as e:
-                    print(f"Unexpected parser error: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    raise ValidationError(f"Document Error: {str(e)}")
 
 class DocumentDetailView(APIView):
+    """
+    Passage with all questions and answers. The rendered JSON is cached per
+    document content version (passages.payload_cache) and revalidated with
+    ETag / Last-Modified, so unchanged repeat fetches get a 304.
+    """
     def get(self, request, pk):
-        document = get_object_or_404(UploadedDocument, pk=pk)
-        serializer = DocumentDetailSerializer(document)
-        return Response(serializer.data)
+        return _versioned_payload_response(
+            request, pk, 'doc',
+            lambda version, updated_at: (payload_cache.get_payload(pk, version, updated_at), None),
+        )
+
+
+class DocumentQuizView(APIView):
+    """
+    Student quiz delivery: passage, questions and choices only (no answer key),
+    served precompressed in the best encoding the client accepts.
+    """
+    def get(self, request, pk):
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+        @functools.cache
+        def variant(version, updated_at):
+            variants = payload_cache.get_quiz_variants(pk, version, updated_at)
+            encoding = payload_cache.choose_encoding(accept_encoding, variants)
+            return encoding, variants[encoding]
+
+        def render(version, updated_at):
+            encoding, body = variant(version, updated_at)
+            return body, (None if encoding == 'identity' else encoding)
+
+        # Each encoding is its own representation, so it gets its own ETag. Small
+        # bodies are kept uncompressed, so the tag follows the variant actually served.
+        response = _versioned_payload_response(
+            request, pk, lambda version, updated_at: f'quiz-{variant(version, updated_at)[0]}', render,
+        )
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
 
 
-class QuizQuestionViewSet(viewsets.ModelViewSet):
+class DocumentContentEditMixin:
+    """Question/answer edits through the API change what DocumentDetailView serves."""
+    document_id_path = 'document_id'
+
+    def _document_id(self, instance):
+        return type(instance).objects.filter(pk=instance.pk).values_list(self.document_id_path, flat=True).get()
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        payload_cache.bump_content_version(self._document_id(serializer.instance))
+        search.index_documents(self._document_id(serializer.instance))
+
+    def perform_update(self, serializer):
+        before = self._document_id(serializer.instance)
+        super().perform_update(serializer)
+        payload_cache.bump_content_version(before, self._document_id(serializer.instance))
+        search.index_documents(before, self._document_id(serializer.instance))
+
+    def perform_destroy(self, instance):
+        document_id = self._document_id(instance)
+        super().perform_destroy(instance)
+        payload_cache.bump_content_version(document_id)
+        search.index_documents(document_id)
+
+
+class QuizQuestionViewSet(DocumentContentEditMixin, viewsets.ModelViewSet):
     queryset = QuizQuestion.objects.all()
     serializer_class = QuizQuestionSerializer
 
     def get_queryset(self):
+        queryset = QuizQuestion.objects.prefetch_related('answers')
         document_id = self.request.query_params.get('document_id', None)
         if document_id:
-            return QuizQuestion.objects.filter(document_id=document_id)
-        return QuizQuestion.objects.all()
+            return queryset.filter(document_id=document_id)
+        return queryset
 
 
-class QuizAnswerViewSet(viewsets.ModelViewSet):
+class QuizAnswerViewSet(DocumentContentEditMixin, viewsets.ModelViewSet):
     queryset = QuizAnswer.objects.all()
     serializer_class = QuizAnswerSerializer
+    document_id_path = 'question__document_id'
 
 
 class QuizResponseViewSet(viewsets.ModelViewSet):
@@ -222,40 +477,10 @@ class SubmitQuizView(APIView):
                 else None
             )
 
-            document = get_object_or_404(UploadedDocument, id=document_id)
-            questions = QuizQuestion.objects.filter(document=document)
-
-            if not questions.exists():
-                return Response(
-                    {'error': 'No questions found for this document'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Calculate score
-            score = 0
-            total_questions = questions.count()
-            user_answers = []
-
-            for answer_data in answers:
-                question_id = answer_data.get('question_id')
-                selected_answer_id = answer_data.get('selected_answer_id')
-
-                question = get_object_or_404(QuizQuestion, id=question_id)
-                selected_answer = get_object_or_404(QuizAnswer, id=selected_answer_id)
-
-                is_correct = selected_answer.is_correct
-                if is_correct:
-                    score += 1
-
-                user_answers.append({
-                    'question': question,
-                    'selected_answer': selected_answer,
-                    'is_correct': is_correct
-                })
-
-            # Create quiz response
-            quiz_response = QuizResponse.objects.create(
-                document=document,
+            key = grading.answer_key(document_id)
+            graded = grading.grade(key, answers)
+            receipt = submission_queue.record_submission(
+                graded,
                 user=authenticated_user,
                 user_name=(
                     authenticated_user.username
@@ -263,25 +488,17 @@ class SubmitQuizView(APIView):
                      else user_name
                 ),
                 duration_seconds=time_spent,
-                score=score,
-                total_questions=total_questions
+                idempotency_key=request.headers.get('Idempotency-Key') or data.get('idempotency_key'),
             )
 
-            # Create user answers
-            for user_answer_data in user_answers:
-                UserAnswer.objects.create(
-                    response=quiz_response,
-                    question=user_answer_data['question'],
-                    selected_answer=user_answer_data['selected_answer'],
-                    is_correct=user_answer_data['is_correct']
-                )
-
             return Response({
-                'response_id': quiz_response.id,
-                'score': score,
-                'total_questions': total_questions,
-                'percentage': round((score / total_questions) * 100, 2)
-            })
+                'response_id': receipt.response_id,
+                'score': receipt.score,
+                'total_questions': receipt.total_questions,
+                'percentage': receipt.percentage,
+                'queued': receipt.queued,
+                'review': grading.review(key),
+            }, status=status.HTTP_202_ACCEPTED if receipt.queued else status.HTTP_200_OK)
 
         except Exception as e:
             return Response(
@@ -542,6 +759,14 @@ class UserLogoutView(APIView):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class AnswerKeyCacheStatsView(APIView):
+    """Hit/miss counters of this worker's answer-key cache (passages.grading)."""
+    permission_classes = [IsAuthenticated, IsTeacher]
+
+    def get(self, request):
+        return Response(grading.answer_key_cache.stats())
+
+
 class UserProfileView(APIView):
     def get(self, request):
         """Get current user profile"""